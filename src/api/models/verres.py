@@ -26,6 +26,7 @@ class Verre(Base):
     protection = Column(Boolean, default=False)  # Si le verre a une protection (UV, Blue Light, etc)
     photochromic = Column(Boolean, default=False)  # Si le verre est photochromique
     tags = Column(String(500))  # Tags extraits du nom (JSON array as string)
+    tags_signature = Column(String(64), index=True)  # Empreinte de l'ensemble de tags (api_ia.app.tags)
     image_gravure = Column(String(500))  # Chemin vers l'image de la gravure
 
     class Config:
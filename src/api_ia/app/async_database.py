@@ -0,0 +1,68 @@
+"""
+Accès à la base pour les handlers ``async``.
+
+pyodbc est bloquant : appelé directement depuis un ``async def``, chaque requête
+SQL gèle la boucle d'événements, et donc toutes les requêtes HTTP en cours,
+pendant son aller-retour réseau. Les fonctions de ce module exécutent les
+lectures de ``database`` et ``security`` dans un pool de threads dédié
+(``db_executor``), distinct du pool d'inférence : une rafale de lectures en base
+ne retarde pas le travail CPU, et inversement.
+
+``DB_WORKERS`` vaut par défaut la taille maximale du pool de connexions : chaque
+thread trouve une connexion libre sans attendre. Au-delà de ``DB_MAX_PENDING``
+lectures en cours ou en attente, ``ExecutorSaturatedError`` est levée (503).
+"""
+
+from typing import Callable, Dict, List, Optional
+
+from api_ia.app import database, security
+from api_ia.app.config import DB_MAX_PENDING, DB_WORKERS
+from api_ia.app.executor import BoundedExecutor
+
+db_executor = BoundedExecutor(max_workers=DB_WORKERS, max_pending=DB_MAX_PENDING, thread_name_prefix="db")
+
+
+async def run(fn: Callable, *args, **kwargs):
+    """
+    Exécute une fonction bloquante d'accès à la base dans ``db_executor``.
+
+    Raises:
+        ExecutorSaturatedError: Si trop de lectures sont déjà en cours ou en attente.
+    """
+    return await db_executor.run(fn, *args, **kwargs)
+
+
+async def find_matching_verres(tags: List[str]) -> List[dict]:
+    """Version ``await``-able de ``database.find_matching_verres``."""
+    return await run(database.find_matching_verres, tags)
+
+
+async def get_verre_details(verre_id: int) -> Optional[dict]:
+    """Version ``await``-able de ``database.get_verre_details``."""
+    return await run(database.get_verre_details, verre_id)
+
+
+async def get_verres_details(verre_ids: List[int]) -> Dict[int, dict]:
+    """Version ``await``-able de ``database.get_verres_details``."""
+    return await run(database.get_verres_details, verre_ids)
+
+
+async def get_user(username: str, use_cache: bool = True) -> Optional[dict]:
+    """
+    Version ``await``-able de ``security.get_user``, avec le même cache.
+
+    Un utilisateur en cache est retourné sans passer par le pool de threads.
+    """
+    if not use_cache:
+        security.user_cache.invalidate(username)
+    return await security.user_cache.get_or_load_async(username, lambda: run(security.fetch_user, username))
+
+
+async def authenticate_user(username: str, password: str):
+    """Version ``await``-able de ``security.authenticate_user`` (lecture en base et bcrypt hors de la boucle)."""
+    return await run(security.authenticate_user, username, password)
+
+
+def shutdown():
+    """Arrête le pool de threads (les lectures en cours se terminent)."""
+    db_executor.shutdown(wait=False)
@@ -0,0 +1,90 @@
+"""
+Lecture des entrées de ``/match_batch`` : plusieurs fichiers et/ou archives zip.
+
+Les archives sont dépliées en mémoire, dans l'ordre de leurs entrées, avec des
+bornes sur le nombre d'images et la taille décompressée (protection contre les
+bombes zip). La validation de chaque image reste du ressort de l'appelant afin
+qu'une image invalide ne fasse échouer que son propre élément.
+"""
+
+import io
+import zipfile
+from typing import Callable, Iterable, List, Tuple
+
+ZIP_SIGNATURE = b"PK\x03\x04"
+
+
+class BatchInputError(ValueError):
+    """Lot refusé dans son ensemble (archive illisible, trop d'images, trop volumineux)."""
+
+
+def is_zip(filename: str, content: bytes) -> bool:
+    """Indique si un fichier envoyé est une archive zip (signature ou extension)."""
+    return content.startswith(ZIP_SIGNATURE) or (filename or "").lower().endswith(".zip")
+
+
+def _zip_members(content: bytes) -> Tuple[zipfile.ZipFile, List[zipfile.ZipInfo]]:
+    """Ouvre une archive et retourne ses entrées utiles : ni dossiers, ni métadonnées macOS, ni fichiers cachés."""
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(content))
+    except zipfile.BadZipFile as e:
+        raise BatchInputError(f"Invalid zip archive: {e}")
+    members = []
+    for info in archive.infolist():
+        name = info.filename.rsplit("/", 1)[-1]
+        if info.is_dir() or info.filename.startswith("__MACOSX/") or not name or name.startswith("."):
+            continue
+        members.append(info)
+    return archive, members
+
+
+def _expand_zip(filename: str, content: bytes, add: Callable[[str, bytes], None], check: Callable[[int], None]):
+    """Ajoute au lot (``add``) les entrées d'une archive ; ``check`` vérifie les bornes avant chaque lecture."""
+    archive, members = _zip_members(content)
+    for info in members:
+        # Taille annoncée vérifiée avant de décompresser quoi que ce soit
+        check(info.file_size)
+        try:
+            data = archive.read(info)
+        except (zipfile.BadZipFile, RuntimeError, NotImplementedError) as e:
+            raise BatchInputError(f"Cannot read {info.filename} from {filename}: {e}")
+        add(f"{filename}/{info.filename}", data)
+
+
+def expand_batch(files: Iterable[Tuple[str, bytes]], max_items: int, max_total_bytes: int) -> List[Tuple[str, bytes]]:
+    """
+    Remplace chaque archive zip par les fichiers qu'elle contient, en conservant l'ordre.
+
+    Args:
+        files (Iterable[Tuple[str, bytes]]): Couples (nom, contenu) dans l'ordre d'envoi.
+        max_items (int): Nombre maximal d'images après dépliage.
+        max_total_bytes (int): Taille cumulée maximale (décompressée) des images.
+
+    Returns:
+        List[Tuple[str, bytes]]: Couples (nom, contenu) ; les noms issus d'une archive
+        sont préfixés par le nom de l'archive (``lot.zip/img1.jpg``).
+
+    Raises:
+        BatchInputError: Si une archive est illisible ou si une borne est dépassée.
+    """
+    items = []
+    total = 0
+
+    def check(size):
+        if len(items) >= max_items:
+            raise BatchInputError(f"Too many images in batch (max {max_items})")
+        if total + size > max_total_bytes:
+            raise BatchInputError(f"Batch too large (max {max_total_bytes} bytes)")
+
+    def add(name, content):
+        nonlocal total
+        check(len(content))
+        total += len(content)
+        items.append((name, content))
+
+    for filename, content in files:
+        if is_zip(filename, content):
+            _expand_zip(filename, content, add, check)
+        else:
+            add(filename, content)
+    return items
@@ -0,0 +1,144 @@
+"""
+Micro-batching dynamique des inférences.
+
+Les requêtes concurrentes sont placées dans une file ; une tâche de fond les
+regroupe pendant au plus ``max_wait_ms`` millisecondes ou jusqu'à
+``max_batch_size`` éléments, exécute une seule passe forward sur le lot (hors
+de la boucle d'événements) puis résout le futur de chaque appelant.
+"""
+
+import asyncio
+import logging
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    File d'attente qui regroupe les appels concurrents en lots.
+
+    Args:
+        process_batch (Callable[[List[Any]], List[Any]]): Fonction bloquante qui traite
+            un lot et retourne un résultat par élément, dans le même ordre.
+        max_batch_size (int): Taille maximale d'un lot.
+        max_wait_ms (float): Attente maximale après le premier élément d'un lot.
+        executor: Exécuteur utilisé pour ``process_batch`` (celui par défaut de la boucle si None).
+        on_batch (Callable[[int], None], optional): Appelé avec la taille de chaque lot (métriques).
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        executor=None,
+        on_batch: Optional[Callable[[int], None]] = None,
+    ):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.executor = executor
+        self.on_batch = on_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Nombre d'éléments en attente d'un lot."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        """Démarre la tâche de regroupement sur la boucle d'événements courante."""
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Arrête la tâche de regroupement ; les éléments en attente sont annulés."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            future.cancel()
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Ajoute un élément au prochain lot et attend son résultat.
+
+        Args:
+            item (Any): Entrée de ``process_batch`` (ex. tenseur prétraité).
+
+        Returns:
+            Any: Résultat correspondant à ``item``.
+        """
+        if self._worker is None:
+            await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self) -> list:
+        """Attend un premier élément puis complète le lot jusqu'à la taille ou au délai maximal."""
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                # Délai écoulé : on prend quand même ce qui est déjà en file
+                if self._queue.empty():
+                    break
+                batch.append(self._queue.get_nowait())
+                continue
+            getter = asyncio.ensure_future(self._queue.get())
+            done, _ = await asyncio.wait({getter}, timeout=remaining)
+            if getter not in done and getter.cancel():
+                break
+            # Le get a pu aboutir juste avant l'annulation : l'élément n'est pas perdu
+            batch.append(getter.result())
+        return batch
+
+    @staticmethod
+    def _resolve(batch: list, results: List[Any]):
+        """Transmet à chaque appelant encore en attente le résultat de son élément."""
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    @staticmethod
+    def _fail(batch: list, exc: BaseException):
+        """Transmet l'erreur d'un lot à tous ses appelants encore en attente (annulation comprise)."""
+        for _, future in batch:
+            if isinstance(exc, asyncio.CancelledError):
+                future.cancel()
+            elif not future.done():
+                future.set_exception(exc)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # Les appelants déjà partis (timeout, déconnexion) ne sont pas traités
+            batch = [(item, future) for item, future in batch if not future.cancelled()]
+            if not batch:
+                continue
+            if self.on_batch:
+                self.on_batch(len(batch))
+
+            try:
+                results = await loop.run_in_executor(self.executor, self.process_batch, [item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"{len(results)} résultats pour un lot de {len(batch)} éléments")
+            except asyncio.CancelledError as e:
+                self._fail(batch, e)
+                raise
+            except Exception as e:
+                logger.error(f"Erreur lors du traitement d'un lot de {len(batch)} éléments : {e}")
+                self._fail(batch, e)
+                continue
+            self._resolve(batch, results)
@@ -8,12 +8,12 @@ la maintenance et les modifications.
 import os
 from dotenv import load_dotenv
 
-# Charger les variables d'environnement depuis .env
+# Charger les variables d'environnement depuis .env (une seule fois, ici : les autres modules lisent config)
 load_dotenv()
 
 # Configuration des logs
 LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs")
-os.makedirs(LOG_DIR, exist_ok=True)
+SECURITY_LOG_DIR = os.path.join(LOG_DIR, "security")
 
 # Configuration de l'API
 API_TITLE = "API IA pour la Classification des Verres"
@@ -30,12 +30,65 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 ROTATION_THRESHOLD_MINUTES = 5
 
 # Configuration du modèle
-MODEL_WEIGHTS_PATH = "/app/api_ia/weights/efficientnet_triplet.pth"
+MODEL_WEIGHTS_PATH = os.getenv("MODEL_WEIGHTS_PATH", "/app/api_ia/weights/efficientnet_triplet.pth")
+# Poids lus en memory-map (pages du fichier partagées entre workers) plutôt que copiés en mémoire.
+# Le fichier mappé est une copie immuable des poids (<poids>.<empreinte>.pth, à côté du fichier d'origine) :
+# recopier ou tronquer MODEL_WEIGHTS_PATH ne touche pas le modèle actif.
+MODEL_WEIGHTS_MMAP = os.getenv("MODEL_WEIGHTS_MMAP", "true").lower() == "true"
+# Rechargement à chaud quand le fichier des poids change (secondes entre deux vérifications, 0 = désactivé)
+MODEL_WATCH_SECONDS = float(os.getenv("MODEL_WATCH_SECONDS", "0"))
 IMAGE_SIZE = 224
+# Décodage JPEG directement à échelle réduite (mode draft de libjpeg)
+JPEG_DRAFT_DECODE = os.getenv("JPEG_DRAFT_DECODE", "true").lower() == "true"
+# Dimensions maximales d'une image envoyée, lues dans l'en-tête avant décodage (bombes de décompression)
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "12000"))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(50_000_000)))
+
+# Moteur d'inférence : eager (PyTorch), fused (grayscale_conv et BatchNorm repliés), torchscript,
+# onnx (ONNX Runtime CPU), int8_dynamic ou int8_static
+# Les fichiers exportés sont produits par python -m api_ia.scripts.export_model
+INFERENCE_RUNTIME = os.getenv("INFERENCE_RUNTIME", "eager").lower()
+TORCHSCRIPT_MODEL_PATH = os.getenv("TORCHSCRIPT_MODEL_PATH", os.path.splitext(MODEL_WEIGHTS_PATH)[0] + ".torchscript.pt")
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", os.path.splitext(MODEL_WEIGHTS_PATH)[0] + ".onnx")
+# int8_dynamic : tête quantifiée au chargement ; int8_static : modèle calibré par api_ia.scripts.quantize_model
+QUANTIZED_MODEL_PATH = os.getenv("QUANTIZED_MODEL_PATH", os.path.splitext(MODEL_WEIGHTS_PATH)[0] + ".int8.pt")
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))  # 0 = choix d'ONNX Runtime
+
+# Micro-batching des inférences (/match, /embedding)
+BATCHING_ENABLED = os.getenv("BATCHING_ENABLED", "true").lower() == "true"
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+
+# Pool de threads d'inférence : au-delà de INFERENCE_MAX_PENDING tâches, l'API répond 503
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "4"))
+INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", "32"))
+
+# /match_batch : bornes d'un lot (après dépliage des archives zip)
+MATCH_BATCH_MAX_ITEMS = int(os.getenv("MATCH_BATCH_MAX_ITEMS", "50"))
+MATCH_BATCH_MAX_BYTES = int(os.getenv("MATCH_BATCH_MAX_BYTES", str(100 * 1024 * 1024)))
+
+# Cache d'embeddings adressé par contenu (/match, /embedding)
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "")  # vide = pas de niveau disque
+# Par worker : avec WEB_CONCURRENCY workers, le dossier peut atteindre WEB_CONCURRENCY x EMBEDDING_CACHE_MAX_DISK_MB
+EMBEDDING_CACHE_MAX_DISK_MB = int(os.getenv("EMBEDDING_CACHE_MAX_DISK_MB", "200"))
+
+# Cache des utilisateurs authentifiés (évite une requête SQL par appel authentifié)
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))  # 0 = désactivé
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+
+# Index des tags en mémoire pour /search_tags (api_ia.app.tag_index)
+TAG_INDEX_ENABLED = os.getenv("TAG_INDEX_ENABLED", "true").lower() == "true"
+TAG_INDEX_REFRESH_SECONDS = float(os.getenv("TAG_INDEX_REFRESH_SECONDS", "60"))
+
+# Détails des verres (/verres/bulk, /identify) : cache borné, invalidé au rafraîchissement de l'index des tags
+VERRE_CACHE_SIZE = int(os.getenv("VERRE_CACHE_SIZE", "4096"))
+VERRE_CACHE_TTL_SECONDS = float(os.getenv("VERRE_CACHE_TTL_SECONDS", "600"))  # 0 = désactivé
+VERRES_BULK_MAX_IDS = int(os.getenv("VERRES_BULK_MAX_IDS", "200"))
 
 # Configuration des références
 REFERENCES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "references")
-os.makedirs(REFERENCES_DIR, exist_ok=True)
 
 # Configuration des utilisateurs
 ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "admin@example.com")
@@ -61,6 +114,25 @@ WEIGHTS_DIR = os.path.join(BASE_DIR, "weights")
 DATA_DIR = os.path.join(BASE_DIR, "data")
 REFERENCE_DIR = os.path.join(DATA_DIR, "oversampled_gravures")
 
+# Configuration de l'index de références (plusieurs exemplaires par classe)
+REFERENCE_AGGREGATION = os.getenv("REFERENCE_AGGREGATION", "max")  # max, mean_topm ou centroid
+REFERENCE_TOP_M = int(os.getenv("REFERENCE_TOP_M", "3"))
+REFERENCE_MAX_PER_CLASS = int(os.getenv("REFERENCE_MAX_PER_CLASS", "0"))  # 0 = tous les exemplaires
+REFERENCE_BATCH_SIZE = int(os.getenv("REFERENCE_BATCH_SIZE", "32"))
+
+# Backend de recherche des plus proches voisins : exact, ivf ou hnsw (hnswlib optionnel)
+INDEX_BACKEND = os.getenv("INDEX_BACKEND", "exact")
+INDEX_CANDIDATES = int(os.getenv("INDEX_CANDIDATES", "100"))  # exemplaires agrégés par requête (ivf/hnsw)
+IVF_N_LISTS = int(os.getenv("IVF_N_LISTS", "64"))
+IVF_N_PROBE = int(os.getenv("IVF_N_PROBE", "8"))
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+
+# Store précalculé des embeddings de référence (voir api_ia.scripts.build_reference_store)
+REFERENCE_STORE_PATH = os.getenv("REFERENCE_STORE_PATH", os.path.join(REFERENCES_DIR, "reference_embeddings.npy"))
+REFERENCE_STORE_MMAP = os.getenv("REFERENCE_STORE_MMAP", "true").lower() == "true"
+
 # Configuration Azure Database
 AZURE_SERVER = os.getenv("AZURE_SERVER", "")
 AZURE_DATABASE = os.getenv("AZURE_DATABASE", "")
@@ -68,11 +140,27 @@ AZURE_USERNAME = os.getenv("AZURE_USERNAME", "")
 AZURE_PASSWORD = os.getenv("AZURE_PASSWORD", "")
 AZURE_DRIVER = "{ODBC Driver 18 for SQL Server}"
 
+# Pool de connexions à la base (api_ia.app.db_pool)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))  # attente max d'une connexion libre (s)
+DB_POOL_MAX_IDLE_SECONDS = float(os.getenv("DB_POOL_MAX_IDLE_SECONDS", "300"))
+DB_POOL_HEALTH_CHECK_SECONDS = float(os.getenv("DB_POOL_HEALTH_CHECK_SECONDS", "30"))
+# Threads dédiés aux lectures en base (api_ia.app.async_database) : au-delà de DB_MAX_PENDING, 503
+DB_WORKERS = int(os.getenv("DB_WORKERS", str(DB_POOL_MAX_SIZE)))
+DB_MAX_PENDING = int(os.getenv("DB_MAX_PENDING", "64"))
+
 # Configuration du monitoring
 REPORTS_DIR = os.path.join(LOG_DIR, "reports")
 
-# Création des répertoires nécessaires
-os.makedirs(REPORTS_DIR, exist_ok=True)
+
+def create_directories():
+    """Crée les répertoires de travail de l'API (seul endroit où ils sont créés)."""
+    for directory in (LOG_DIR, SECURITY_LOG_DIR, REPORTS_DIR, REFERENCES_DIR):
+        os.makedirs(directory, exist_ok=True)
+
+
+create_directories()
 
 # Vérification des variables d'environnement requises
 required_vars = [
@@ -2,44 +2,85 @@ import json
 import os
 import logging
 import pyodbc
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Iterator, Optional, Any, Tuple
 from contextlib import contextmanager
-from .config import AZURE_SERVER, AZURE_DATABASE, AZURE_USERNAME, AZURE_PASSWORD, AZURE_DRIVER
+from .config import (
+    AZURE_SERVER,
+    AZURE_DATABASE,
+    AZURE_USERNAME,
+    AZURE_PASSWORD,
+    AZURE_DRIVER,
+    DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_POOL_MAX_IDLE_SECONDS,
+    DB_POOL_HEALTH_CHECK_SECONDS,
+)
+from .db_pool import ConnectionPool
+from .tags import canonical_tags, tags_signature
 
 # Configuration du logging
 logger = logging.getLogger(__name__)
 
 
+def connect() -> pyodbc.Connection:
+    """
+    Ouvre une nouvelle connexion à la base de données Azure.
+
+    Returns:
+        pyodbc.Connection: Objet de connexion à la base de données.
+    """
+    conn_str = (
+        f"DRIVER={AZURE_DRIVER};"
+        f"SERVER={AZURE_SERVER};"
+        f"DATABASE={AZURE_DATABASE};"
+        f"UID={AZURE_USERNAME};"
+        f"PWD={AZURE_PASSWORD};"
+        "Encrypt=yes;"
+        "TrustServerCertificate=no;"
+    )
+    return pyodbc.connect(conn_str)
+
+
+# Connexions partagées par toutes les fonctions du module (ouvertes à la demande, voir warm_pool)
+pool = ConnectionPool(
+    connect,
+    min_size=DB_POOL_MIN_SIZE,
+    max_size=DB_POOL_MAX_SIZE,
+    timeout=DB_POOL_TIMEOUT,
+    max_idle_seconds=DB_POOL_MAX_IDLE_SECONDS,
+    health_check_interval=DB_POOL_HEALTH_CHECK_SECONDS,
+)
+
+
+def warm_pool():
+    """Ouvre d'avance les ``DB_POOL_MIN_SIZE`` connexions du pool (échec journalisé, non bloquant)."""
+    try:
+        pool.warm()
+    except Exception as e:
+        logger.warning(f"Préchauffage du pool de connexions impossible : {e}")
+
+
 @contextmanager
 def get_db_connection():
     """
-    Gestionnaire de contexte pour la connexion à la base de données Azure.
+    Gestionnaire de contexte prêtant une connexion du pool à la base de données Azure.
+
+    La connexion est rendue au pool en sortie du bloc (fermée si une exception en sort).
 
     Yields:
         pyodbc.Connection: Objet de connexion à la base de données.
 
     Raises:
         pyodbc.Error: Si la connexion échoue.
+        PoolTimeoutError: Si aucune connexion ne se libère dans ``DB_POOL_TIMEOUT`` secondes.
     """
-    conn = None
     try:
-        conn_str = (
-            f"DRIVER={AZURE_DRIVER};"
-            f"SERVER={AZURE_SERVER};"
-            f"DATABASE={AZURE_DATABASE};"
-            f"UID={AZURE_USERNAME};"
-            f"PWD={AZURE_PASSWORD};"
-            "Encrypt=yes;"
-            "TrustServerCertificate=no;"
-        )
-        conn = pyodbc.connect(conn_str)
-        yield conn
+        with pool.connection() as conn:
+            yield conn
     except pyodbc.Error as e:
         logger.error(f"Erreur de connexion à la base de données Azure: {e}")
         raise
-    finally:
-        if conn:
-            conn.close()
 
 
 def execute_query(query: str, params: tuple = None) -> List[tuple]:
@@ -103,10 +144,41 @@ def create_verre_dict(row: tuple, columns: List[str]) -> Dict[str, Any]:
     return verre
 
 
+# Colonnes des verres retournés par les recherches par tags
+TAGGED_VERRE_COLUMNS = "v.id, v.nom, v.indice, v.gravure, v.url_source, v.fournisseur, v.tags"
+# Verres portant au moins un tag (les tags sont écrits par json.dumps)
+TAGGED_VERRE_CONDITION = "v.tags IS NOT NULL AND v.tags <> '[]'"
+
+
+def create_tagged_verre_dict(row: tuple) -> Dict[str, Any]:
+    """
+    Crée le dictionnaire d'un verre retourné par les recherches par tags.
+
+    Args:
+        row (tuple): Ligne lue avec ``TAGGED_VERRE_COLUMNS``.
+
+    Returns:
+        Dict[str, Any]: Verre, avec ses tags d'origine (non normalisés).
+    """
+    verre_id, nom, indice, gravure, url_source, fournisseur, tags_json = row[:7]
+    return {
+        "id": verre_id,
+        "nom": nom,
+        "indice": indice,
+        "gravure": gravure,
+        "url_source": url_source,
+        "fournisseur": fournisseur,
+        "tags": parse_verre_tags(tags_json),
+    }
+
+
 def find_matching_verres(tags: List[str]) -> List[Dict[str, Any]]:
     """
     Trouve les verres qui ont exactement les tags spécifiés, dans n'importe quel ordre.
 
+    La recherche passe par l'index de ``verres.tags_signature`` (voir ``api_ia.app.tags``) ;
+    les tags des lignes trouvées sont revérifiés pour écarter une signature périmée.
+
     Args:
         tags (list): Liste de tags à rechercher.
 
@@ -117,45 +189,21 @@ def find_matching_verres(tags: List[str]) -> List[Dict[str, Any]]:
         if not tags:
             return []
 
-        # Récupérer tous les verres avec leurs tags
-        query = """
-            SELECT v.id, v.nom, v.variante, v.hauteur_min, v.hauteur_max,
-                   v.indice, v.gravure, v.url_source, v.fournisseur, v.tags
+        query = f"""
+            SELECT {TAGGED_VERRE_COLUMNS}
             FROM verres v
-            WHERE v.tags IS NOT NULL
+            WHERE v.tags_signature = ?
         """
+        results = execute_query(query, (tags_signature(tags),))
 
-        results = execute_query(query)
-        logger.info(f"Nombre total de verres trouvés: {len(results)}")
-
-        # Filtrer les verres qui ont exactement les tags recherchés
+        search_tags = canonical_tags(tags)
         verres = []
         for row in results:
-            verre_id, nom, variante, hauteur_min, hauteur_max, indice, gravure, url_source, fournisseur, tags_json = row
-            try:
-                # Parser les tags du verre
-                verre_tags = parse_verre_tags(tags_json)
-
-                # Convertir tous les tags en minuscules pour la comparaison
-                verre_tags_lower = [vt.strip().lower() for vt in verre_tags]
-                search_tags_lower = [tag.strip().lower() for tag in tags]
-
-                # Vérifier que les verres ont exactement les mêmes tags (même nombre et mêmes tags)
-                if set(verre_tags_lower) == set(search_tags_lower):
-                    verres.append(
-                        {
-                            "id": verre_id,
-                            "nom": nom,
-                            "indice": indice,
-                            "gravure": gravure,
-                            "url_source": url_source,
-                            "fournisseur": fournisseur,
-                            "tags": verre_tags,  # Garder les tags originaux dans la réponse
-                        }
-                    )
-            except Exception as e:
-                logger.error(f"Erreur lors du traitement des tags pour le verre {verre_id}: {e}")
+            verre = create_tagged_verre_dict(row)
+            if canonical_tags(verre["tags"]) != search_tags:
+                logger.warning(f"Signature de tags périmée pour le verre {verre['id']}")
                 continue
+            verres.append(verre)
 
         logger.info(f"Nombre de verres correspondant exactement aux tags: {len(verres)}")
         return verres
@@ -165,6 +213,129 @@ def find_matching_verres(tags: List[str]) -> List[Dict[str, Any]]:
         return []
 
 
+def fetch_tagged_verres(since_version: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    Lit les verres pour l'index des tags en mémoire (``api_ia.app.tag_index``).
+
+    Args:
+        since_version (int, optional): Ne lire que les verres modifiés après cette version
+            (``rowversion``), y compris ceux dont les tags ont été vidés. Tous les verres tagués si None.
+
+    Returns:
+        Tuple[List[Dict], Optional[int]]: Verres lus et version la plus récente parmi eux
+        (``since_version`` si aucun verre n'a changé).
+    """
+    query = f"SELECT {TAGGED_VERRE_COLUMNS}, CAST(v.row_version AS BIGINT) FROM verres v"
+    if since_version is None:
+        results = execute_query(f"{query} WHERE {TAGGED_VERRE_CONDITION}")
+    else:
+        results = execute_query(query + " WHERE v.row_version > CAST(CAST(? AS BIGINT) AS BINARY(8))", (since_version,))
+    versions = [row[7] for row in results]
+    return [create_tagged_verre_dict(row) for row in results], max(versions, default=since_version)
+
+
+def count_tagged_verres() -> int:
+    """Nombre de verres tagués (détecte les suppressions lors du rafraîchissement de l'index)."""
+    return execute_query(f"SELECT COUNT(*) FROM verres v WHERE {TAGGED_VERRE_CONDITION}")[0][0]
+
+
+# Colonnes des détails d'un verre (sans les colonnes techniques tags_signature / row_version)
+VERRE_DETAIL_COLUMNS = (
+    "id",
+    "nom",
+    "materiaux",
+    "indice",
+    "fournisseur",
+    "gravure",
+    "url_source",
+    "variante",
+    "hauteur_min",
+    "hauteur_max",
+    "protection",
+    "photochromic",
+    "tags",
+    "image_gravure",
+)
+
+# Limite de paramètres par requête (SQL Server en accepte 2100)
+MAX_QUERY_PARAMS = 1000
+
+
+def iter_verres_where(condition: str, values: List[Any], fetch_size: int = 100) -> Iterator[Dict[str, Any]]:
+    """
+    Détails des verres dont ``condition`` (avec un marqueur ``{placeholders}``) est vraie pour l'une des valeurs.
+
+    Les valeurs sont envoyées en paramètres, par paquets de ``MAX_QUERY_PARAMS`` sur une même
+    connexion ; les lignes sont lues par ``fetch_size`` et produites au fil de l'eau.
+
+    Args:
+        condition (str): Condition SQL, par exemple ``"id IN ({placeholders})"``.
+        values (List[Any]): Valeurs recherchées.
+        fetch_size (int): Lignes lues par aller-retour.
+
+    Yields:
+        Dict[str, Any]: Verres trouvés, dans l'ordre de la base.
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        for start in range(0, len(values), MAX_QUERY_PARAMS):
+            chunk = values[start : start + MAX_QUERY_PARAMS]
+            where = condition.format(placeholders=", ".join("?" * len(chunk)))
+            cursor.execute(f"SELECT {', '.join(VERRE_DETAIL_COLUMNS)} FROM verres WHERE {where}", chunk)
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield create_verre_dict(row, VERRE_DETAIL_COLUMNS)
+
+
+def iter_verres_details(verre_ids: List[int], fetch_size: int = 100) -> Iterator[Dict[str, Any]]:
+    """
+    Détails de plusieurs verres en une requête (``WHERE id IN (...)``), produits au fil de la lecture.
+
+    Args:
+        verre_ids (List[int]): Identifiants des verres (les doublons sont ignorés).
+        fetch_size (int): Lignes lues par aller-retour.
+
+    Yields:
+        Dict[str, Any]: Verres trouvés, dans l'ordre de la base (les ids absents sont omis).
+    """
+    ids = list(dict.fromkeys(verre_ids))
+    if ids:
+        yield from iter_verres_where("id IN ({placeholders})", ids, fetch_size)
+
+
+def get_verres_details(verre_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Détails de plusieurs verres en une requête (``WHERE id IN (...)``).
+
+    Args:
+        verre_ids (List[int]): Identifiants des verres (les doublons sont ignorés).
+
+    Returns:
+        Dict[int, Dict[str, Any]]: Verres trouvés, par identifiant (les ids absents sont omis).
+    """
+    return {verre["id"]: verre for verre in iter_verres_details(verre_ids)}
+
+
+def find_verres_details_by_tags(tag_sets: List[List[str]]) -> List[Dict[str, Any]]:
+    """
+    Détails des verres dont les tags sont exactement l'un des ensembles donnés, en une requête indexée.
+
+    Args:
+        tag_sets (List[List[str]]): Ensembles de tags recherchés.
+
+    Returns:
+        List[Dict[str, Any]]: Verres trouvés (tags revérifiés, comme ``find_matching_verres``).
+    """
+    wanted = {tags_signature(tags) for tags in tag_sets if tags}
+    if not wanted:
+        return []
+    verres = iter_verres_where("tags_signature IN ({placeholders})", sorted(wanted))
+    return [verre for verre in verres if tags_signature(verre["tags"]) in wanted]
+
+
 def get_verre_details(verre_id: int) -> Optional[Dict[str, Any]]:
     """
     Récupère les détails complets d'un verre.
@@ -178,25 +349,16 @@ def get_verre_details(verre_id: int) -> Optional[Dict[str, Any]]:
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            # Requête SQL optimisée pour Azure
-            query = """
-                SELECT *
-                FROM verres
-                WHERE id = ?
-            """
+            # Colonnes explicites : row_version (bytes, non sérialisable en JSON) et tags_signature restent internes
+            query = f"SELECT {', '.join(VERRE_DETAIL_COLUMNS)} FROM verres WHERE id = ?"
             cursor.execute(query, (verre_id,))
-
-            # Récupérer les colonnes avant de récupérer les résultats
-            columns = [column[0] for column in cursor.description]
-
-            # Récupérer les résultats
             results = cursor.fetchall()
 
             if not results:
                 logger.warning(f"Verre avec ID {verre_id} non trouvé")
                 return None
 
-            return create_verre_dict(results[0], columns)
+            return create_verre_dict(results[0], VERRE_DETAIL_COLUMNS)
 
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des détails du verre: {e}")
@@ -214,21 +376,24 @@ def get_verre_staging_details(verre_id: int) -> Optional[Dict[str, Any]]:
         Optional[Dict[str, Any]]: Détails du verre ou None si non trouvé.
     """
     try:
-        # Requête SQL optimisée pour Azure
-        query = """
-            SELECT *
-            FROM verres_staging
-            WHERE id = @verre_id
-        """
-
-        results = execute_query(query, (verre_id,))
-        if not results:
-            logger.warning(f"Verre staging avec ID {verre_id} non trouvé")
-            return None
-
         with get_db_connection() as conn:
             cursor = conn.cursor()
+            # Requête SQL optimisée pour Azure
+            query = """
+                SELECT *
+                FROM verres_staging
+                WHERE id = ?
+            """
+            cursor.execute(query, (verre_id,))
+
+            # Colonnes lues sur le même curseur que les résultats
             columns = [column[0] for column in cursor.description]
+            results = cursor.fetchall()
+
+            if not results:
+                logger.warning(f"Verre staging avec ID {verre_id} non trouvé")
+                return None
+
             return create_verre_dict(results[0], columns)
 
     except Exception as e:
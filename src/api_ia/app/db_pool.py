@@ -0,0 +1,236 @@
+"""
+Pool de connexions à la base de données, partagé entre threads.
+
+Ouvrir une connexion Azure SQL coûte une poignée de main TLS et une
+authentification (plusieurs dizaines de millisecondes) : le pool les garde
+ouvertes et les prête à chaque requête.
+
+- taille bornée : au plus ``max_size`` connexions ouvertes ; au-delà, l'appelant
+  attend qu'une connexion soit rendue, au plus ``timeout`` secondes
+  (``PoolTimeoutError`` ensuite) ;
+- ``min_size`` connexions restent ouvertes même inactives (``warm`` les ouvre
+  d'avance) ; les autres sont fermées après ``max_idle_seconds`` d'inactivité ;
+- une connexion inactive depuis plus de ``max_idle_seconds`` est recyclée
+  (fermée puis rouverte) avant d'être prêtée : le serveur coupe les sessions
+  inactives trop longtemps ;
+- une connexion inactive depuis plus de ``health_check_interval`` secondes est
+  vérifiée (``health_check_query``) avant d'être prêtée ;
+- une connexion rendue est remise à zéro (``rollback``) ; si une exception sort
+  du bloc ``with pool.connection()``, elle est fermée plutôt que réutilisée.
+
+Le pool ne dépend que de la fabrique ``connect`` : il fonctionne aussi bien avec
+``pyodbc`` qu'avec ``sqlite3`` (tests, benchmark).
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(TimeoutError):
+    """Levée quand aucune connexion ne s'est libérée dans le délai imparti."""
+
+
+class ConnectionPool:
+    """
+    Pool de connexions DB-API thread-safe.
+
+    Args:
+        connect (Callable[[], Any]): Fabrique d'une nouvelle connexion.
+        min_size (int): Connexions conservées ouvertes même inactives.
+        max_size (int): Nombre maximal de connexions ouvertes (prêtées + inactives).
+        timeout (float): Attente maximale d'une connexion libre, en secondes.
+        max_idle_seconds (float): Inactivité au-delà de laquelle une connexion est fermée ou recyclée.
+        health_check_interval (float): Inactivité au-delà de laquelle une connexion est vérifiée avant d'être prêtée.
+        health_check_query (str): Requête de vérification.
+        clock (Callable[[], float]): Horloge monotone, en secondes.
+        on_wait (Callable[[float], None], optional): Appelé avec le temps d'obtention de chaque connexion.
+        on_timeout (Callable[[], None], optional): Appelé à chaque ``PoolTimeoutError``.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 5.0,
+        max_idle_seconds: float = 300.0,
+        health_check_interval: float = 30.0,
+        health_check_query: str = "SELECT 1",
+        clock: Callable[[], float] = time.monotonic,
+        on_wait: Optional[Callable[[float], None]] = None,
+        on_timeout: Optional[Callable[[], None]] = None,
+    ):
+        self.connect = connect
+        self.max_size = max(1, max_size)
+        self.min_size = min(max(0, min_size), self.max_size)
+        self.timeout = timeout
+        self.max_idle_seconds = max_idle_seconds
+        self.health_check_interval = health_check_interval
+        self.health_check_query = health_check_query
+        self.clock = clock
+        self.on_wait = on_wait
+        self.on_timeout = on_timeout
+        self._idle: "deque[tuple]" = deque()  # (connexion, date de retour), la plus récente à droite
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def size(self) -> int:
+        """Connexions ouvertes (prêtées + inactives)."""
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        """Connexions ouvertes disponibles."""
+        return len(self._idle)
+
+    @property
+    def in_use(self) -> int:
+        """Connexions actuellement prêtées."""
+        return self._size - len(self._idle)
+
+    def warm(self):
+        """Ouvre des connexions jusqu'à ``min_size``."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self.connect()
+            except BaseException:
+                self._forget()
+                raise
+            self.release(conn)
+
+    @contextmanager
+    def connection(self):
+        """
+        Prête une connexion pour la durée du bloc.
+
+        Raises:
+            PoolTimeoutError: Si aucune connexion ne se libère dans ``timeout`` secondes.
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn, discard=True)
+            raise
+        self.release(conn)
+
+    def acquire(self):
+        """Emprunte une connexion (à rendre avec ``release``)."""
+        start = self.clock()
+        deadline = start + self.timeout
+        while True:
+            conn, returned_at = self._checkout(deadline)
+            try:
+                if conn is None:
+                    conn = self.connect()
+                else:
+                    conn = self._validate(conn, self.clock() - returned_at)
+            except BaseException:
+                self._forget()
+                raise
+            if conn is not None:
+                if self.on_wait:
+                    self.on_wait(self.clock() - start)
+                return conn
+            self._forget()
+
+    def release(self, conn, discard: bool = False):
+        """Rend une connexion au pool (fermée si ``discard`` ou si sa remise à zéro échoue)."""
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception as e:
+                logger.warning(f"Connexion écartée (remise à zéro impossible) : {e}")
+                discard = True
+        with self._cond:
+            if discard or self._closed:
+                self._size -= 1
+            else:
+                self._idle.append((conn, self.clock()))
+                expired = self._expired_idle()
+            self._cond.notify()
+        if discard or self._closed:
+            self._close(conn)
+        else:
+            for old in expired:
+                self._close(old)
+
+    def close(self):
+        """Ferme les connexions inactives ; celles qui sont prêtées le seront à leur retour."""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close(conn)
+
+    def _checkout(self, deadline: float):
+        """Réserve une connexion inactive, ou une place pour en ouvrir une (connexion None)."""
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Pool de connexions fermé")
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None, None
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+        if self.on_timeout:
+            self.on_timeout()
+        raise PoolTimeoutError(f"Aucune connexion libre après {self.timeout:.1f}s ({self.max_size} connexions prêtées)")
+
+    def _validate(self, conn, idle_for: float):
+        """Recycle ou vérifie une connexion inactive ; None si elle est inutilisable."""
+        if idle_for > self.max_idle_seconds:
+            self._close(conn)
+            return self.connect()
+        if idle_for > self.health_check_interval:
+            try:
+                cursor = conn.cursor()
+                cursor.execute(self.health_check_query)
+                cursor.fetchall()
+            except Exception as e:
+                logger.warning(f"Connexion écartée (vérification échouée) : {e}")
+                self._close(conn)
+                return None
+        return conn
+
+    def _expired_idle(self):
+        """Retire (sous verrou) les connexions inactives au-delà de ``min_size`` et de ``max_idle_seconds``."""
+        expired = []
+        limit = self.clock() - self.max_idle_seconds
+        while self._idle and self._size > self.min_size and self._idle[0][1] < limit:
+            expired.append(self._idle.popleft()[0])
+            self._size -= 1
+        return expired
+
+    def _forget(self):
+        """Libère la place d'une connexion qui n'a pas pu être ouverte ou a été écartée."""
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -0,0 +1,200 @@
+"""
+Cache d'embeddings adressé par contenu.
+
+La clé est le SHA-256 des octets de l'image préfixé par la version du modèle
+(poids, prétraitement, moteur d'inférence, références) : une image renvoyée à
+l'identique retrouve son embedding, et ses correspondances top-k, sans
+décodage ni passe forward ; un changement de modèle invalide toutes les
+entrées sans purge explicite.
+
+Deux niveaux :
+
+- mémoire : LRU borné en nombre d'entrées ;
+- disque (optionnel) : un fichier JSON par entrée, borné en octets, évincé du
+  moins récemment utilisé (date de modification) au plus récent. Il survit aux
+  redémarrages et est partagé entre workers ; chaque processus ne compte
+  toutefois que les fichiers qu'il a lus ou écrits : avec N workers, le dossier
+  peut atteindre N x ``max_disk_bytes``.
+
+Les méthodes sont bloquantes (hachage, verrou, fichiers) : l'API les appelle
+depuis ``inference_executor``, jamais depuis la boucle d'événements.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(image_bytes: bytes, model_version: str) -> str:
+    """Clé de cache : version du modèle et SHA-256 du contenu de l'image."""
+    return f"{model_version}-{hashlib.sha256(image_bytes).hexdigest()}"
+
+
+class EmbeddingCache:
+    """
+    Cache LRU d'embeddings (et des correspondances top-k associées).
+
+    Chaque entrée est un dict ``{"embedding": np.ndarray, "matches": {k: list}}`` ;
+    les correspondances sont ajoutées au fil des requêtes ``/match``.
+
+    Args:
+        max_entries (int): Nombre maximal d'entrées en mémoire.
+        disk_dir (str, optional): Dossier du niveau disque (désactivé si None).
+        max_disk_bytes (int): Taille maximale du niveau disque pour ce processus.
+        on_hit (Callable[[str], None], optional): Appelé avec le niveau (``memory`` / ``disk``) à chaque succès.
+        on_miss (Callable[[], None], optional): Appelé à chaque échec.
+        on_evict (Callable[[str], None], optional): Appelé avec le niveau à chaque éviction.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        disk_dir: Optional[str] = None,
+        max_disk_bytes: int = 100 * 1024 * 1024,
+        on_hit: Optional[Callable[[str], None]] = None,
+        on_miss: Optional[Callable[[], None]] = None,
+        on_evict: Optional[Callable[[str], None]] = None,
+    ):
+        self.max_entries = max(1, max_entries)
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.on_hit = on_hit
+        self.on_miss = on_miss
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._scan_disk()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def disk_bytes(self) -> int:
+        """Taille occupée par le niveau disque."""
+        return self._disk_bytes
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Retourne l'entrée (promue en tête du LRU) ou None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                tier = "memory"
+            else:
+                entry = self._read_disk(key)
+                if entry is not None:
+                    self._insert(key, entry)
+                tier = "disk"
+        if entry is None:
+            if self.on_miss:
+                self.on_miss()
+        elif self.on_hit:
+            self.on_hit(tier)
+        return entry
+
+    def put(self, key: str, embedding: np.ndarray, k: Optional[int] = None, matches: Optional[List[Dict]] = None):
+        """
+        Enregistre un embedding et, si fournies, ses ``k`` meilleures correspondances.
+
+        Une entrée existante est complétée (correspondances pour un autre ``k``).
+        """
+        with self._lock:
+            entry = self._entries.get(key) or {"embedding": np.asarray(embedding, dtype=np.float32), "matches": {}}
+            if matches is not None:
+                entry["matches"][k] = matches
+            self._insert(key, entry)
+            self._write_disk(key, entry)
+
+    def clear(self):
+        """Vide le niveau mémoire (le niveau disque est conservé)."""
+        with self._lock:
+            self._entries.clear()
+
+    def _insert(self, key: str, entry: Dict):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            if self.on_evict:
+                self.on_evict("memory")
+
+    # -------------------- Niveau disque --------------------
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _scan_disk(self):
+        """Reprend les entrées existantes, de la moins à la plus récemment utilisée."""
+        files = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".json"):
+                stat = os.stat(os.path.join(self.disk_dir, name))
+                files.append((stat.st_mtime, name[: -len(".json")], stat.st_size))
+        for _, key, size in sorted(files):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _read_disk(self, key: str) -> Optional[Dict]:
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+            data = json.loads(raw)
+            os.utime(path)
+        except FileNotFoundError:
+            self._disk_bytes -= self._disk.pop(key, 0)
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Entrée de cache illisible ignorée ({key}) : {e}")
+            self._disk_bytes -= self._disk.pop(key, 0)
+            return None
+        # L'entrée peut avoir été écrite par un autre worker
+        self._disk_bytes += len(raw) - self._disk.pop(key, 0)
+        self._disk[key] = len(raw)
+        return {
+            "embedding": np.asarray(data["embedding"], dtype=np.float32),
+            "matches": {int(k): matches for k, matches in data["matches"].items()},
+        }
+
+    def _write_disk(self, key: str, entry: Dict):
+        if not self.disk_dir:
+            return
+        payload = json.dumps({"embedding": entry["embedding"].tolist(), "matches": entry["matches"]}).encode("utf-8")
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Impossible d'écrire l'entrée de cache {key} : {e}")
+            return
+        self._disk_bytes += len(payload) - self._disk.pop(key, 0)
+        self._disk[key] = len(payload)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        while self._disk and self._disk_bytes > self.max_disk_bytes:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            if self.on_evict:
+                self.on_evict("disk")
@@ -0,0 +1,94 @@
+"""
+Pool de threads borné pour le travail CPU (décodage, validation, inférence).
+
+Les handlers ``async`` y délèguent tout le travail bloquant afin que la boucle
+d'événements reste disponible (``/health``, ``/metrics``...). Le nombre de
+tâches en cours ou en attente est borné : au-delà, la soumission est refusée
+immédiatement (``ExecutorSaturatedError``, convertie en 503 par l'API) au lieu
+d'allonger indéfiniment la file.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """Levée quand le pool a atteint son nombre maximal de tâches en attente."""
+
+
+class BoundedExecutor(Executor):
+    """
+    ``ThreadPoolExecutor`` avec une limite de tâches en attente et mesure du temps de file.
+
+    Args:
+        max_workers (int): Nombre de threads.
+        max_pending (int): Nombre maximal de tâches en cours + en attente.
+        thread_name_prefix (str): Préfixe des noms de threads.
+        on_queue_time (Callable[[float], None], optional): Appelé avec le temps passé
+            en file (secondes) par chaque tâche au moment où elle démarre.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_pending: int = 32,
+        thread_name_prefix: str = "inference",
+        on_queue_time: Optional[Callable[[float], None]] = None,
+    ):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(self.max_workers, max_pending)
+        self.on_queue_time = on_queue_time
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=thread_name_prefix)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Nombre de tâches en cours ou en attente."""
+        return self._pending
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Soumet une tâche au pool.
+
+        Raises:
+            ExecutorSaturatedError: Si ``max_pending`` tâches sont déjà en cours ou en attente.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise ExecutorSaturatedError(f"Pool saturé ({self._pending} tâches en attente)")
+            self._pending += 1
+
+        submitted_at = time.perf_counter()
+
+        def task():
+            if self.on_queue_time:
+                self.on_queue_time(time.perf_counter() - submitted_at)
+            return fn(*args, **kwargs)
+
+        try:
+            future = self._executor.submit(task)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """
+        Exécute ``fn`` dans le pool et attend son résultat sans bloquer la boucle d'événements.
+
+        Raises:
+            ExecutorSaturatedError: Si le pool est saturé.
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
@@ -0,0 +1,171 @@
+"""
+Identification des images par leur en-tête (format et dimensions), sans libmagic ni décodage.
+
+``security.validate_image_file`` créait un ``magic.Magic`` (chargement de la
+base libmagic) à chaque fichier reçu, puis n'acceptait que les signatures
+JPEG et PNG alors que GIF, BMP et WEBP passaient le contrôle MIME. Les
+quelques octets d'en-tête suffisent à reconnaître les cinq formats acceptés
+et à lire leurs dimensions : une image de 50 000 x 50 000 pixels (bombe de
+décompression : quelques Ko compressés, plusieurs Go une fois décodée) est
+refusée avant que PIL ne l'ouvre.
+
+Formats lus :
+
+- JPEG : segment SOFn (après les éventuels segments APPn / EXIF) ;
+- PNG : segment IHDR ;
+- GIF : descripteur d'écran logique ;
+- BMP : en-tête DIB (BITMAPCOREHEADER ou BITMAPINFOHEADER et suivants) ;
+- WEBP : segments VP8 (avec perte), VP8L (sans perte) ou VP8X (étendu).
+"""
+
+import struct
+from typing import Optional
+
+# Marqueurs JPEG de début de trame (SOF0 à SOF15, sauf DHT, JPG et DAC)
+_JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Marqueurs JPEG sans segment de longueur (RSTn, TEM)
+_JPEG_STANDALONE_MARKERS = set(range(0xD0, 0xD8)) | {0x01}
+
+
+class ImageHeaderError(ValueError):
+    """En-tête absent, tronqué ou d'un format non accepté."""
+
+
+class ImageInfo:
+    """
+    Format et dimensions lus dans l'en-tête d'une image.
+
+    Args:
+        format (str): Format (``JPEG``, ``PNG``, ``GIF``, ``BMP`` ou ``WEBP``).
+        mime_type (str): Type MIME correspondant.
+        width (int): Largeur en pixels.
+        height (int): Hauteur en pixels.
+    """
+
+    def __init__(self, format: str, mime_type: str, width: int, height: int):
+        self.format = format
+        self.mime_type = mime_type
+        self.width = width
+        self.height = height
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+
+    def __repr__(self):
+        return f"ImageInfo({self.format}, {self.width}x{self.height})"
+
+
+def _unpack(fmt: str, data: bytes, offset: int):
+    try:
+        return struct.unpack_from(fmt, data, offset)
+    except struct.error:
+        raise ImageHeaderError("Truncated image header")
+
+
+def _jpeg_size(data: bytes):
+    i = 2
+    while True:
+        if i >= len(data) or data[i] != 0xFF:
+            raise ImageHeaderError("Invalid JPEG marker")
+        # Octets de remplissage 0xFF autorisés avant chaque marqueur
+        while i < len(data) and data[i] == 0xFF:
+            i += 1
+        if i >= len(data):
+            raise ImageHeaderError("Truncated image header")
+        marker = data[i]
+        i += 1
+        if marker in _JPEG_STANDALONE_MARKERS:
+            continue
+        if marker in (0xD9, 0xDA):  # EOI ou SOS avant toute trame
+            raise ImageHeaderError("JPEG without frame header")
+        (length,) = _unpack(">H", data, i)
+        if marker in _JPEG_SOF_MARKERS:
+            height, width = _unpack(">HH", data, i + 3)
+            return width, height
+        if length < 2:
+            raise ImageHeaderError("Invalid JPEG segment length")
+        i += length
+
+
+def _png_size(data: bytes):
+    length, chunk, width, height = _unpack(">I4sII", data, 8)
+    if chunk != b"IHDR" or length != 13:
+        raise ImageHeaderError("PNG without IHDR chunk")
+    return width, height
+
+
+def _gif_size(data: bytes):
+    return _unpack("<HH", data, 6)
+
+
+def _bmp_size(data: bytes):
+    (header_size,) = _unpack("<I", data, 14)
+    if header_size == 12:
+        return _unpack("<HH", data, 18)
+    if header_size < 40:
+        raise ImageHeaderError("Unsupported BMP header")
+    width, height = _unpack("<ii", data, 18)
+    # Hauteur négative : lignes stockées de haut en bas
+    return width, abs(height)
+
+
+def _webp_size(data: bytes):
+    (chunk,) = _unpack("4s", data, 12)
+    if chunk == b"VP8 ":
+        (start_code,) = _unpack("3s", data, 23)
+        if start_code != b"\x9d\x01\x2a":
+            raise ImageHeaderError("Invalid WEBP (VP8) frame")
+        width, height = _unpack("<HH", data, 26)
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        signature, bits = _unpack("<BI", data, 20)
+        if signature != 0x2F:
+            raise ImageHeaderError("Invalid WEBP (VP8L) signature")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        b = _unpack("6B", data, 24)
+        return (b[0] | b[1] << 8 | b[2] << 16) + 1, (b[3] | b[4] << 8 | b[5] << 16) + 1
+    raise ImageHeaderError("Unsupported WEBP chunk")
+
+
+# (format, type MIME, test de signature, lecture des dimensions)
+_FORMATS = (
+    ("JPEG", "image/jpeg", lambda d: d[:3] == b"\xff\xd8\xff", _jpeg_size),
+    ("PNG", "image/png", lambda d: d[:8] == b"\x89PNG\r\n\x1a\n", _png_size),
+    ("GIF", "image/gif", lambda d: d[:6] in (b"GIF87a", b"GIF89a"), _gif_size),
+    ("BMP", "image/bmp", lambda d: d[:2] == b"BM", _bmp_size),
+    ("WEBP", "image/webp", lambda d: d[:4] == b"RIFF" and d[8:12] == b"WEBP", _webp_size),
+)
+
+
+def sniff_mime_type(data: bytes) -> Optional[str]:
+    """Type MIME d'après la signature seule ; None si ce n'est pas un format accepté."""
+    for _, mime_type, matches, _ in _FORMATS:
+        if matches(data):
+            return mime_type
+    return None
+
+
+def read_image_header(data: bytes) -> ImageInfo:
+    """
+    Identifie le format et lit les dimensions d'une image encodée.
+
+    Args:
+        data (bytes): Contenu du fichier (seuls les premiers octets sont lus, sauf
+            pour un JPEG dont la trame suit de longs segments EXIF).
+
+    Returns:
+        ImageInfo: Format, type MIME et dimensions.
+
+    Raises:
+        ImageHeaderError: Si le format n'est pas accepté, l'en-tête est tronqué ou
+            les dimensions sont nulles.
+    """
+    for name, mime_type, matches, size in _FORMATS:
+        if matches(data):
+            width, height = size(data)
+            if width <= 0 or height <= 0:
+                raise ImageHeaderError(f"Invalid {name} dimensions {width}x{height}")
+            return ImageInfo(name, mime_type, width, height)
+    raise ImageHeaderError("Unsupported image format")
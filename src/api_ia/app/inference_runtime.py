@@ -0,0 +1,164 @@
+"""
+Export et exécution de ``EfficientNetEmbedding.forward_one`` hors du mode eager.
+
+Deux formats sont produits à partir du modèle PyTorch :
+
+- TorchScript (``torch.jit.trace`` puis ``torch.jit.freeze``), exécuté par
+  l'interpréteur TorchScript, sans dispatch Python module par module ;
+- ONNX (axe batch dynamique), exécuté par ONNX Runtime sur CPU.
+
+Les modèles chargés exposent la même méthode ``forward_one`` que le modèle
+eager : le reste de l'API (batching, embeddings de référence) est inchangé.
+Le SHA-256 des poids sources est enregistré dans le fichier exporté afin de
+détecter un export périmé au chargement.
+"""
+
+import json
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+logger = logging.getLogger(__name__)
+
+RUNTIMES = ("eager", "fused", "torchscript", "onnx", "int8_dynamic", "int8_static")
+# Les embeddings INT8 diffèrent de ceux du float32 ; leurs opérateurs n'existent que sur CPU
+QUANTIZED_RUNTIMES = ("int8_dynamic", "int8_static")
+ONNX_INPUT_NAME = "image"
+ONNX_OUTPUT_NAME = "embedding"
+ONNX_OPSET = 17
+TORCHSCRIPT_METADATA_FILE = "metadata.json"
+
+
+class ForwardOne(nn.Module):
+    """Expose ``model.forward_one`` comme ``forward`` pour le traçage et l'export."""
+
+    def __init__(self, model: nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.model.forward_one(x)
+
+
+def example_input(image_size: int, batch_size: int = 2) -> torch.Tensor:
+    """Entrée d'exemple (B, 1, H, W) utilisée pour le traçage."""
+    return torch.randn(batch_size, 1, image_size, image_size)
+
+
+def export_torchscript(model: nn.Module, path: str, image_size: int, metadata: Optional[Dict] = None) -> str:
+    """
+    Trace ``forward_one`` et enregistre un module TorchScript figé.
+
+    Args:
+        model (nn.Module): Modèle eager en mode ``eval``.
+        path (str): Fichier ``.pt`` à écrire.
+        image_size (int): Côté des images d'entrée.
+        metadata (dict, optional): Métadonnées enregistrées avec le module.
+
+    Returns:
+        str: Chemin écrit.
+    """
+    model = ForwardOne(model.cpu().eval()).eval()
+    with torch.no_grad():
+        traced = torch.jit.freeze(torch.jit.trace(model, example_input(image_size)))
+    torch.jit.save(traced, path, _extra_files={TORCHSCRIPT_METADATA_FILE: json.dumps(metadata or {})})
+    return path
+
+
+def export_onnx(model: nn.Module, path: str, image_size: int, metadata: Optional[Dict] = None, opset: int = ONNX_OPSET) -> str:
+    """
+    Exporte ``forward_one`` au format ONNX avec un axe batch dynamique.
+
+    Args:
+        model (nn.Module): Modèle eager en mode ``eval``.
+        path (str): Fichier ``.onnx`` à écrire.
+        image_size (int): Côté des images d'entrée.
+        metadata (dict, optional): Métadonnées enregistrées dans ``metadata_props``.
+        opset (int): Version d'opset ONNX.
+
+    Returns:
+        str: Chemin écrit.
+    """
+    import onnx
+
+    model = ForwardOne(model.cpu().eval()).eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (example_input(image_size),),
+            path,
+            input_names=[ONNX_INPUT_NAME],
+            output_names=[ONNX_OUTPUT_NAME],
+            dynamic_axes={ONNX_INPUT_NAME: {0: "batch"}, ONNX_OUTPUT_NAME: {0: "batch"}},
+            opset_version=opset,
+        )
+    if metadata:
+        proto = onnx.load(path)
+        for key, value in metadata.items():
+            proto.metadata_props.add(key=key, value=str(value))
+        onnx.save(proto, path)
+    return path
+
+
+class TorchScriptModel:
+    """Module TorchScript exporté par ``export_torchscript``."""
+
+    runtime = "torchscript"
+
+    def __init__(self, path: str, device: str = "cpu", runtime: str = "torchscript"):
+        self.runtime = runtime
+        extra_files = {TORCHSCRIPT_METADATA_FILE: ""}
+        self.device = device
+        self.module = torch.jit.load(path, map_location=device, _extra_files=extra_files)
+        self.module.eval()
+        self.metadata = json.loads(extra_files[TORCHSCRIPT_METADATA_FILE] or "{}")
+
+    def forward_one(self, x: torch.Tensor) -> torch.Tensor:
+        return self.module(x.to(self.device))
+
+    def eval(self):
+        return self
+
+
+class OnnxRuntimeModel:
+    """
+    Session ONNX Runtime (CPU) sur un modèle exporté par ``export_onnx``.
+
+    Args:
+        path (str): Fichier ``.onnx``.
+        intra_op_threads (int): Threads par opérateur (0 = choix d'ONNX Runtime).
+    """
+
+    runtime = "onnx"
+
+    def __init__(self, path: str, intra_op_threads: int = 0):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.metadata = dict(self.session.get_modelmeta().custom_metadata_map)
+
+    def forward_one(self, x: torch.Tensor) -> torch.Tensor:
+        inputs = np.ascontiguousarray(x.detach().cpu().numpy(), dtype=np.float32)
+        (embeddings,) = self.session.run([ONNX_OUTPUT_NAME], {ONNX_INPUT_NAME: inputs})
+        return torch.from_numpy(embeddings)
+
+    def eval(self):
+        return self
+
+
+def check_export_metadata(exported, expected: Dict) -> bool:
+    """Signale (log) un modèle exporté dont les métadonnées ne correspondent pas aux poids courants."""
+    stale = {key: value for key, value in expected.items() if str(exported.metadata.get(key)) != str(value)}
+    if stale:
+        logger.warning(
+            f"Modèle {exported.runtime} exporté depuis d'autres poids ({', '.join(stale)}) : "
+            "relancer api_ia.scripts.export_model ou api_ia.scripts.quantize_model"
+        )
+    return not stale
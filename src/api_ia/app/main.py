@@ -2,41 +2,71 @@
 API FastAPI pour la classification des verres
 """
 
+import asyncio
+import json
 import logging
-import io
 import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List
+from typing import Any, Awaitable, Dict, List, Literal, Optional
 from datetime import datetime
-from PIL import Image
-from dotenv import load_dotenv
-from fastapi import FastAPI, UploadFile, File, Request, Depends, HTTPException, status, Body
+from fastapi import FastAPI, UploadFile, File, Request, Depends, HTTPException, status, Body, Query
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
-from starlette.responses import Response
-
-from api_ia.app.model_loader import load_model, preprocess_image, get_embedding
-from api_ia.app.similarity_search import get_top_matches, load_references
-from api_ia.app.database import find_matching_verres, get_verre_details
+from prometheus_client import Counter, Gauge, Histogram, Info, generate_latest, CONTENT_TYPE_LATEST
+from starlette.responses import JSONResponse, Response, StreamingResponse
+
+from api_ia.app.model_loader import load_model, embed_images, PREPROCESSOR
+from api_ia.app.model_state import ModelBundle, ModelHolder, ModelNotReadyError
+from api_ia.app.batching import MicroBatcher
+from api_ia.app.executor import BoundedExecutor, ExecutorSaturatedError
+from api_ia.app.batch_upload import BatchInputError, expand_batch
+from api_ia.app.embedding_cache import EmbeddingCache, cache_key
+from api_ia.app.tag_index import TagIndexRefresher
+from api_ia.app.ttl_cache import TTLCache
+from api_ia.app import similarity_search
+from api_ia.app.similarity_search import load_references
+from api_ia.app import async_database, database
+from api_ia.app.database import find_verres_details_by_tags
+from api_ia.app.tags import normalize_tag
 from api_ia.app.security import (
-    authenticate_user,
     create_access_token,
-    get_user,
     verify_token,
     validate_image_file,
     log_security_event,
+    user_cache,
 )
 from api_ia.app.middleware.security import SecurityHeadersMiddleware
-from api_ia.app.config import ADMIN_EMAIL, ADMIN_PASSWORD, API_TITLE, API_VERSION, API_DESCRIPTION
+from api_ia.app.config import (
+    ADMIN_EMAIL,
+    ADMIN_PASSWORD,
+    API_TITLE,
+    API_VERSION,
+    API_DESCRIPTION,
+    BATCHING_ENABLED,
+    BATCH_MAX_SIZE,
+    BATCH_MAX_WAIT_MS,
+    INFERENCE_WORKERS,
+    INFERENCE_MAX_PENDING,
+    MATCH_BATCH_MAX_ITEMS,
+    MATCH_BATCH_MAX_BYTES,
+    MODEL_WATCH_SECONDS,
+    MODEL_WEIGHTS_PATH,
+    EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_CACHE_SIZE,
+    EMBEDDING_CACHE_DIR,
+    EMBEDDING_CACHE_MAX_DISK_MB,
+    TAG_INDEX_ENABLED,
+    TAG_INDEX_REFRESH_SECONDS,
+    VERRE_CACHE_SIZE,
+    VERRE_CACHE_TTL_SECONDS,
+    VERRES_BULK_MAX_IDS,
+)
 from api_ia.app.openapi_config import setup_openapi
-from pydantic import BaseModel
-
-# Load env variables
-load_dotenv()
+from pydantic import BaseModel, Field
 
 # Logging config
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -52,21 +82,100 @@ MATCH_REQUEST_COUNT = Counter("match_requests_total", "Total /match requests")
 MATCH_REQUEST_ERRORS = Counter("match_request_errors_total", "Errors in /match requests")
 MATCH_LATENCY = Histogram("match_latency_seconds", "Latency for /match")
 
+# Cache d'embeddings (/match, /embedding)
+EMBEDDING_CACHE_HITS = Counter("embedding_cache_hits_total", "Embedding cache hits", ["tier"])
+EMBEDDING_CACHE_MISSES = Counter("embedding_cache_misses_total", "Embedding cache misses")
+EMBEDDING_CACHE_EVICTIONS = Counter("embedding_cache_evictions_total", "Embedding cache evictions", ["tier"])
+
+# Cache des utilisateurs (get_current_user)
+USER_CACHE_HITS = Counter("user_cache_hits_total", "User lookups served from the cache")
+USER_CACHE_MISSES = Counter("user_cache_misses_total", "User lookups that queried the database")
+USER_CACHE_HIT_RATIO = Gauge("user_cache_hit_ratio", "Share of user lookups served from the cache since startup")
+USER_CACHE_AVOIDED_DB_SECONDS = Counter(
+    "user_cache_avoided_db_seconds_total", "Estimated database latency avoided by user cache hits"
+)
+USER_DB_LOOKUP_LATENCY = Histogram("user_db_lookup_seconds", "Latency of user lookups in the database")
+
+# Pool de connexions à la base
+DB_POOL_SIZE = Gauge("db_pool_connections", "Open database connections (in use + idle)")
+DB_POOL_IN_USE = Gauge("db_pool_connections_in_use", "Database connections currently borrowed")
+DB_POOL_WAIT = Histogram(
+    "db_pool_acquire_seconds",
+    "Time to obtain a database connection from the pool (wait + connect)",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+DB_POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "Database connection requests that timed out")
+DB_EXECUTOR_QUEUE_TIME = Histogram(
+    "db_executor_queue_seconds",
+    "Time spent waiting for a database worker thread",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+DB_EXECUTOR_PENDING = Gauge("db_executor_pending", "Database reads running or queued in the database pool")
+DB_EXECUTOR_REJECTED = Counter("db_executor_rejected_total", "Requests rejected with 503 (database pool saturated)")
+
 # /embedding
 EMBED_REQUEST_COUNT = Counter("embedding_requests_total", "Total /embedding requests")
 EMBED_REQUEST_ERRORS = Counter("embedding_request_errors_total", "Errors in /embedding requests")
 EMBED_LATENCY = Histogram("embedding_latency_seconds", "Latency for /embedding")
 
+# /match_batch
+MATCH_BATCH_REQUEST_COUNT = Counter("match_batch_requests_total", "Total /match_batch requests")
+MATCH_BATCH_REQUEST_ERRORS = Counter("match_batch_request_errors_total", "Errors in /match_batch requests")
+MATCH_BATCH_ITEM_ERRORS = Counter("match_batch_item_errors_total", "Images rejected inside /match_batch requests")
+MATCH_BATCH_LATENCY = Histogram("match_batch_latency_seconds", "Latency for /match_batch")
+MATCH_BATCH_ITEMS = Histogram("match_batch_items", "Images per /match_batch request", buckets=(1, 2, 5, 10, 20, 50, 100))
+
+# /identify (match → tags → détails)
+IDENTIFY_REQUEST_COUNT = Counter("identify_requests_total", "Total /identify requests")
+IDENTIFY_REQUEST_ERRORS = Counter("identify_request_errors_total", "Errors in /identify requests")
+IDENTIFY_LATENCY = Histogram("identify_latency_seconds", "Latency for /identify")
+IDENTIFY_STAGE_LATENCY = Histogram("identify_stage_seconds", "Latency of each /identify stage", ["stage"])
+
 # /search_tags
 SEARCH_TAGS_COUNT = Counter("search_tags_requests_total", "Total /search_tags requests")
 SEARCH_TAGS_ERRORS = Counter("search_tags_errors_total", "Errors in /search_tags")
 SEARCH_TAGS_LATENCY = Histogram("search_tags_latency_seconds", "Latency for /search_tags")
 
+# Index des tags en mémoire
+TAG_INDEX_VERRES = Gauge("tag_index_verres", "Verres held in the in-memory tag index")
+TAG_INDEX_TAGS = Gauge("tag_index_tags", "Distinct tags in the in-memory tag index")
+TAG_INDEX_AGE = Gauge("tag_index_refresh_age_seconds", "Seconds since the last successful tag index refresh")
+TAG_INDEX_REFRESH_LATENCY = Histogram("tag_index_refresh_seconds", "Duration of tag index refreshes", ["kind"])
+
+# /verres/bulk et cache des détails de verres
+VERRES_BULK_COUNT = Counter("verres_bulk_requests_total", "Total /verres/bulk requests")
+VERRES_BULK_ERRORS = Counter("verres_bulk_errors_total", "Errors in /verres/bulk")
+VERRES_BULK_LATENCY = Histogram("verres_bulk_latency_seconds", "Latency for /verres/bulk (until the last byte)")
+VERRES_BULK_IDS = Histogram("verres_bulk_ids", "Ids per /verres/bulk request", buckets=(1, 5, 10, 20, 50, 100, 200))
+VERRE_CACHE_HITS = Counter("verre_cache_hits_total", "Verre details served from the cache")
+VERRE_CACHE_MISSES = Counter("verre_cache_misses_total", "Verre details read from the database")
+
 # /verre/{id}
 VERRE_DETAIL_COUNT = Counter("verre_details_requests_total", "Total /verre/{id} requests")
 VERRE_DETAIL_ERRORS = Counter("verre_details_errors_total", "Errors in /verre/{id}")
 VERRE_DETAIL_LATENCY = Histogram("verre_details_latency_seconds", "Latency for /verre/{id}")
 
+# Micro-batching des inférences
+INFERENCE_QUEUE_DEPTH = Gauge("inference_queue_depth", "Images waiting for an inference batch")
+INFERENCE_BATCH_SIZE = Histogram(
+    "inference_batch_size", "Images per batched forward pass", buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+
+# Chargement du modèle en tâche de fond
+MODEL_READY = Gauge("model_ready", "1 once the model and references are loaded")
+MODEL_LOAD_SECONDS = Gauge("model_load_seconds", "Duration of the last successful model load")
+MODEL_INFO = Info("model", "Active model version")
+MODEL_LOADS = Counter("model_loads_total", "Model loads and hot reloads", ["result"])
+
+# Pool d'inférence (décodage, validation, forward)
+EXECUTOR_QUEUE_TIME = Histogram(
+    "inference_executor_queue_seconds",
+    "Time spent waiting for an inference worker thread",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+EXECUTOR_PENDING = Gauge("inference_executor_pending", "Tasks running or queued in the inference pool")
+EXECUTOR_REJECTED = Counter("inference_executor_rejected_total", "Requests rejected with 503 (inference pool saturated)")
+
 # -------------------- FastAPI Setup --------------------
 
 limiter = Limiter(key_func=get_remote_address)
@@ -95,14 +204,357 @@ setup_openapi(app)
 
 # -------------------- Model Load --------------------
 
-try:
+
+def load_bundle(report) -> ModelBundle:
+    """Charge le modèle puis les embeddings de référence (bloquant), en signalant la progression."""
+    report("model")
     logger.info("Loading model...")
     model = load_model()
-    load_references(model)
+    report("references")
+    references = load_references(model, on_progress=lambda done, total: report("references", done / total))
     logger.info("Model and references loaded")
-except Exception as e:
-    logger.error(f"Error loading model or references: {e}")
-    raise
+    return ModelBundle(model, references, similarity_search.model_version)
+
+
+def model_loaded(bundle: ModelBundle, seconds: float):
+    MODEL_LOAD_SECONDS.set(seconds)
+    MODEL_INFO.info({"version": bundle.version or ""})
+    MODEL_LOADS.labels(result="success").inc()
+
+
+# Chargé au démarrage en tâche de fond (ou par le maître gunicorn avant le fork, voir gunicorn.conf.py),
+# rechargé à chaud par /admin/reload_model ou quand les poids changent (MODEL_WATCH_SECONDS)
+model_holder = ModelHolder(
+    load_bundle, on_loaded=model_loaded, on_failed=lambda error: MODEL_LOADS.labels(result="failure").inc()
+)
+MODEL_READY.set_function(lambda: 1 if model_holder.ready else 0)
+
+# Tout le travail CPU (décodage, validation, forward) quitte la boucle d'événements
+inference_executor = BoundedExecutor(
+    max_workers=INFERENCE_WORKERS,
+    max_pending=INFERENCE_MAX_PENDING,
+    on_queue_time=EXECUTOR_QUEUE_TIME.observe,
+)
+EXECUTOR_PENDING.set_function(lambda: inference_executor.pending)
+
+
+def embed_batch(items: list) -> list:
+    """
+    Embeddings d'un lot de couples (modèle, image décodée).
+
+    Un rechargement peut survenir entre deux soumissions : chaque image est encodée
+    par le modèle de sa requête, une passe forward par modèle présent dans le lot.
+    """
+    embeddings = [None] * len(items)
+    groups = {}
+    for i, (bundle, _) in enumerate(items):
+        groups.setdefault(id(bundle), (bundle, []))[1].append(i)
+    for bundle, positions in groups.values():
+        for i, embedding in zip(positions, embed_images(bundle.model, [items[i][1] for i in positions])):
+            embeddings[i] = embedding
+    return embeddings
+
+
+# Regroupe les inférences concurrentes de /match et /embedding en une passe forward
+embedding_batcher = MicroBatcher(
+    embed_batch,
+    max_batch_size=BATCH_MAX_SIZE if BATCHING_ENABLED else 1,
+    max_wait_ms=BATCH_MAX_WAIT_MS if BATCHING_ENABLED else 0,
+    executor=inference_executor,
+    on_batch=INFERENCE_BATCH_SIZE.observe,
+)
+INFERENCE_QUEUE_DEPTH.set_function(lambda: embedding_batcher.queue_depth)
+
+
+# Réponses déjà calculées pour des images envoyées à l'identique
+embedding_cache = (
+    EmbeddingCache(
+        max_entries=EMBEDDING_CACHE_SIZE,
+        disk_dir=EMBEDDING_CACHE_DIR or None,
+        max_disk_bytes=EMBEDDING_CACHE_MAX_DISK_MB * 1024 * 1024,
+        on_hit=lambda tier: EMBEDDING_CACHE_HITS.labels(tier=tier).inc(),
+        on_miss=EMBEDDING_CACHE_MISSES.inc,
+        on_evict=lambda tier: EMBEDDING_CACHE_EVICTIONS.labels(tier=tier).inc(),
+    )
+    if EMBEDDING_CACHE_ENABLED
+    else None
+)
+
+database.pool.on_wait = DB_POOL_WAIT.observe
+database.pool.on_timeout = DB_POOL_TIMEOUTS.inc
+DB_POOL_SIZE.set_function(lambda: database.pool.size)
+DB_POOL_IN_USE.set_function(lambda: database.pool.in_use)
+async_database.db_executor.on_queue_time = DB_EXECUTOR_QUEUE_TIME.observe
+DB_EXECUTOR_PENDING.set_function(lambda: async_database.db_executor.pending)
+
+# Chaque succès du cache utilisateur épargne en moyenne la latence observée des lectures en base
+user_cache.on_hit = lambda avoided: (USER_CACHE_HITS.inc(), USER_CACHE_AVOIDED_DB_SECONDS.inc(avoided))
+user_cache.on_miss = lambda elapsed: (USER_CACHE_MISSES.inc(), USER_DB_LOOKUP_LATENCY.observe(elapsed))
+USER_CACHE_HIT_RATIO.set_function(lambda: user_cache.hit_ratio)
+
+# Détails des verres déjà lus ; les lignes modifiées sont invalidées par le rafraîchissement de l'index des tags
+verre_cache = TTLCache(max_entries=VERRE_CACHE_SIZE, ttl_seconds=VERRE_CACHE_TTL_SECONDS)
+
+
+def load_all_tagged_verres():
+    verres, version = database.fetch_tagged_verres()
+    verre_cache.clear()
+    return verres, version
+
+
+def load_changed_verres(since_version):
+    verres, version = database.fetch_tagged_verres(since_version)
+    for verre in verres:
+        verre_cache.invalidate(verre["id"])
+    return verres, version
+
+
+# Recherches par tags servies depuis la mémoire, rafraîchie depuis la base en tâche de fond
+tag_index_refresher = TagIndexRefresher(
+    load_all=load_all_tagged_verres,
+    load_changes=load_changed_verres,
+    count=database.count_tagged_verres,
+    interval=TAG_INDEX_REFRESH_SECONDS,
+    on_refresh=lambda seconds, full: TAG_INDEX_REFRESH_LATENCY.labels(kind="full" if full else "incremental").observe(seconds),
+)
+TAG_INDEX_VERRES.set_function(lambda: len(tag_index_refresher.index or ()))
+TAG_INDEX_TAGS.set_function(lambda: tag_index_refresher.index.n_tags if tag_index_refresher.index else 0)
+TAG_INDEX_AGE.set_function(lambda: tag_index_refresher.age)
+
+MATCH_TOP_K = 5
+
+
+class InvalidImageError(ValueError):
+    """Fichier refusé par la validation (taille, type MIME, signature)."""
+
+
+def decode_image(image_bytes: bytes):
+    """
+    Valide, décode (JPEG à échelle réduite) et redimensionne une image en niveaux de gris.
+    Bloquant : exécuté dans ``inference_executor``.
+
+    Raises:
+        InvalidImageError: Si le fichier n'est pas une image autorisée.
+    """
+    if not validate_image_file(image_bytes):
+        raise InvalidImageError("Invalid image file")
+    return PREPROCESSOR.decode(image_bytes)
+
+
+# Version du modèle qui a produit la réponse (voir /ready pour la version active)
+MODEL_VERSION_HEADER = "X-Model-Version"
+
+
+def current_bundle() -> ModelBundle:
+    """
+    Modèle et références chargés.
+
+    Raises:
+        HTTPException: 503 tant que le chargement n'est pas terminé (ou s'il a échoué).
+    """
+    try:
+        return model_holder.require()
+    except ModelNotReadyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+
+async def embed_image(bundle: ModelBundle, image_bytes: bytes):
+    """
+    Calcule l'embedding d'une image avec le modèle ``bundle`` sans bloquer la boucle d'événements.
+
+    Raises:
+        HTTPException: 400 si l'image est invalide, 503 si le pool d'inférence est saturé.
+    """
+    try:
+        image = await inference_executor.run(decode_image, image_bytes)
+        return await embedding_batcher.submit((bundle, image))
+    except InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExecutorSaturatedError:
+        EXECUTOR_REJECTED.inc()
+        raise HTTPException(status_code=503, detail="Inference capacity exceeded, retry later", headers={"Retry-After": "1"})
+
+
+def decode_images(images: List[bytes]) -> list:
+    """Décode une partie d'un lot ; chaque élément est une image décodée ou l'exception qui l'a rejetée."""
+    decoded = []
+    for image_bytes in images:
+        try:
+            decoded.append(decode_image(image_bytes))
+        except Exception as e:
+            decoded.append(e)
+    return decoded
+
+
+def embed_and_match(bundle: ModelBundle, images: list, k: int = 5) -> list:
+    """Une passe forward pour tout le lot puis une recherche top-k matricielle."""
+    return bundle.references.search_batch(embed_images(bundle.model, images), k)
+
+
+async def match_images(bundle: ModelBundle, images: List[bytes]) -> list:
+    """
+    Identifie un lot d'images : décodage en parallèle, une passe forward, une recherche matricielle.
+
+    Returns:
+        list: Pour chaque image, dans l'ordre, la liste des correspondances ou l'exception
+        qui l'a rejetée.
+
+    Raises:
+        HTTPException: 503 si le pool d'inférence est saturé.
+    """
+    # Un bloc contigu par thread : le lot occupe au plus INFERENCE_WORKERS places du pool
+    n_chunks = min(len(images), inference_executor.max_workers)
+    size = -(-len(images) // n_chunks)
+    try:
+        chunks = await asyncio.gather(
+            *[inference_executor.run(decode_images, images[i : i + size]) for i in range(0, len(images), size)]
+        )
+        decoded = [item for chunk in chunks for item in chunk]
+        valid = [i for i, item in enumerate(decoded) if not isinstance(item, Exception)]
+        if valid:
+            matches = await inference_executor.run(embed_and_match, bundle, [decoded[i] for i in valid])
+            for i, item_matches in zip(valid, matches):
+                decoded[i] = item_matches
+        return decoded
+    except ExecutorSaturatedError:
+        EXECUTOR_REJECTED.inc()
+        raise HTTPException(status_code=503, detail="Inference capacity exceeded, retry later", headers={"Retry-After": "1"})
+
+
+def read_cache(image_bytes: bytes, version: Optional[str]):
+    """Clé de cache de l'image (SHA-256 du contenu) et entrée correspondante. Bloquant : exécuté dans ``inference_executor``."""
+    key = cache_key(image_bytes, version)
+    return key, embedding_cache.get(key)
+
+
+async def cache_lookup(image_bytes: bytes, version: Optional[str]):
+    """
+    Retourne la clé de cache de l'image et l'entrée correspondante (None si absente ou cache désactivé).
+
+    Le hachage et la lecture (verrou du cache, niveau disque) ne bloquent pas la boucle d'événements.
+
+    Raises:
+        HTTPException: 503 si le pool d'inférence est saturé.
+    """
+    if embedding_cache is None:
+        return None, None
+    try:
+        return await inference_executor.run(read_cache, image_bytes, version)
+    except ExecutorSaturatedError:
+        EXECUTOR_REJECTED.inc()
+        raise HTTPException(status_code=503, detail="Inference capacity exceeded, retry later", headers={"Retry-After": "1"})
+
+
+def cache_store(key, embedding, k=None, matches=None):
+    """Enregistre l'entrée dans ``inference_executor`` sans l'attendre ; ignorée si le pool est saturé."""
+    if key is None:
+        return
+    try:
+        inference_executor.submit(embedding_cache.put, key, embedding, k, matches)
+    except ExecutorSaturatedError:
+        pass
+
+
+async def match_image(bundle: ModelBundle, image_bytes: bytes, k: int = MATCH_TOP_K) -> List[dict]:
+    """Top-k des classes pour une image avec le modèle ``bundle``, servi depuis le cache d'embeddings si possible."""
+    key, cached = await cache_lookup(image_bytes, bundle.version)
+    if cached is not None and k in cached["matches"]:
+        return cached["matches"][k]
+    embedding = cached["embedding"] if cached is not None else await embed_image(bundle, image_bytes)
+    matches = bundle.references.search(embedding, k)
+    cache_store(key, embedding, k, matches)
+    return matches
+
+
+def split_cached_verres(verre_ids: List[int]):
+    """Sépare les ids (dédoublonnés) en détails présents dans le cache et ids à lire en base."""
+    cached, missing = {}, []
+    for verre_id in dict.fromkeys(verre_ids):
+        verre = verre_cache.get(verre_id)
+        if verre is None:
+            missing.append(verre_id)
+        else:
+            cached[verre_id] = verre
+    VERRE_CACHE_HITS.inc(len(cached))
+    VERRE_CACHE_MISSES.inc(len(missing))
+    return cached, missing
+
+
+async def db_read(read: Awaitable):
+    """
+    Attend une lecture de ``async_database``.
+
+    Raises:
+        HTTPException: 503 si le pool de threads de la base est saturé.
+    """
+    try:
+        return await read
+    except ExecutorSaturatedError:
+        DB_EXECUTOR_REJECTED.inc()
+        raise HTTPException(status_code=503, detail="Database capacity exceeded, retry later", headers={"Retry-After": "1"})
+
+
+async def cached_verres_details(verre_ids: List[int]) -> dict:
+    """Détails des verres par id : cache, puis une requête ``WHERE id IN (...)`` pour les autres."""
+    verres, missing = split_cached_verres(verre_ids)
+    if missing:
+        for verre_id, verre in (await db_read(async_database.get_verres_details(missing))).items():
+            verre_cache.put(verre_id, verre)
+            verres[verre_id] = verre
+    return verres
+
+
+def stream_verres_bulk(verres: dict, missing: List[int], start_time: float):
+    """
+    Corps JSON de /verres/bulk, sérialisé au fil de l'envoi : ``{"verres": [...], "missing": [...]}``.
+
+    Les verres sont déjà lus : l'envoi, au rythme du client, ne retient ni connexion ni thread de la base.
+    """
+    try:
+        yield '{"verres": ['
+        separator = ""
+        for verre in verres.values():
+            yield separator + json.dumps(verre, ensure_ascii=False, default=str)
+            separator = ","
+        yield f'], "missing": {json.dumps(missing)}}}'
+    finally:
+        VERRES_BULK_LATENCY.observe(time.time() - start_time)
+
+
+@contextmanager
+def stage_timer(timings: dict, stage: str):
+    """Mesure une étape de /identify : durée en ms dans ``timings`` et métrique par étape."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings[stage] = round(elapsed * 1000, 2)
+        IDENTIFY_STAGE_LATENCY.labels(stage=stage).observe(elapsed)
+
+
+@app.on_event("startup")
+async def start_batcher():
+    # Modèle chargé en tâche de fond : /health répond tout de suite, /ready une fois chargé
+    await model_holder.start()
+    if MODEL_WATCH_SECONDS > 0:
+        await model_holder.watch([MODEL_WEIGHTS_PATH], MODEL_WATCH_SECONDS)
+    await embedding_batcher.start()
+    # Connexions ouvertes en tâche de fond : une base injoignable ne retarde pas le démarrage
+    asyncio.get_running_loop().run_in_executor(None, database.warm_pool)
+    if TAG_INDEX_ENABLED:
+        await tag_index_refresher.start()
+
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    await model_holder.stop()
+    await embedding_batcher.stop()
+    await tag_index_refresher.stop()
+    inference_executor.shutdown(wait=False)
+    async_database.shutdown()
+    database.pool.close()
+
 
 # -------------------- Pydantic Schemas --------------------
 
@@ -122,6 +574,49 @@ class MatchResponse(BaseModel):
     matches: List[Match]
 
 
+class IdentifiedVerre(BaseModel):
+    score: float
+    verre: Dict[str, Any]
+
+
+class IdentifyResponse(BaseModel):
+    matches: List[Match]
+    verres: List[IdentifiedVerre]
+    timings_ms: Dict[str, float]
+
+
+class BatchMatchItem(BaseModel):
+    filename: str
+    matches: List[Match] = []
+    error: Optional[str] = None
+
+
+class BatchMatchResponse(BaseModel):
+    results: List[BatchMatchItem]
+
+
+class RankedTagSearch(BaseModel):
+    """Recherche partielle : ``tags`` (poids 1) et/ou ``weights`` (tag → poids, ex. classes de /match et similarité)."""
+
+    tags: List[str] = []
+    weights: Dict[str, float] = {}
+    metric: Literal["jaccard", "overlap", "weighted"] = "jaccard"
+    offset: int = Field(0, ge=0)
+    limit: int = Field(20, ge=1, le=100)
+
+
+class RankedVerre(BaseModel):
+    verre: Dict[str, Any]
+    score: float
+
+
+class RankedTagSearchResponse(BaseModel):
+    total: int
+    offset: int
+    limit: int
+    results: List[RankedVerre]
+
+
 class TokenResponse(BaseModel):
     access_token: str
     token_type: str
@@ -134,20 +629,30 @@ class TokenResponse(BaseModel):
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     try:
         token_data = verify_token(token)
-        user = get_user(token_data.username)
+        user = await db_read(async_database.get_user(token_data.username))
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
         return token_data.username
+    except HTTPException:
+        raise
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid authentication")
 
 
+async def get_current_admin(current_user: str = Depends(get_current_user)):
+    """Utilisateur courant, s'il est l'administrateur (``ADMIN_EMAIL``, par nom d'utilisateur ou e-mail)."""
+    user = await db_read(async_database.get_user(current_user))
+    if not user or ADMIN_EMAIL not in (user.get("username"), user.get("email")):
+        raise HTTPException(status_code=403, detail="Admin only")
+    return current_user
+
+
 # -------------------- Endpoints --------------------
 
 
 @app.post("/token", response_model=TokenResponse)
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = authenticate_user(form_data.username, form_data.password)
+    user = await db_read(async_database.authenticate_user(form_data.username, form_data.password))
     if not user:
         raise HTTPException(status_code=401, detail="Incorrect username or password")
     access_token, version = create_access_token(user["username"])
@@ -157,17 +662,26 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
 
 @app.post("/embedding")
 @limiter.limit("5/minute")
-async def get_image_embedding(request: Request, file: UploadFile = File(...), token: str = Depends(oauth2_scheme)):
+async def get_image_embedding(
+    request: Request, response: Response, file: UploadFile = File(...), token: str = Depends(oauth2_scheme)
+):
     EMBED_REQUEST_COUNT.inc()
     start_time = time.time()
     try:
         verify_token(token)
+        bundle = current_bundle()
         image_bytes = await file.read()
-        if not validate_image_file(image_bytes):
-            raise HTTPException(status_code=400, detail="Invalid image file")
-        img = Image.open(io.BytesIO(image_bytes)).convert("L")
-        embedding = get_embedding(model, img)
+        key, cached = await cache_lookup(image_bytes, bundle.version)
+        if cached is not None:
+            embedding = cached["embedding"]
+        else:
+            embedding = await embed_image(bundle, image_bytes)
+            cache_store(key, embedding)
+        response.headers[MODEL_VERSION_HEADER] = bundle.version or ""
         return {"embedding": embedding.tolist()}
+    except HTTPException:
+        EMBED_REQUEST_ERRORS.inc()
+        raise
     except Exception as e:
         EMBED_REQUEST_ERRORS.inc()
         raise HTTPException(status_code=500, detail=f"Embedding error: {e}")
@@ -177,17 +691,20 @@ async def get_image_embedding(request: Request, file: UploadFile = File(...), to
 
 @app.post("/match", response_model=MatchResponse)
 @limiter.limit("5/minute")
-async def get_best_match(request: Request, file: UploadFile = File(...), current_user: str = Depends(get_current_user)):
+async def get_best_match(
+    request: Request, response: Response, file: UploadFile = File(...), current_user: str = Depends(get_current_user)
+):
     MATCH_REQUEST_COUNT.inc()
     start_time = time.time()
     try:
+        bundle = current_bundle()
         image_bytes = await file.read()
-        if not validate_image_file(image_bytes):
-            raise HTTPException(status_code=400, detail="Invalid image")
-        img = Image.open(io.BytesIO(image_bytes)).convert("L")
-        embedding = get_embedding(model, img)
-        matches = get_top_matches(embedding)
+        matches = await match_image(bundle, image_bytes)
+        response.headers[MODEL_VERSION_HEADER] = bundle.version or ""
         return {"matches": [{"class_": m.get("class", ""), "similarity": m.get("similarity", 0.0)} for m in matches]}
+    except HTTPException:
+        MATCH_REQUEST_ERRORS.inc()
+        raise
     except Exception as e:
         MATCH_REQUEST_ERRORS.inc()
         raise HTTPException(status_code=500, detail=f"Match error: {e}")
@@ -195,16 +712,180 @@ async def get_best_match(request: Request, file: UploadFile = File(...), current
         MATCH_LATENCY.observe(time.time() - start_time)
 
 
+@app.post("/identify", response_model=IdentifyResponse)
+@limiter.limit("5/minute")
+async def identify(
+    request: Request,
+    response: Response,
+    file: UploadFile = File(...),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: str = Depends(get_current_user),
+):
+    """
+    Identifie les verres correspondant à une image en un seul appel.
+
+    Enchaîne côté serveur ``/match`` (top-k des classes), la recherche par tags (verres classés
+    par somme des similarités des classes qu'ils portent) et la lecture des détails en une
+    requête SQL. La durée de chaque étape est renvoyée dans ``timings_ms`` et l'en-tête
+    ``Server-Timing``.
+    """
+    IDENTIFY_REQUEST_COUNT.inc()
+    start_time = time.time()
+    timings = {}
+    try:
+        bundle = current_bundle()
+        image_bytes = await file.read()
+        with stage_timer(timings, "match"):
+            matches = await match_image(bundle, image_bytes)
+        weights = {}
+        for m in matches:
+            if m.get("class"):
+                tag = normalize_tag(m["class"])
+                weights[tag] = max(weights.get(tag, 0.0), m.get("similarity", 0.0))
+
+        index = tag_index_refresher.index
+        if index is not None:
+            with stage_timer(timings, "tags"):
+                _, ranked = index.rank(weights, "weighted", 0, limit)
+            with stage_timer(timings, "details"):
+                details = await cached_verres_details([verre["id"] for verre, _ in ranked])
+            verres = [{"score": score, "verre": details[v["id"]]} for v, score in ranked if v["id"] in details]
+        else:
+            # Index des tags pas encore construit : verres tagués d'une seule classe, tags et détails en une requête
+            with stage_timer(timings, "details"):
+                found = await db_read(async_database.run(find_verres_details_by_tags, [[tag] for tag in weights]))
+            scored = [{"score": weights[normalize_tag(v["tags"][0])], "verre": v} for v in found]
+            verres = sorted(scored, key=lambda item: (-item["score"], item["verre"]["id"]))[:limit]
+
+        response.headers["Server-Timing"] = ", ".join(f"{stage};dur={ms}" for stage, ms in timings.items())
+        response.headers[MODEL_VERSION_HEADER] = bundle.version or ""
+        return {
+            "matches": [{"class_": m.get("class", ""), "similarity": m.get("similarity", 0.0)} for m in matches],
+            "verres": verres,
+            "timings_ms": timings,
+        }
+    except HTTPException:
+        IDENTIFY_REQUEST_ERRORS.inc()
+        raise
+    except Exception as e:
+        IDENTIFY_REQUEST_ERRORS.inc()
+        raise HTTPException(status_code=500, detail=f"Identify error: {e}")
+    finally:
+        IDENTIFY_LATENCY.observe(time.time() - start_time)
+
+
+@app.post("/match_batch", response_model=BatchMatchResponse)
+@limiter.limit("5/minute")
+async def get_best_matches_batch(
+    request: Request,
+    response: Response,
+    files: List[UploadFile] = File(...),
+    current_user: str = Depends(get_current_user),
+):
+    """
+    Identifie plusieurs images en une requête (fichiers multiples et/ou archives zip).
+
+    Les résultats suivent l'ordre d'envoi (puis l'ordre des entrées de chaque archive).
+    Une image invalide n'invalide que son propre élément (champ ``error``).
+    """
+    MATCH_BATCH_REQUEST_COUNT.inc()
+    start_time = time.time()
+    try:
+        uploads = [(f.filename or f"file_{i}", await f.read()) for i, f in enumerate(files)]
+        try:
+            items = expand_batch(uploads, MATCH_BATCH_MAX_ITEMS, MATCH_BATCH_MAX_BYTES)
+        except BatchInputError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not items:
+            raise HTTPException(status_code=400, detail="No image in batch")
+        MATCH_BATCH_ITEMS.observe(len(items))
+
+        bundle = current_bundle()
+        results = []
+        outcomes = await match_images(bundle, [content for _, content in items])
+        for (filename, _), outcome in zip(items, outcomes):
+            if isinstance(outcome, Exception):
+                MATCH_BATCH_ITEM_ERRORS.inc()
+                error = str(outcome) if isinstance(outcome, InvalidImageError) else f"Match error: {outcome}"
+                results.append({"filename": filename, "error": error})
+            else:
+                matches = [{"class_": m.get("class", ""), "similarity": m.get("similarity", 0.0)} for m in outcome]
+                results.append({"filename": filename, "matches": matches})
+        response.headers[MODEL_VERSION_HEADER] = bundle.version or ""
+        return {"results": results}
+    except HTTPException:
+        MATCH_BATCH_REQUEST_ERRORS.inc()
+        raise
+    except Exception as e:
+        MATCH_BATCH_REQUEST_ERRORS.inc()
+        raise HTTPException(status_code=500, detail=f"Match batch error: {e}")
+    finally:
+        MATCH_BATCH_LATENCY.observe(time.time() - start_time)
+
+
 @app.post("/search_tags")
 @limiter.limit("10/minute")
-async def search_tags(request: Request, tags: List[str] = Body(...), current_user: str = Depends(get_current_user)):
+async def search_tags(
+    request: Request,
+    tags: List[str] = Body(...),
+    mode: Literal["exact", "superset", "subset"] = "exact",
+    current_user: str = Depends(get_current_user),
+):
+    """
+    Verres dont les tags correspondent à la liste : exactement (``exact``), tous présents
+    (``superset``) ou tous les tags du verre parmi la liste (``subset``).
+    """
     SEARCH_TAGS_COUNT.inc()
     start_time = time.time()
     try:
         if not tags:
             raise HTTPException(status_code=400, detail="Empty tag list")
-        results = find_matching_verres(tags)
+        index = tag_index_refresher.index
+        if index is not None:
+            results = index.search(tags, mode)
+        elif mode == "exact":
+            # Index pas encore construit (ou désactivé) : requête indexée en base
+            results = await db_read(async_database.find_matching_verres(tags))
+        else:
+            raise HTTPException(status_code=503, detail="Tag index not ready")
         return {"results": results}
+    except HTTPException:
+        raise
+    except Exception as e:
+        SEARCH_TAGS_ERRORS.inc()
+        raise HTTPException(status_code=500, detail=f"search_tags error: {e}")
+    finally:
+        SEARCH_TAGS_LATENCY.observe(time.time() - start_time)
+
+
+@app.post("/search_tags/ranked", response_model=RankedTagSearchResponse)
+@limiter.limit("30/minute")
+async def search_tags_ranked(
+    request: Request, query: RankedTagSearch = Body(...), current_user: str = Depends(get_current_user)
+):
+    """
+    Verres partageant au moins un tag avec la demande, classés par score (Jaccard, recouvrement
+    ou somme des poids des tags communs), paginés avec ``offset`` / ``limit``.
+    """
+    SEARCH_TAGS_COUNT.inc()
+    start_time = time.time()
+    try:
+        weights = {tag: 1.0 for tag in query.tags}
+        weights.update(query.weights)
+        if not weights:
+            raise HTTPException(status_code=400, detail="Empty tag list")
+        index = tag_index_refresher.index
+        if index is None:
+            raise HTTPException(status_code=503, detail="Tag index not ready")
+        total, page = index.rank(weights, query.metric, query.offset, query.limit)
+        return {
+            "total": total,
+            "offset": query.offset,
+            "limit": query.limit,
+            "results": [{"verre": verre, "score": score} for verre, score in page],
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         SEARCH_TAGS_ERRORS.inc()
         raise HTTPException(status_code=500, detail=f"search_tags error: {e}")
@@ -212,6 +893,39 @@ async def search_tags(request: Request, tags: List[str] = Body(...), current_use
         SEARCH_TAGS_LATENCY.observe(time.time() - start_time)
 
 
+@app.post("/verres/bulk")
+@limiter.limit("60/minute")
+async def get_verres_bulk(request: Request, ids: List[int] = Body(...), current_user: str = Depends(get_current_user)):
+    """
+    Détails de plusieurs verres en un appel (une requête SQL pour ceux absents du cache).
+
+    La réponse ``{"verres": [...], "missing": [...]}`` est sérialisée au fil de l'envoi ; l'ordre
+    des verres n'est pas celui de la demande. ``missing`` liste les ids introuvables. Une base
+    injoignable ou saturée donne un 503.
+    """
+    VERRES_BULK_COUNT.inc()
+    if not ids:
+        VERRES_BULK_ERRORS.inc()
+        raise HTTPException(status_code=400, detail="Empty id list")
+    if len(ids) > VERRES_BULK_MAX_IDS:
+        VERRES_BULK_ERRORS.inc()
+        raise HTTPException(status_code=400, detail=f"Too many ids ({len(ids)} > {VERRES_BULK_MAX_IDS})")
+    VERRES_BULK_IDS.observe(len(ids))
+    start_time = time.time()
+    try:
+        # Au plus VERRES_BULK_MAX_IDS lignes, lues en entier dans db_executor avant d'envoyer le statut
+        verres = await cached_verres_details(ids)
+    except Exception as e:
+        VERRES_BULK_ERRORS.inc()
+        VERRES_BULK_LATENCY.observe(time.time() - start_time)
+        if isinstance(e, HTTPException):
+            raise
+        logger.error(f"Erreur lors de la lecture des verres : {e}")
+        raise HTTPException(status_code=503, detail=f"Database error: {e}", headers={"Retry-After": "1"})
+    missing = [verre_id for verre_id in dict.fromkeys(ids) if verre_id not in verres]
+    return StreamingResponse(stream_verres_bulk(verres, missing, start_time), media_type="application/json")
+
+
 @app.get(
     "/verre/{verre_id}",
     summary="Obtenir les détails d'un verre",
@@ -226,7 +940,7 @@ async def get_verre(
 
     try:
         logger.info(f"Recherche du verre avec ID: {verre_id}")
-        verre = get_verre_details(verre_id)
+        verre = await db_read(async_database.get_verre_details(verre_id))
 
         if not verre:
             logger.warning(f"Verre avec ID {verre_id} non trouvé")
@@ -235,6 +949,8 @@ async def get_verre(
         logger.info(f"Verre trouvé: {verre['nom']}")
         return {"verre": verre}
 
+    except HTTPException:
+        raise
     except Exception as e:
         VERRE_DETAIL_ERRORS.inc()  # Incrémenter le compteur d'erreurs
         logger.error(f"Erreur lors de la récupération du verre: {e}")
@@ -251,7 +967,32 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    """Vivacité : le processus répond, que le modèle soit chargé ou non (voir ``/ready``)."""
+    return {"status": "healthy", "model": model_holder.state}
+
+
+@app.get("/ready")
+async def readiness_check():
+    """Disponibilité : 200 une fois le modèle et les références chargés, 503 avec la progression sinon."""
+    load_status = model_holder.status()
+    if not model_holder.ready:
+        return JSONResponse(status_code=503, content=load_status)
+    return load_status
+
+
+@app.post("/admin/reload_model", status_code=202)
+async def reload_model(current_admin: str = Depends(get_current_admin)):
+    """
+    Recharge à chaud les poids et les références (après un réentraînement).
+
+    Le nouveau modèle est chargé en tâche de fond pendant que l'actuel continue de servir,
+    puis le remplace ; suivre l'avancement et la version active sur ``/ready``. Ne concerne
+    que le worker qui reçoit la requête : avec plusieurs workers, utiliser ``MODEL_WATCH_SECONDS``.
+    """
+    if not await model_holder.reload():
+        raise HTTPException(status_code=409, detail="Model load already in progress")
+    log_security_event("MODEL_RELOAD", f"Model reload requested by {current_admin}")
+    return {"status": "reloading", "version": model_holder.version}
 
 
 @app.get("/metrics")
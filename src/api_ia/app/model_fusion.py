@@ -0,0 +1,136 @@
+"""
+Variante « fusionnée » de ``EfficientNetEmbedding`` pour l'inférence.
+
+- ``grayscale_conv`` (1x1, 1 → 3 canaux) est replié dans la convolution du stem,
+  qui consomme alors directement l'image 1 canal : plus de passe pleine
+  résolution ni d'activation 3 canaux intermédiaire ;
+- chaque ``BatchNorm`` est replié dans la convolution (ou la ``Linear``) qui le
+  précède (``torch.nn.utils.fusion``).
+
+Le repli de ``grayscale_conv`` n'est pas exact avec un simple changement de
+poids : le stem applique un padding de zéros *après* la conversion 1 → 3
+canaux, si bien que le biais de ``grayscale_conv`` ne contribue pas aux mêmes
+positions du noyau en bordure qu'au centre. Cette contribution ne dépend que
+de la taille d'entrée ; elle est précalculée sous forme de carte de biais
+(C, H', W') pour ``IMAGE_SIZE`` et ajoutée à la sortie de la convolution.
+"""
+
+import copy
+from typing import Tuple
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.nn.utils.fusion import fuse_conv_bn_eval, fuse_linear_bn_eval
+
+
+class GrayscaleStem(nn.Module):
+    """
+    Stem 1 canal équivalent à ``grayscale_conv`` → conv du stem → BatchNorm → activation.
+
+    Args:
+        grayscale_conv (nn.Conv2d): Convolution 1x1, 1 → 3 canaux.
+        stem_conv (nn.Conv2d): Première convolution du backbone (3 → C canaux).
+        stem_bn (nn.BatchNorm2d): BatchNorm du stem.
+        activation (nn.Module): Activation du stem.
+        image_size (int): Côté des images servies (carte de biais précalculée).
+    """
+
+    def __init__(
+        self,
+        grayscale_conv: nn.Conv2d,
+        stem_conv: nn.Conv2d,
+        stem_bn: nn.BatchNorm2d,
+        activation: nn.Module,
+        image_size: int,
+    ):
+        super().__init__()
+        if grayscale_conv.kernel_size != (1, 1) or grayscale_conv.in_channels != 1 or stem_conv.groups != 1:
+            raise ValueError("Seule une conversion 1x1 vers un stem non groupé peut être repliée")
+        stem = fuse_conv_bn_eval(stem_conv.eval(), stem_bn.eval())
+        gray_weight = grayscale_conv.weight.detach()[:, 0, 0, 0].view(1, -1, 1, 1)
+        gray_bias = (
+            grayscale_conv.bias.detach().view(1, -1, 1, 1)
+            if grayscale_conv.bias is not None
+            else torch.zeros_like(gray_weight)
+        )
+
+        self.conv = nn.Conv2d(
+            1,
+            stem.out_channels,
+            stem.kernel_size,
+            stride=stem.stride,
+            padding=stem.padding,
+            dilation=stem.dilation,
+            bias=False,
+        )
+        self.conv.weight.data = (stem.weight.detach() * gray_weight).sum(dim=1, keepdim=True)
+        # Contribution du biais de grayscale_conv, par position du noyau (nulle sur le padding)
+        self.register_buffer("offset_kernel", (stem.weight.detach() * gray_bias).sum(dim=1, keepdim=True))
+        self.register_buffer("stem_bias", stem.bias.detach().view(1, -1, 1, 1))
+        self.activation = activation
+        self.image_size = (image_size, image_size)
+        self.register_buffer("bias_map", self.compute_bias_map(self.image_size))
+
+    def compute_bias_map(self, size: Tuple[int, int]) -> torch.Tensor:
+        """Carte de biais (1, C, H', W') pour une entrée de taille ``size``."""
+        ones = torch.ones(1, 1, *size, dtype=self.offset_kernel.dtype, device=self.offset_kernel.device)
+        offsets = F.conv2d(
+            ones, self.offset_kernel, stride=self.conv.stride, padding=self.conv.padding, dilation=self.conv.dilation
+        )
+        return offsets + self.stem_bias
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        size = tuple(x.shape[-2:])
+        bias_map = self.bias_map if size == self.image_size else self.compute_bias_map(size)
+        return self.activation(self.conv(x) + bias_map)
+
+
+def fold_batchnorms(module: nn.Module) -> int:
+    """
+    Replie en place chaque ``BatchNorm`` qui suit directement une ``Conv2d`` / ``Linear``
+    dans un ``nn.Sequential`` ; le BatchNorm est remplacé par ``nn.Identity``.
+
+    Returns:
+        int: Nombre de BatchNorm repliés.
+    """
+    folded = 0
+    for sequential in [m for m in module.modules() if isinstance(m, nn.Sequential)]:
+        for i in range(len(sequential) - 1):
+            layer, norm = sequential[i], sequential[i + 1]
+            if isinstance(layer, nn.Conv2d) and isinstance(norm, nn.BatchNorm2d):
+                sequential[i] = fuse_conv_bn_eval(layer.eval(), norm.eval())
+            elif isinstance(layer, nn.Linear) and isinstance(norm, nn.BatchNorm1d):
+                sequential[i] = fuse_linear_bn_eval(layer.eval(), norm.eval())
+            else:
+                continue
+            sequential[i + 1] = nn.Identity()
+            folded += 1
+    return folded
+
+
+class FusedEmbeddingModel(nn.Module):
+    """
+    ``EfficientNetEmbedding`` replié pour l'inférence ; n'accepte que des images 1 canal.
+
+    Args:
+        model (nn.Module): ``EfficientNetEmbedding`` en mode ``eval`` (non modifié).
+        image_size (int): Côté des images servies.
+    """
+
+    def __init__(self, model: nn.Module, image_size: int):
+        super().__init__()
+        model = copy.deepcopy(model).cpu().eval()
+        stem_conv, stem_bn, activation = model.backbone.features[0]
+        model.backbone.features[0] = GrayscaleStem(model.grayscale_conv, stem_conv, stem_bn, activation, image_size)
+        self.backbone = model.backbone
+        self.embedding_head = model.embedding_head
+        fold_batchnorms(self)
+        self.eval()
+
+    def forward_one(self, x: torch.Tensor) -> torch.Tensor:
+        features = self.backbone(x)
+        return F.normalize(self.embedding_head(features), p=2, dim=1)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.forward_one(x)
@@ -1,30 +1,167 @@
 import torch
-from torchvision import transforms
+import numpy as np
+from typing import List
 from PIL import Image
 import sys
 import os
-from .config import MODEL_WEIGHTS_PATH, IMAGE_SIZE
+import glob
+import hashlib
+import logging
+from .config import (
+    MODEL_WEIGHTS_PATH,
+    MODEL_WEIGHTS_MMAP,
+    IMAGE_SIZE,
+    INFERENCE_RUNTIME,
+    TORCHSCRIPT_MODEL_PATH,
+    ONNX_MODEL_PATH,
+    ONNX_INTRA_OP_THREADS,
+    QUANTIZED_MODEL_PATH,
+    JPEG_DRAFT_DECODE,
+)
+from .inference_runtime import RUNTIMES, QUANTIZED_RUNTIMES, TorchScriptModel, OnnxRuntimeModel, check_export_metadata
+from .model_fusion import FusedEmbeddingModel
+from .preprocessing import ImagePreprocessor
+from .reference_store import file_sha256
 from models.efficientnet_triplet import EfficientNetEmbedding
 
-DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+logger = logging.getLogger(__name__)
+
+DEVICE = "cuda" if torch.cuda.is_available() and INFERENCE_RUNTIME not in QUANTIZED_RUNTIMES else "cpu"
+
+NORMALIZE_MEAN = [0.5]
+NORMALIZE_STD = [0.5]
+
+# Décodage (JPEG réduit), redimensionnement et normalisation dans des tampons réutilisés
+PREPROCESSOR = ImagePreprocessor(IMAGE_SIZE, NORMALIZE_MEAN, NORMALIZE_STD, jpeg_draft=JPEG_DRAFT_DECODE)
+
+# Description du prétraitement, enregistrée avec les embeddings précalculés
+PREPROCESSING_CONFIG = {
+    "mode": "L",
+    "image_size": IMAGE_SIZE,
+    "resize": "bilinear",
+    "mean": NORMALIZE_MEAN,
+    "std": NORMALIZE_STD,
+    "jpeg_draft": JPEG_DRAFT_DECODE,
+}
+
+
+def weights_snapshot(path: str) -> str:
+    """
+    Copie immuable des poids, nommée par leur contenu (``<poids>.<empreinte>.pth``).
+
+    Un fichier en memory-map reste lu pendant toute la vie du modèle : recopié en
+    place, il change les poids du modèle actif ; tronqué, il fait échouer la
+    lecture des pages (SIGBUS). Seule la copie, jamais réécrite, est mappée ; le
+    fichier d'origine peut être remplacé librement. La copie précédente est
+    conservée pour les workers qui la chargent encore, les plus anciennes sont
+    supprimées.
+
+    Returns:
+        str: Chemin de la copie (créée si elle n'existe pas encore).
+    """
+    stem = os.path.splitext(os.path.abspath(path))[0]
+    snapshot = f"{stem}.{file_sha256(path)[:16]}.pth"
+    if not os.path.exists(snapshot):
+        # Copie hachée au passage : son nom décrit ce qui a été copié, même si l'original change entre-temps
+        digest = hashlib.sha256()
+        tmp = f"{snapshot}.{os.getpid()}.tmp"
+        with open(path, "rb") as src, open(tmp, "wb") as dst:
+            for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                digest.update(chunk)
+                dst.write(chunk)
+        snapshot = f"{stem}.{digest.hexdigest()[:16]}.pth"
+        os.replace(tmp, snapshot)
+    stale = sorted(set(glob.glob(glob.escape(stem) + ".*.pth")) - {snapshot}, key=os.path.getmtime)
+    for old in stale[:-1]:
+        try:
+            os.remove(old)
+        except OSError as e:
+            logger.warning(f"Impossible de supprimer l'ancienne copie des poids {old} : {e}")
+    return snapshot
 
-transform = transforms.Compose(
-    [transforms.Resize((IMAGE_SIZE, IMAGE_SIZE)), transforms.ToTensor(), transforms.Normalize(mean=[0.5], std=[0.5])]
-)
 
+def load_state_dict_file(path: str, mmap: bool = MODEL_WEIGHTS_MMAP):
+    """
+    Lit un fichier de poids ; en memory-map si possible (CPU, format zip de ``torch.save``).
 
-def load_model():
+    Les tenseurs en memory-map restent adossés au fichier : le cache de pages du
+    système les partage entre tous les workers qui chargent les mêmes poids, et
+    un worker forké après le chargement (``gunicorn --preload``) n'en copie rien.
+    Le fichier mappé est la copie immuable de ``weights_snapshot``, jamais ``path``.
+
+    Returns:
+        Tuple[dict, bool]: State dict et indicateur memory-map.
+    """
+    if mmap and DEVICE == "cpu":
+        try:
+            return torch.load(weights_snapshot(path), map_location="cpu", mmap=True), True
+        except OSError as e:
+            # Dossier des poids en lecture seule, disque plein... : lecture classique
+            logger.warning(f"Copie des poids impossible ({e}), chargement sans memory-map")
+        except RuntimeError:
+            # Ancien format de sérialisation (non zip) : lecture classique
+            pass
+    return torch.load(path, map_location=DEVICE), False
+
+
+def load_eager_model():
     # Nous utilisons pretrained=False car nous chargeons nos propres poids
     # Le warning ne devrait plus apparaître car nous avons modifié la classe pour utiliser weights=None
     model = EfficientNetEmbedding(embedding_dim=256, pretrained=False)
-    model.load_state_dict(torch.load(MODEL_WEIGHTS_PATH, map_location=DEVICE))
+    state_dict, mmapped = load_state_dict_file(MODEL_WEIGHTS_PATH)
+    # assign : les paramètres deviennent les tenseurs lus (memory-map) au lieu d'y être copiés
+    model.load_state_dict(state_dict, assign=mmapped)
     model.to(DEVICE)
     model.eval()
     return model
 
 
+def export_metadata() -> dict:
+    """Métadonnées enregistrées dans les modèles exportés (poids sources, taille d'entrée)."""
+    return {"weights_sha256": file_sha256(MODEL_WEIGHTS_PATH), "image_size": IMAGE_SIZE}
+
+
+def load_model(runtime: str = INFERENCE_RUNTIME):
+    """
+    Charge le modèle d'embedding pour le moteur d'inférence demandé.
+
+    Args:
+        runtime (str): ``eager``, ``fused``, ``torchscript``, ``onnx``, ``int8_dynamic`` ou ``int8_static``.
+
+    Returns:
+        Objet exposant ``forward_one(tensor) -> tensor``.
+
+    Raises:
+        ValueError: Si le moteur est inconnu.
+        FileNotFoundError: Si le modèle exporté n'existe pas.
+    """
+    if runtime not in RUNTIMES:
+        raise ValueError(f"Moteur d'inférence inconnu : {runtime} (disponibles : {', '.join(RUNTIMES)})")
+    if runtime == "eager":
+        return load_eager_model()
+    if runtime == "fused":
+        return FusedEmbeddingModel(load_eager_model(), IMAGE_SIZE).to(DEVICE)
+    if runtime == "int8_dynamic":
+        # torch.ao.quantization n'est importé que pour ce moteur
+        from .quantization import quantize_head_dynamic
+
+        return quantize_head_dynamic(load_eager_model())
+
+    paths = {"torchscript": TORCHSCRIPT_MODEL_PATH, "onnx": ONNX_MODEL_PATH, "int8_static": QUANTIZED_MODEL_PATH}
+    path = paths[runtime]
+    if not os.path.exists(path):
+        script = "quantize_model" if runtime == "int8_static" else "export_model"
+        raise FileNotFoundError(f"{path} introuvable : générer le modèle avec python -m api_ia.scripts.{script}")
+    if runtime in ("torchscript", "int8_static"):
+        model = TorchScriptModel(path, device=DEVICE, runtime=runtime)
+    else:
+        model = OnnxRuntimeModel(path, intra_op_threads=ONNX_INTRA_OP_THREADS)
+    check_export_metadata(model, export_metadata())
+    return model
+
+
 def preprocess_image(img: Image.Image):
-    return transform(img).unsqueeze(0).to(DEVICE)
+    return PREPROCESSOR.to_batch([PREPROCESSOR.load(img)], reuse=False).to(DEVICE)
 
 
 def get_embedding(model, img: Image.Image):
@@ -32,3 +169,54 @@ def get_embedding(model, img: Image.Image):
     with torch.no_grad():
         emb = model.forward_one(tensor).cpu().numpy()
     return emb[0]
+
+
+def embed_tensors(model, tensors: List[torch.Tensor]) -> np.ndarray:
+    """
+    Calcule en une seule passe forward les embeddings de tenseurs déjà prétraités.
+
+    Args:
+        model: Modèle d'embedding.
+        tensors (List[torch.Tensor]): Tenseurs de forme (1, 1, H, W) issus de ``preprocess_image``.
+
+    Returns:
+        np.ndarray: Embeddings de forme (len(tensors), embedding_dim).
+    """
+    with torch.no_grad():
+        return model.forward_one(torch.cat(tensors)).cpu().numpy()
+
+
+def embed_images(model, images: List[np.ndarray]) -> np.ndarray:
+    """
+    Calcule en une seule passe forward les embeddings d'images décodées par ``PREPROCESSOR``.
+
+    Le lot est normalisé dans le tampon réutilisable du thread courant, consommé
+    par la passe forward avant de rendre la main.
+
+    Args:
+        model: Modèle d'embedding.
+        images (List[np.ndarray]): Images ``uint8`` (H, W) issues de ``PREPROCESSOR.decode`` / ``open``.
+
+    Returns:
+        np.ndarray: Embeddings de forme (len(images), embedding_dim).
+    """
+    with torch.no_grad():
+        return model.forward_one(PREPROCESSOR.to_batch(images).to(DEVICE)).cpu().numpy()
+
+
+def get_embeddings(model, imgs: List[Image.Image], batch_size: int = 32) -> np.ndarray:
+    """
+    Calcule les embeddings d'une liste d'images par lots (une passe forward par lot).
+
+    Args:
+        model: Modèle d'embedding.
+        imgs (List[Image.Image]): Images en niveaux de gris.
+        batch_size (int): Nombre d'images par passe forward.
+
+    Returns:
+        np.ndarray: Embeddings de forme (len(imgs), embedding_dim).
+    """
+    batches = []
+    for start in range(0, len(imgs), batch_size):
+        batches.append(embed_images(model, [PREPROCESSOR.load(img) for img in imgs[start : start + batch_size]]))
+    return np.concatenate(batches) if batches else np.empty((0, 0), dtype=np.float32)
@@ -0,0 +1,238 @@
+"""
+Modèle d'embedding et références chargés en tâche de fond.
+
+Le chargement (poids, puis embeddings de référence, éventuellement ré-encodés)
+prend de quelques secondes à plusieurs minutes. Fait à l'import de ``main``,
+il retardait toute réponse, ``/health`` compris, et une erreur de
+configuration (chemin des poids...) tuait le processus. ``ModelHolder`` le
+lance dans un thread au démarrage et expose son état : ``/health`` répond dès
+le démarrage, ``/ready`` indique l'étape et la progression du chargement, et
+les endpoints d'inférence répondent 503 tant que le modèle n'est pas prêt.
+
+Un nouveau modèle (réentraînement) est chargé de la même façon par ``reload``,
+sur demande ou quand le fichier des poids change (``watch``) : le couple
+(modèle, références) est reconstruit à côté de l'actuel, qui continue de
+servir, puis les remplace en une affectation. Chaque requête lit ``bundle``
+une seule fois et termine sur la version qu'elle a commencée.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# États successifs du chargement
+PENDING, LOADING, READY, FAILED = "pending", "loading", "ready", "failed"
+
+
+class ModelNotReadyError(RuntimeError):
+    """Levée quand le modèle n'est pas (encore) chargé."""
+
+
+class ModelBundle:
+    """
+    Modèle et références chargés ensemble.
+
+    Args:
+        model: Modèle d'embedding (``forward_one``).
+        references: ``ReferenceIndex`` des embeddings de référence calculés avec ce modèle.
+        version (str): Identifiant de ce qui détermine les embeddings et correspondances
+            (préfixe des clés du cache d'embeddings).
+    """
+
+    def __init__(self, model: Any, references: Any, version: Optional[str]):
+        self.model = model
+        self.references = references
+        self.version = version
+
+
+def file_signature(paths: Sequence[str]) -> Tuple[Optional[Tuple[int, int, int]], ...]:
+    """(inode, taille, date de modification) de chaque fichier, None s'il est absent."""
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            signature.append(None)
+        else:
+            signature.append((st.st_ino, st.st_size, st.st_mtime_ns))
+    return tuple(signature)
+
+
+class ModelHolder:
+    """
+    Charge un ``ModelBundle`` en tâche de fond, le recharge à chaud et expose l'état du chargement.
+
+    Args:
+        load (Callable[[Callable[[str, float], None]], ModelBundle]): Chargement bloquant ; reçoit
+            ``report(stage, progress)`` pour signaler l'étape en cours et sa progression (0 à 1).
+        clock (Callable[[], float]): Horloge monotone, en secondes.
+        on_loaded (Callable[[ModelBundle, float], None], optional): Appelé avec le nouveau modèle et
+            la durée de chaque chargement réussi (initial ou rechargement).
+        on_failed (Callable[[str], None], optional): Appelé avec l'erreur de chaque chargement échoué.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[Callable[[str, float], None]], ModelBundle],
+        clock: Callable[[], float] = time.monotonic,
+        on_loaded: Optional[Callable[[ModelBundle, float], None]] = None,
+        on_failed: Optional[Callable[[str], None]] = None,
+    ):
+        self._load = load
+        self.clock = clock
+        self.on_loaded = on_loaded
+        self.on_failed = on_failed
+        self.bundle: Optional[ModelBundle] = None
+        self.state = PENDING
+        self.reloading = False
+        self.stage: Optional[str] = None
+        self.progress = 0.0
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Future] = None
+        self._watcher: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    @property
+    def version(self) -> Optional[str]:
+        """Version du modèle actif (None avant le premier chargement)."""
+        bundle = self.bundle
+        return bundle.version if bundle is not None else None
+
+    @property
+    def busy(self) -> bool:
+        """True si un chargement lancé par ``start`` ou ``reload`` est en cours."""
+        return self._task is not None and not self._task.done()
+
+    def require(self) -> ModelBundle:
+        """
+        Retourne le modèle chargé.
+
+        Raises:
+            ModelNotReadyError: Si le chargement n'est pas terminé ou a échoué.
+        """
+        bundle = self.bundle
+        if bundle is None:
+            raise ModelNotReadyError(f"Model not ready ({self.state})")
+        return bundle
+
+    def status(self) -> Dict[str, Any]:
+        """État du chargement, tel que renvoyé par ``/ready``."""
+        return {
+            "ready": self.ready,
+            "state": self.state,
+            "version": self.version,
+            "reloading": self.reloading,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "error": self.error,
+            "load_seconds": self.load_seconds,
+        }
+
+    def report(self, stage: str, progress: float = 0.0):
+        """Étape en cours du chargement et sa progression (0 à 1)."""
+        self.stage = stage
+        self.progress = min(max(progress, 0.0), 1.0)
+
+    def load(self, reload: bool = False) -> Optional[ModelBundle]:
+        """
+        Charge le modèle (bloquant) ; sans effet s'il est déjà chargé, sauf avec ``reload``.
+
+        Lors d'un rechargement, le modèle actif reste servi (état ``ready``) jusqu'au
+        remplacement ; en cas d'échec, il est conservé. Une erreur est journalisée et
+        conservée dans ``error`` au lieu d'être propagée (état ``failed`` si aucun modèle
+        n'est chargé).
+
+        Returns:
+            Optional[ModelBundle]: Modèle actif après l'opération (None si aucun).
+        """
+        with self._lock:
+            if self.bundle is not None and not reload:
+                return self.bundle
+            if self.bundle is None:
+                self.state = LOADING
+            self.reloading, self.error = self.bundle is not None, None
+            start = self.clock()
+            try:
+                bundle = self._load(self.report)
+            except Exception as e:
+                logger.error(f"Chargement du modèle impossible : {e}")
+                self.error = str(e)
+                if self.bundle is None:
+                    self.state = FAILED
+                if self.on_failed:
+                    self.on_failed(self.error)
+                return self.bundle
+            finally:
+                self.reloading = False
+            self.load_seconds = self.clock() - start
+            # Remplacement atomique : les requêtes en cours gardent la référence à l'ancien couple
+            self.bundle, self.state, self.progress = bundle, READY, 1.0
+            logger.info(f"Modèle {bundle.version} chargé en {self.load_seconds:.1f} s")
+            if self.on_loaded:
+                self.on_loaded(bundle, self.load_seconds)
+            return bundle
+
+    async def start(self):
+        """Lance le chargement dans un thread, sauf si le modèle est déjà chargé (préchargement)."""
+        if self.bundle is None and self._task is None:
+            self._task = asyncio.get_running_loop().run_in_executor(None, self.load)
+
+    async def reload(self) -> bool:
+        """
+        Lance le rechargement du modèle dans un thread.
+
+        Returns:
+            bool: False si un chargement est déjà en cours (rien n'est lancé).
+        """
+        if self.busy:
+            return False
+        self._task = asyncio.get_running_loop().run_in_executor(None, self.load, True)
+        return True
+
+    async def wait(self) -> Optional[ModelBundle]:
+        """Attend la fin du chargement lancé par ``start`` ou ``reload``."""
+        if self._task is not None:
+            await self._task
+        return self.bundle
+
+    async def watch(self, paths: Sequence[str], interval: float):
+        """
+        Surveille ``paths`` toutes les ``interval`` secondes et recharge le modèle quand l'un d'eux change.
+
+        Un fichier modifié n'est rechargé qu'une fois sa signature stable pendant une
+        période entière : un fichier en cours d'écriture n'est jamais lu.
+        """
+        if self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch(list(paths), interval))
+
+    async def stop(self):
+        """Arrête la surveillance des fichiers."""
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+
+    async def _watch(self, paths: Sequence[str], interval: float):
+        last = previous = file_signature(paths)
+        while True:
+            await asyncio.sleep(interval)
+            current = file_signature(paths)
+            # Copie ou torch.save en cours : la signature change d'une vérification à l'autre. Le
+            # rechargement attend qu'elle soit identique sur deux vérifications successives.
+            stable, previous = current == previous, current
+            if stable and current != last and None not in current and await self.reload():
+                logger.info(f"Fichier du modèle modifié, rechargement : {', '.join(paths)}")
+                last = current
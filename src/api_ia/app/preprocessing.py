@@ -0,0 +1,94 @@
+"""
+Décodage et prétraitement rapides des images (remplace PIL + ``torchvision.transforms``).
+
+- Décodage JPEG en mode « draft » : libjpeg décode directement en niveaux de
+  gris et à une échelle réduite (1/2, 1/4, 1/8) tout en restant au moins aussi
+  grande que la taille cible ; une photo de téléphone n'est jamais décodée en
+  pleine résolution. Sans effet sur les autres formats (PNG...).
+- Redimensionnement bilinéaire PIL (identique à ``transforms.Resize``) en
+  ``uint8``, puis ``ToTensor`` + ``Normalize`` fusionnés en une seule passe :
+  une table de 256 valeurs float32 appliquée par ``np.take`` directement dans
+  le tampon du lot.
+- Tampons de lot préalloués et réutilisés : chaque thread garde son propre
+  tampon (N, 1, H, W), agrandi au besoin, qui sert de tenseur d'entrée du modèle.
+"""
+
+import io
+import threading
+from typing import List, Sequence
+
+import numpy as np
+import torch
+from PIL import Image
+
+
+class ImagePreprocessor:
+    """
+    Convertit des images en lots de tenseurs normalisés (N, 1, H, W).
+
+    Args:
+        image_size (int): Côté des images d'entrée du modèle.
+        mean (Sequence[float]): Moyenne de normalisation (1 canal).
+        std (Sequence[float]): Écart-type de normalisation (1 canal).
+        jpeg_draft (bool): Active le décodage JPEG réduit.
+    """
+
+    def __init__(self, image_size: int, mean: Sequence[float], std: Sequence[float], jpeg_draft: bool = True):
+        self.size = (image_size, image_size)
+        self.jpeg_draft = jpeg_draft
+        # ToTensor (x / 255) puis Normalize ((x - mean) / std) pour chaque valeur uint8
+        self.lut = ((np.arange(256, dtype=np.float32) / 255.0 - mean[0]) / std[0]).astype(np.float32)
+        self._local = threading.local()
+
+    def load(self, img: Image.Image) -> np.ndarray:
+        """
+        Redimensionne une image PIL en niveaux de gris ``uint8`` (H, W).
+
+        Le mode draft n'a d'effet que si ``img`` est un JPEG pas encore décodé
+        (retour direct de ``Image.open``).
+        """
+        if self.jpeg_draft:
+            img.draft("L", self.size)
+        img = img.convert("L")
+        if img.size != self.size:
+            img = img.resize(self.size, Image.BILINEAR)
+        return np.asarray(img, dtype=np.uint8)
+
+    def decode(self, image_bytes: bytes) -> np.ndarray:
+        """Décode et redimensionne une image encodée (contenu d'un fichier envoyé)."""
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            return self.load(img)
+
+    def open(self, path: str) -> np.ndarray:
+        """Décode et redimensionne une image sur disque."""
+        with Image.open(path) as img:
+            return self.load(img)
+
+    def to_batch(self, images: List[np.ndarray], reuse: bool = True) -> torch.Tensor:
+        """
+        Normalise des images ``uint8`` dans un tenseur float32 (N, 1, H, W).
+
+        Args:
+            images (List[np.ndarray]): Sorties de ``load`` / ``decode`` / ``open``.
+            reuse (bool): Écrit dans le tampon du thread courant. Le tenseur retourné
+                n'est alors valide que jusqu'au prochain appel dans ce thread : il doit
+                être consommé (passe forward) avant.
+
+        Returns:
+            torch.Tensor: Lot normalisé.
+        """
+        n = len(images)
+        batch = self._buffer(n)[:n] if reuse else torch.empty((n, 1, *self.size), dtype=torch.float32)
+        out = batch.numpy()
+        for i, image in enumerate(images):
+            np.take(self.lut, image, out=out[i, 0])
+        return batch
+
+    def _buffer(self, n: int) -> torch.Tensor:
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or buffer.shape[0] < n:
+            # Croissance par puissances de deux : peu de réallocations quand la taille des lots varie
+            capacity = 1 << max(0, n - 1).bit_length()
+            buffer = torch.empty((capacity, 1, *self.size), dtype=torch.float32)
+            self._local.buffer = buffer
+        return buffer
@@ -0,0 +1,70 @@
+"""
+Quantification INT8 de ``EfficientNetEmbedding`` pour l'inférence CPU.
+
+- ``embedding_head`` : quantification dynamique des couches ``Linear`` (poids
+  INT8, activations quantifiées à la volée), sans calibration ;
+- ``backbone`` : quantification statique post-entraînement en mode FX
+  (observateurs insérés dans le graphe, calibrés sur des images réelles, puis
+  conversion en opérateurs INT8 ``fbgemm``/``x86``).
+
+``grayscale_conv`` (convolution 1x1, 3 canaux) et la normalisation L2 restent
+en float32. Le modèle statique est figé en TorchScript par
+``api_ia.scripts.quantize_model`` : aucune calibration n'a lieu au démarrage.
+"""
+
+import copy
+import itertools
+from typing import Iterable
+
+import torch
+import torch.nn as nn
+from torch.ao.quantization import get_default_qconfig_mapping, quantize_dynamic
+from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+QUANTIZATION_BACKEND = "x86" if "x86" in torch.backends.quantized.supported_engines else "qnnpack"
+
+
+def quantize_head_dynamic(model: nn.Module) -> nn.Module:
+    """
+    Retourne une copie du modèle dont ``embedding_head`` utilise des ``Linear`` INT8 dynamiques.
+
+    Args:
+        model (nn.Module): ``EfficientNetEmbedding`` float en mode ``eval``.
+
+    Returns:
+        nn.Module: Copie quantifiée (CPU).
+    """
+    quantized = copy.deepcopy(model).cpu().eval()
+    torch.backends.quantized.engine = QUANTIZATION_BACKEND
+    quantized.embedding_head = quantize_dynamic(quantized.embedding_head, {nn.Linear}, dtype=torch.qint8)
+    return quantized
+
+
+def quantize_static(model: nn.Module, calibration_batches: Iterable[torch.Tensor]) -> nn.Module:
+    """
+    Quantifie statiquement le backbone (calibré sur ``calibration_batches``) et dynamiquement la tête.
+
+    Args:
+        model (nn.Module): ``EfficientNetEmbedding`` float en mode ``eval``.
+        calibration_batches (Iterable[torch.Tensor]): Lots prétraités (B, 1, H, W),
+            représentatifs des images servies (ex. ``data/split/val``).
+
+    Returns:
+        nn.Module: Copie quantifiée (CPU), exposant ``forward_one``.
+
+    Raises:
+        ValueError: Si aucun lot de calibration n'est fourni.
+    """
+    quantized = quantize_head_dynamic(model)
+    batches = iter(calibration_batches)
+    first = next(batches, None)
+    if first is None:
+        raise ValueError("Au moins un lot de calibration est nécessaire")
+
+    with torch.no_grad():
+        example = quantized.grayscale_conv(first[:1].cpu())
+        prepared = prepare_fx(quantized.backbone, get_default_qconfig_mapping(QUANTIZATION_BACKEND), (example,))
+        for batch in itertools.chain([first], batches):
+            prepared(quantized.grayscale_conv(batch.cpu()))
+    quantized.backbone = convert_fx(prepared)
+    return quantized
@@ -0,0 +1,255 @@
+"""
+Index matriciel des embeddings de référence.
+
+Les références sont stockées dans une seule matrice contiguë float32,
+normalisée L2, accompagnée d'un tableau de labels parallèle. Chaque classe
+peut posséder plusieurs exemplaires (image officielle + augmentations) :
+les lignes sont regroupées par classe afin d'agréger les scores par classe
+(max, moyenne des m meilleurs ou centroïde) avec des opérations vectorisées.
+
+La recherche des exemplaires est déléguée à un backend ``VectorIndex`` :
+exhaustif par défaut, ou approximatif (IVF, HNSW) pour les grandes bases, auquel
+cas seuls les ``candidates`` meilleurs exemplaires sont agrégés par classe.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from api_ia.app.vector_index import ExactIndex, VectorIndex, top_k_indices
+
+AGGREGATIONS = ("max", "mean_topm", "centroid")
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    Normalise des vecteurs (ou une matrice ligne par ligne) en norme L2.
+
+    Args:
+        vectors (np.ndarray): Vecteur (D,) ou matrice (N, D).
+
+    Returns:
+        np.ndarray: Vecteurs normalisés en float32.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class ReferenceIndex:
+    """
+    Base d'embeddings de référence multi-exemplaires interrogeable par similarité cosinus.
+
+    Attributes:
+        embeddings (np.ndarray): Matrice (N, D) float32 normalisée L2, regroupée par classe.
+        labels (np.ndarray): Labels de classe (N,) alignés sur ``embeddings``.
+        classes (np.ndarray): Classes distinctes (C,), dans l'ordre des blocs de ``embeddings``.
+        aggregation (str): Agrégation par défaut des scores par classe.
+        top_m (int): Nombre d'exemplaires moyennés pour l'agrégation ``mean_topm``.
+        backend (VectorIndex): Backend de recherche des exemplaires.
+        candidates (int): Exemplaires récupérés par requête avec un backend approximatif.
+    """
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        labels: Sequence[str],
+        aggregation: str = "max",
+        top_m: int = 3,
+        backend: Optional[VectorIndex] = None,
+        candidates: int = 100,
+    ):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or embeddings.shape[0] != len(labels):
+            raise ValueError(f"Matrice d'embeddings {embeddings.shape} incompatible avec {len(labels)} labels")
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f"Agrégation inconnue : {aggregation} (attendu : {', '.join(AGGREGATIONS)})")
+
+        self.aggregation = aggregation
+        self.top_m = max(1, int(top_m))
+        self.backend = backend or ExactIndex()
+        self.candidates = max(1, int(candidates))
+
+        # Regroupe les exemplaires par classe : chaque classe occupe un bloc contigu
+        labels = np.asarray(labels, dtype=object)
+        self.classes, class_ids = np.unique(labels, return_inverse=True)
+        order = np.argsort(class_ids, kind="stable")
+        self.embeddings = np.ascontiguousarray(l2_normalize(embeddings[order]))
+        self.labels = labels[order]
+        self._build_class_structure(np.asarray(class_ids, dtype=np.int64)[order])
+
+    @classmethod
+    def from_normalized(
+        cls,
+        embeddings: np.ndarray,
+        labels: Sequence[str],
+        aggregation: str = "max",
+        top_m: int = 3,
+        backend: Optional[VectorIndex] = None,
+        candidates: int = 100,
+    ):
+        """
+        Construit un index à partir d'une matrice déjà normalisée et regroupée par classe.
+
+        La matrice est utilisée telle quelle, sans copie : elle peut donc être un
+        memory-map en lecture seule (voir ``reference_store``).
+
+        Args:
+            embeddings (np.ndarray): Matrice (N, D) float32 normalisée L2, triée par classe.
+            labels (Sequence[str]): Labels alignés sur ``embeddings``.
+            aggregation (str): Agrégation par défaut des scores par classe.
+            top_m (int): Nombre d'exemplaires pour ``mean_topm``.
+            backend (VectorIndex, optional): Backend de recherche (exact par défaut).
+            candidates (int): Exemplaires récupérés par requête avec un backend approximatif.
+
+        Returns:
+            ReferenceIndex: Index prêt à être interrogé.
+        """
+        index = cls(np.empty((0, embeddings.shape[1]), dtype=np.float32), [], aggregation, top_m, backend, candidates)
+        labels = np.asarray(labels, dtype=object)
+        index.classes, class_ids = np.unique(labels, return_inverse=True)
+        if np.any(np.diff(class_ids) < 0):
+            raise ValueError("Les embeddings doivent être regroupés par classe")
+        index.embeddings = embeddings
+        index.labels = labels
+        index._build_class_structure(np.asarray(class_ids, dtype=np.int64))
+        return index
+
+    def _build_class_structure(self, class_ids: np.ndarray):
+        """Précalcule les blocs par classe, la matrice d'indices rembourrée et les centroïdes."""
+        n_classes = len(self.classes)
+        self.class_ids = class_ids
+        self.counts = np.bincount(class_ids, minlength=n_classes)
+        self.offsets = (np.cumsum(self.counts) - self.counts).astype(np.int64)
+
+        # Matrice (C, max_count) des indices de chaque classe ; le masque marque le rembourrage
+        max_count = int(self.counts.max()) if n_classes else 0
+        positions = np.arange(max_count)
+        self._padding_mask = positions[None, :] >= self.counts[:, None]
+        self._padded_index = np.where(self._padding_mask, 0, self.offsets[:, None] + positions[None, :])
+
+        if n_classes:
+            sums = np.add.reduceat(self.embeddings, self.offsets, axis=0)
+            self.centroids = np.ascontiguousarray(l2_normalize(sums))
+        else:
+            self.centroids = np.empty((0, self.embeddings.shape[1]), dtype=np.float32)
+
+        if len(self):
+            self.backend.build(self.embeddings)
+
+    def __len__(self) -> int:
+        return self.embeddings.shape[0]
+
+    def class_scores(self, queries: np.ndarray, aggregation: Optional[str] = None, top_m: Optional[int] = None) -> np.ndarray:
+        """
+        Calcule le score agrégé de chaque classe pour un lot de requêtes.
+
+        Args:
+            queries (np.ndarray): Embeddings requêtes (B, D).
+            aggregation (str, optional): ``max``, ``mean_topm`` ou ``centroid``.
+            top_m (int, optional): Nombre d'exemplaires pour ``mean_topm``.
+
+        Returns:
+            np.ndarray: Scores (B, C) alignés sur ``classes``.
+        """
+        aggregation = aggregation or self.aggregation
+        queries = l2_normalize(queries).reshape(-1, self.embeddings.shape[1])
+
+        if aggregation == "centroid":
+            return queries @ self.centroids.T
+
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f"Agrégation inconnue : {aggregation}")
+        m = 1 if aggregation == "max" else (top_m or self.top_m)
+        if not self.backend.exhaustive:
+            return self._candidate_class_scores(queries, m)
+
+        # Les deux côtés étant normalisés, le produit scalaire est la similarité cosinus
+        scores = self.backend.scores(queries)
+        if aggregation == "max":
+            return np.maximum.reduceat(scores, self.offsets, axis=1)
+        return self._mean_top_m(scores, m)
+
+    def _mean_top_m(self, scores: np.ndarray, m: int) -> np.ndarray:
+        """Moyenne des m meilleurs scores de chaque classe (moins si la classe est plus petite)."""
+        padded = np.where(self._padding_mask, -np.inf, scores[:, self._padded_index])
+        if m < padded.shape[2]:
+            padded = -np.partition(-padded, m - 1, axis=2)[:, :, :m]
+        valid = np.isfinite(padded)
+        return np.where(valid, padded, 0.0).sum(axis=2) / np.maximum(valid.sum(axis=2), 1)
+
+    def _candidate_class_scores(self, queries: np.ndarray, m: int) -> np.ndarray:
+        """
+        Agrège par classe les seuls exemplaires retournés par un backend approximatif.
+
+        Moyenne des m meilleurs candidats de chaque classe (m = 1 pour ``max``) ;
+        les classes sans candidat reçoivent ``-inf``.
+        """
+        n_queries, n_classes = len(queries), len(self.classes)
+        scores, ids = self.backend.search(queries, min(self.candidates, len(self)))
+
+        # Clé (requête, classe) de chaque candidat ; les scores sont déjà triés par requête
+        rows = np.repeat(np.arange(n_queries), ids.shape[1])
+        found = ids.ravel() >= 0
+        keys = rows[found] * n_classes + self.class_ids[ids.ravel()[found]]
+        values = scores.ravel()[found]
+
+        # Rang de chaque candidat dans sa classe : le tri stable conserve l'ordre décroissant
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        _, first, inverse = np.unique(sorted_keys, return_index=True, return_inverse=True)
+        keep = order[np.arange(len(order)) - first[inverse] < m]
+
+        sums = np.zeros(n_queries * n_classes, dtype=np.float64)
+        counts = np.zeros(n_queries * n_classes, dtype=np.int64)
+        np.add.at(sums, keys[keep], values[keep])
+        np.add.at(counts, keys[keep], 1)
+        class_scores = np.full(n_queries * n_classes, -np.inf)
+        np.divide(sums, counts, out=class_scores, where=counts > 0)
+        return class_scores.reshape(n_queries, n_classes)
+
+    def search_batch(
+        self, queries: np.ndarray, k: int = 5, aggregation: Optional[str] = None, top_m: Optional[int] = None
+    ) -> List[List[Dict[str, float]]]:
+        """
+        Trouve les k classes les plus similaires pour chaque requête d'un lot.
+
+        Args:
+            queries (np.ndarray): Embeddings requêtes (B, D).
+            k (int): Nombre de classes à retourner par requête.
+            aggregation (str, optional): Agrégation des scores par classe.
+            top_m (int, optional): Nombre d'exemplaires pour ``mean_topm``.
+
+        Returns:
+            List[List[Dict[str, float]]]: Pour chaque requête, les correspondances
+            ``{"class", "similarity"}`` triées par similarité décroissante.
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        if len(self) == 0:
+            return [[] for _ in range(queries.reshape(-1, queries.shape[-1]).shape[0])]
+
+        scores = self.class_scores(queries, aggregation, top_m)
+        top = top_k_indices(scores, k)
+        return [
+            [{"class": self.classes[c], "similarity": float(row_scores[c])} for c in row_top if np.isfinite(row_scores[c])]
+            for row_scores, row_top in zip(scores, top)
+        ]
+
+    def search(
+        self, query_emb: np.ndarray, k: int = 5, aggregation: Optional[str] = None, top_m: Optional[int] = None
+    ) -> List[Dict[str, float]]:
+        """
+        Trouve les k classes les plus similaires à un embedding requête.
+
+        Args:
+            query_emb (np.ndarray): Embedding de l'image inconnue (D,).
+            k (int): Nombre de correspondances à retourner.
+            aggregation (str, optional): Agrégation des scores par classe.
+            top_m (int, optional): Nombre d'exemplaires pour ``mean_topm``.
+
+        Returns:
+            List[Dict[str, float]]: Correspondances ``{"class", "similarity"}``
+            triées par similarité décroissante.
+        """
+        return self.search_batch(np.asarray(query_emb, dtype=np.float32).reshape(1, -1), k, aggregation, top_m)[0]
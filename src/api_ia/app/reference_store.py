@@ -0,0 +1,206 @@
+"""
+Stockage persistant des embeddings de référence.
+
+Les embeddings sont précalculés hors ligne et écrits dans un fichier ``.npy``
+(matrice float32 déjà normalisée et regroupée par classe) accompagné d'un
+fichier ``.json`` de métadonnées : labels, empreinte SHA-256 des poids du
+modèle, configuration de prétraitement et version du format. Au démarrage,
+la matrice est chargée en *memory-map* au lieu de ré-encoder chaque image.
+
+Le ``.json`` est le seul point de publication : il désigne la matrice par son
+nom (``<store>.<empreinte>.npy``, jamais réécrite). Une nouvelle version est
+écrite dans un nouveau fichier, puis publiée en remplaçant le ``.json`` ; un
+lecteur (rechargement à chaud, autre worker) voit donc l'ancien couple ou le
+nouveau, jamais une matrice et des labels de versions différentes. La matrice
+précédente est conservée pour les lectures en cours, les plus anciennes sont
+supprimées.
+
+Quand les poids changent, chaque worker trouve le store obsolète : ``store_lock``
+réserve la reconstruction à un seul processus, les autres chargent ensuite le
+store qu'il a publié (pages partagées) au lieu de ré-encoder chacun les images.
+"""
+
+import fcntl
+import glob
+import hashlib
+import json
+import logging
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STORE_FORMAT_VERSION = 2
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Calcule l'empreinte SHA-256 d'un fichier (utilisée pour les poids du modèle).
+
+    Args:
+        path (str): Chemin du fichier.
+        chunk_size (int): Taille des blocs lus.
+
+    Returns:
+        str: Empreinte hexadécimale.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def references_fingerprint(references: List[Tuple[str, str]]) -> str:
+    """
+    Empreinte de la liste des images de référence (classe, nom et taille de fichier).
+
+    Args:
+        references (List[Tuple[str, str]]): Couples (classe, chemin de l'image).
+
+    Returns:
+        str: Empreinte hexadécimale.
+    """
+    digest = hashlib.sha256()
+    for cls, path in references:
+        digest.update(f"{cls}/{os.path.basename(path)}:{os.path.getsize(path)}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def metadata_path(store_path: str) -> str:
+    """Chemin du fichier de métadonnées associé à un store ``.npy``."""
+    return os.path.splitext(store_path)[0] + ".json"
+
+
+def data_path(store_path: str, data_file: str) -> str:
+    """Chemin d'une matrice désignée par les métadonnées (``data_file``)."""
+    return os.path.join(os.path.dirname(os.path.abspath(store_path)), data_file)
+
+
+@contextmanager
+def store_lock(store_path: str):
+    """
+    Verrou exclusif entre processus (``flock`` sur ``<store>.lock``) pendant la reconstruction d'un store.
+
+    Sans effet (avertissement) si le fichier de verrou ne peut pas être créé.
+    """
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(store_path)), exist_ok=True)
+        lock = open(os.path.splitext(store_path)[0] + ".lock", "a")
+    except OSError as e:
+        logger.warning(f"Verrou du store de références indisponible : {e}")
+        yield
+        return
+    with lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def remove_stale_data(store_path: str, keep: List[str]):
+    """Supprime les matrices du store qui ne sont pas dans ``keep`` (noms de fichiers)."""
+    pattern = glob.escape(os.path.splitext(os.path.abspath(store_path))[0]) + ".*.npy"
+    for path in glob.glob(pattern):
+        if os.path.basename(path) not in keep:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Impossible de supprimer l'ancienne matrice {path} : {e}")
+
+
+def save_reference_store(store_path: str, embeddings: np.ndarray, labels: List[str], metadata: Dict[str, Any]):
+    """
+    Écrit la matrice d'embeddings et ses métadonnées de manière atomique.
+
+    Args:
+        store_path (str): Chemin du store ``.npy`` : les métadonnées (``.json``) et les
+            matrices (``<nom>.<empreinte>.npy``) sont écrites à côté.
+        embeddings (np.ndarray): Matrice (N, D) normalisée et regroupée par classe.
+        labels (List[str]): Labels alignés sur ``embeddings``.
+        metadata (Dict[str, Any]): Empreinte des poids, prétraitement, etc.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(store_path)), exist_ok=True)
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    # Nom unique par contenu : un fichier publié n'est jamais réécrit
+    digest = hashlib.sha256(embeddings.tobytes())
+    digest.update(json.dumps(list(labels)).encode("utf-8"))
+    data_file = f"{os.path.splitext(os.path.basename(store_path))[0]}.{digest.hexdigest()[:16]}.npy"
+    meta = dict(metadata)
+    meta.update(
+        {
+            "format_version": STORE_FORMAT_VERSION,
+            "created_at": datetime.utcnow().isoformat(),
+            "shape": list(embeddings.shape),
+            "dtype": "float32",
+            "labels": list(labels),
+            "data_file": data_file,
+        }
+    )
+    previous = None
+    try:
+        with open(metadata_path(store_path), "r", encoding="utf-8") as f:
+            previous = json.load(f).get("data_file")
+    except (OSError, ValueError):
+        pass
+
+    # Matrice écrite dans son propre fichier, puis métadonnées remplacées en une opération :
+    # un worker ne lit jamais un store à moitié écrit ni un couple matrice / labels dépareillé
+    tmp_npy = f"{data_path(store_path, data_file)}.{os.getpid()}.tmp"
+    tmp_json = f"{metadata_path(store_path)}.{os.getpid()}.tmp"
+    with open(tmp_npy, "wb") as f:
+        np.save(f, embeddings)
+    os.replace(tmp_npy, data_path(store_path, data_file))
+    with open(tmp_json, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_json, metadata_path(store_path))
+    remove_stale_data(store_path, keep=[data_file, previous])
+    logger.info(f"Store de références écrit : {store_path} ({embeddings.shape[0]} embeddings)")
+
+
+def load_reference_store(
+    store_path: str, expected: Dict[str, Any], mmap: bool = True
+) -> Optional[Tuple[np.ndarray, List[str], Dict[str, Any]]]:
+    """
+    Charge un store de références s'il existe et correspond à la configuration attendue.
+
+    Args:
+        store_path (str): Chemin du store ``.npy`` (voir ``save_reference_store``).
+        expected (Dict[str, Any]): Métadonnées à vérifier (ex. ``weights_sha256``,
+            ``preprocessing``) ; toute différence invalide le store.
+        mmap (bool): Charger la matrice en memory-map (lecture seule).
+
+    Returns:
+        Optional[Tuple[np.ndarray, List[str], Dict[str, Any]]]: (embeddings, labels,
+        métadonnées), ou None si le store est absent, obsolète ou illisible.
+    """
+    if not os.path.exists(metadata_path(store_path)):
+        logger.info(f"Aucun store de références trouvé : {store_path}")
+        return None
+
+    try:
+        with open(metadata_path(store_path), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        if meta.get("format_version") != STORE_FORMAT_VERSION:
+            logger.warning(f"Store de références au format {meta.get('format_version')} ignoré")
+            return None
+        for key, value in expected.items():
+            if meta.get(key) != value:
+                logger.warning(f"Store de références obsolète ({key} différent), reconstruction nécessaire")
+                return None
+
+        embeddings = np.load(data_path(store_path, meta["data_file"]), mmap_mode="r" if mmap else None)
+        if embeddings.shape != tuple(meta["shape"]) or embeddings.shape[0] != len(meta["labels"]):
+            logger.warning("Store de références incohérent avec ses métadonnées")
+            return None
+        return embeddings, meta["labels"], meta
+
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Erreur lors de la lecture du store de références : {e}")
+        return None
@@ -4,6 +4,7 @@ Gère la validation des entrées, les tokens et les logs de sécurité
 """
 
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional, Tuple
 from pydantic import BaseModel, EmailStr
 import jwt
@@ -11,21 +12,28 @@ from fastapi import HTTPException, status
 import logging
 import os
 from logging.handlers import RotatingFileHandler
-from passlib.context import CryptContext
-from api_ia.app.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, ROTATION_THRESHOLD_MINUTES, LOG_DIR
+from api_ia.app.config import (
+    SECRET_KEY,
+    ALGORITHM,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    ROTATION_THRESHOLD_MINUTES,
+    SECURITY_LOG_DIR,
+    IMAGE_MAX_SIDE,
+    IMAGE_MAX_PIXELS,
+    USER_CACHE_TTL_SECONDS,
+    USER_CACHE_SIZE,
+)
 from .database import get_db_connection
-import magic
+from .image_header import ImageHeaderError, read_image_header, sniff_mime_type
+from .ttl_cache import TTLCache
 
 
 # Logger sécurité
 def setup_security_logging():
-    log_path = os.path.join(LOG_DIR, "security")
-    os.makedirs(log_path, exist_ok=True)
-
     logger = logging.getLogger("security")
     logger.setLevel(logging.INFO)
 
-    handler = RotatingFileHandler(os.path.join(log_path, "security.log"), maxBytes=1024 * 1024, backupCount=5)
+    handler = RotatingFileHandler(os.path.join(SECURITY_LOG_DIR, "security.log"), maxBytes=1024 * 1024, backupCount=5)
     formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
     handler.setFormatter(formatter)
     logger.addHandler(handler)
@@ -59,15 +67,25 @@ TOKEN_SETTINGS = {
 # Token versions (en mémoire)
 token_versions = {}
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=12)
+# Cache des utilisateurs : TTL court, invalidé à chaque nouveau token (les callbacks de métriques sont posés par main)
+user_cache = TTLCache(max_entries=USER_CACHE_SIZE, ttl_seconds=USER_CACHE_TTL_SECONDS)
+
+
+@lru_cache(maxsize=None)
+def password_context():
+    """Contexte passlib, créé (et passlib importé) à la première vérification de mot de passe."""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=12)
 
 
 # Auth
 def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+    return password_context().verify(plain, hashed)
 
 
-def get_user(username: str):
+def fetch_user(username: str):
+    """Lit l'utilisateur en base (une connexion par appel) ; None s'il est absent ou en cas d'erreur."""
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -80,8 +98,22 @@ def get_user(username: str):
     return None
 
 
+def get_user(username: str, use_cache: bool = True):
+    """
+    Retourne l'utilisateur, depuis le cache s'il y a été lu il y a moins de ``USER_CACHE_TTL_SECONDS``.
+
+    Args:
+        username (str): Nom d'utilisateur.
+        use_cache (bool): False pour forcer la lecture en base (le cache est alors rafraîchi).
+    """
+    if not use_cache:
+        user_cache.invalidate(username)
+    return user_cache.get_or_load(username, lambda: fetch_user(username))
+
+
 def authenticate_user(username: str, password: str):
-    user = get_user(username)
+    # Toujours relu en base : un mot de passe changé ou un compte désactivé est pris en compte dès la connexion
+    user = get_user(username, use_cache=False)
     if not user:
         return False
     if not verify_password(password, user["hashed_password"]):
@@ -93,6 +125,7 @@ def authenticate_user(username: str, password: str):
 def create_access_token(username: str) -> Tuple[str, int]:
     current_version = token_versions.get(username, 0) + 1
     token_versions[username] = current_version
+    user_cache.invalidate(username)
 
     expire = datetime.utcnow() + timedelta(minutes=TOKEN_SETTINGS["ACCESS_TOKEN_EXPIRE_MINUTES"])
     payload = {"sub": username, "exp": expire, "token_version": current_version}
@@ -141,7 +174,7 @@ def verify_token(token: str) -> TokenData:
 # Validation fichier
 def check_mime_type(file_content: bytes) -> Tuple[bool, str]:
     """
-    Vérifie le type MIME d'un fichier en utilisant python-magic.
+    Vérifie le type MIME d'un fichier d'après sa signature (JPEG, PNG, GIF, BMP ou WEBP).
 
     Args:
         file_content (bytes): Contenu du fichier à vérifier
@@ -149,26 +182,27 @@ def check_mime_type(file_content: bytes) -> Tuple[bool, str]:
     Returns:
         Tuple[bool, str]: (est_valide, type_mime)
     """
-    try:
-        mime = magic.Magic(mime=True)
-        mime_type = mime.from_buffer(file_content)
-
-        # Types MIME autorisés pour les images
-        allowed_mime_types = {"image/jpeg", "image/png", "image/gif", "image/bmp", "image/webp"}
-
-        return mime_type in allowed_mime_types, mime_type
-    except Exception as e:
-        log_security_event("MIME_CHECK_ERROR", str(e), "ERROR")
-        return False, "unknown"
+    mime_type = sniff_mime_type(file_content)
+    return mime_type is not None, mime_type or "unknown"
 
 
-def validate_image_file(file_content: bytes, max_size: int = 5 * 1024 * 1024) -> bool:
+def validate_image_file(
+    file_content: bytes,
+    max_size: int = 5 * 1024 * 1024,
+    max_side: int = IMAGE_MAX_SIDE,
+    max_pixels: int = IMAGE_MAX_PIXELS,
+) -> bool:
     """
-    Valide un fichier image en vérifiant sa taille et son type MIME.
+    Valide un fichier image en vérifiant sa taille, son format et ses dimensions (lus dans l'en-tête).
+
+    Les dimensions sont contrôlées avant tout décodage : une bombe de décompression
+    (image de quelques Ko annonçant des milliards de pixels) n'atteint pas PIL.
 
     Args:
         file_content (bytes): Contenu du fichier à valider
         max_size (int): Taille maximale autorisée en octets (défaut: 5MB)
+        max_side (int): Largeur et hauteur maximales en pixels
+        max_pixels (int): Nombre maximal de pixels (largeur x hauteur)
 
     Returns:
         bool: True si le fichier est valide, False sinon
@@ -178,18 +212,16 @@ def validate_image_file(file_content: bytes, max_size: int = 5 * 1024 * 1024) ->
         log_security_event("FILE_TOO_LARGE", f"Taille : {len(file_content)} > {max_size}", "WARNING")
         return False
 
-    # Vérification du type MIME
-    is_valid_mime, mime_type = check_mime_type(file_content)
-    if not is_valid_mime:
-        log_security_event("INVALID_FILE_TYPE", f"Type MIME non autorisé : {mime_type}", "WARNING")
+    # Vérification du format (signature) et lecture des dimensions
+    try:
+        info = read_image_header(file_content)
+    except ImageHeaderError as e:
+        log_security_event("INVALID_FILE_TYPE", f"Image non autorisée : {e}", "WARNING")
         return False
 
-    # Vérification des signatures de fichier (double vérification)
-    allowed_signatures = [b"\xFF\xD8\xFF", b"\x89\x50\x4E\x47"]
-    is_valid_signature = any(file_content.startswith(sig) for sig in allowed_signatures)
-
-    if not is_valid_signature:
-        log_security_event("INVALID_FILE_SIGNATURE", "Signature de fichier non autorisée", "WARNING")
+    # Vérification des dimensions
+    if info.width > max_side or info.height > max_side or info.pixels > max_pixels:
+        log_security_event("IMAGE_TOO_LARGE", f"Dimensions : {info.width}x{info.height} ({info.format})", "WARNING")
         return False
 
     return True
@@ -1,43 +1,223 @@
-from sklearn.metrics.pairwise import cosine_similarity
+import hashlib
+import json
+import logging
 import numpy as np
 import os
-from PIL import Image
-import torch
-from api_ia.app.model_loader import preprocess_image
-from api_ia.app.config import REFERENCE_DIR
+from api_ia.app.model_loader import embed_images, PREPROCESSOR, PREPROCESSING_CONFIG
+from api_ia.app.config import (
+    MODEL_WEIGHTS_PATH,
+    INFERENCE_RUNTIME,
+    REFERENCE_DIR,
+    REFERENCE_AGGREGATION,
+    REFERENCE_TOP_M,
+    REFERENCE_MAX_PER_CLASS,
+    REFERENCE_BATCH_SIZE,
+    REFERENCE_STORE_PATH,
+    REFERENCE_STORE_MMAP,
+    INDEX_BACKEND,
+    INDEX_CANDIDATES,
+    IVF_N_LISTS,
+    IVF_N_PROBE,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+)
+from api_ia.app.inference_runtime import QUANTIZED_RUNTIMES
+from api_ia.app.reference_index import ReferenceIndex
+from api_ia.app.vector_index import create_vector_index
+from api_ia.app.reference_store import (
+    file_sha256,
+    references_fingerprint,
+    load_reference_store,
+    save_reference_store,
+    store_lock,
+)
 
-reference_embeddings = []
+logger = logging.getLogger(__name__)
 
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
 
-def load_references(model):
+reference_index = ReferenceIndex(np.empty((0, 0), dtype=np.float32), [])
+model_version = None  # fixé par load_references
+
+
+def list_reference_images(reference_dir=REFERENCE_DIR, max_per_class=REFERENCE_MAX_PER_CLASS):
+    """
+    Liste les images de référence de chaque classe : l'image officielle
+    ``{cls}/{cls}.png`` en premier, puis les exemplaires augmentés.
+
+    Returns:
+        List[Tuple[str, str]]: Couples (classe, chemin de l'image).
+    """
+    if not os.path.exists(reference_dir):
+        raise FileNotFoundError(f"Le répertoire de référence {reference_dir} n'existe pas")
+
+    references = []
+    for cls in sorted(os.listdir(reference_dir)):
+        class_dir = os.path.join(reference_dir, cls)
+        if not os.path.isdir(class_dir):
+            continue
+        official = f"{cls}.png"
+        files = sorted(f for f in os.listdir(class_dir) if f.lower().endswith(IMAGE_EXTENSIONS) and f != official)
+        if os.path.exists(os.path.join(class_dir, official)):
+            files.insert(0, official)
+        if max_per_class > 0:
+            files = files[:max_per_class]
+        references.extend((cls, os.path.join(class_dir, f)) for f in files)
+    return references
+
+
+def create_backend(backend=INDEX_BACKEND):
+    """
+    Instancie le backend de recherche configuré dans ``config.py``.
+    """
+    params = {
+        "ivf": {"n_lists": IVF_N_LISTS, "n_probe": IVF_N_PROBE},
+        "hnsw": {"m": HNSW_M, "ef_construction": HNSW_EF_CONSTRUCTION, "ef_search": HNSW_EF_SEARCH},
+    }
+    return create_vector_index(backend, **params.get(backend, {}))
+
+
+def encode_references(model, references, on_progress=None):
+    """
+    Encode les images de référence par lots et construit l'index correspondant.
+
+    Args:
+        model: Modèle d'embedding.
+        references (List[Tuple[str, str]]): Couples (classe, chemin de l'image).
+        on_progress (Callable[[int, int], None], optional): Appelé après chaque lot avec
+            le nombre d'images encodées et le total.
+
+    Returns:
+        ReferenceIndex: Index construit sur tous les exemplaires.
+    """
+    embeddings, labels = [], []
+    for start in range(0, len(references), REFERENCE_BATCH_SIZE):
+        chunk = references[start : start + REFERENCE_BATCH_SIZE]
+        embeddings.append(embed_images(model, [PREPROCESSOR.open(path) for _, path in chunk]))
+        labels.extend(cls for cls, _ in chunk)
+        if on_progress:
+            on_progress(len(labels), len(references))
+
+    return ReferenceIndex(
+        np.concatenate(embeddings) if embeddings else np.empty((0, 0), dtype=np.float32),
+        labels,
+        aggregation=REFERENCE_AGGREGATION,
+        top_m=REFERENCE_TOP_M,
+        backend=create_backend(),
+        candidates=INDEX_CANDIDATES,
+    )
+
+
+def reference_store_metadata(references, weights_path=MODEL_WEIGHTS_PATH):
+    """
+    Métadonnées qui doivent correspondre pour réutiliser un store précalculé :
+    poids du modèle, prétraitement, liste des images de référence et quantification
+    (les embeddings INT8 ne sont pas mélangés avec des embeddings float32).
+    """
+    return {
+        "weights_sha256": file_sha256(weights_path),
+        "preprocessing": PREPROCESSING_CONFIG,
+        "references_sha256": references_fingerprint(references),
+        "max_per_class": REFERENCE_MAX_PER_CLASS,
+        "quantization": INFERENCE_RUNTIME if INFERENCE_RUNTIME in QUANTIZED_RUNTIMES else None,
+    }
+
+
+def build_reference_store(model, store_path=REFERENCE_STORE_PATH, weights_path=MODEL_WEIGHTS_PATH):
+    """
+    Encode toutes les références et écrit le store précalculé sur disque.
+
+    Returns:
+        ReferenceIndex: Index construit.
+    """
+    references = list_reference_images()
+    index = encode_references(model, references)
+    save_reference_store(store_path, index.embeddings, list(index.labels), reference_store_metadata(references, weights_path))
+    return index
+
+
+def compute_model_version(metadata):
+    """
+    Identifiant court de ce qui détermine embeddings et correspondances : poids,
+    prétraitement, références, moteur d'inférence et paramètres de recherche.
+    Sert de préfixe aux clés du cache d'embeddings.
+    """
+    described = {
+        **metadata,
+        "runtime": INFERENCE_RUNTIME,
+        "aggregation": REFERENCE_AGGREGATION,
+        "top_m": REFERENCE_TOP_M,
+        "backend": INDEX_BACKEND,
+    }
+    return hashlib.sha256(json.dumps(described, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def load_references(model, on_progress=None):
     """
     Cette fonction permet donc de créer une base de données d'embeddings de référence
     qui pourra être utilisée plus tard pour comparer des images inconnues aux
     images de référence par similarité.
+
+    Le store précalculé est chargé (en memory-map) s'il correspond aux poids et au
+    prétraitement courants ; sinon tous les exemplaires sont ré-encodés par lots et
+    le store est réécrit, par un seul processus à la fois (``store_lock``) : un
+    worker qui attendait le verrou charge le store que l'autre vient de publier.
+
+    Args:
+        model: Modèle d'embedding.
+        on_progress (Callable[[int, int], None], optional): Progression de l'encodage
+            (images encodées, total) quand le store doit être reconstruit.
+
+    Returns:
+        ReferenceIndex: Index chargé (aussi affecté à ``reference_index``).
     """
-    if not os.path.exists(REFERENCE_DIR):
-        raise FileNotFoundError(f"Le répertoire de référence {REFERENCE_DIR} n'existe pas")
+    global reference_index, model_version
 
-    for cls in os.listdir(REFERENCE_DIR):
-        path = os.path.join(REFERENCE_DIR, cls, f"{cls}.png")
-        if not os.path.exists(path):
-            continue
-        img = Image.open(path).convert("L")
-        tensor = preprocess_image(img)
-        with torch.no_grad():  # indique de ne pas calculer les gradients, économise des ressources
-            emb = model.forward_one(tensor).cpu().numpy()[0]
-        reference_embeddings.append((cls, emb))
+    references = list_reference_images()
+    expected = reference_store_metadata(references)
+    model_version = compute_model_version(expected)
+    stored = load_reference_store(REFERENCE_STORE_PATH, expected, mmap=REFERENCE_STORE_MMAP)
+    if stored is None:
+        # Rechargement à chaud dans chaque worker : un seul ré-encode, les autres attendent puis chargent son store
+        with store_lock(REFERENCE_STORE_PATH):
+            stored = load_reference_store(REFERENCE_STORE_PATH, expected, mmap=REFERENCE_STORE_MMAP)
+            if stored is None:
+                logger.info(f"Encodage de {len(references)} images de référence...")
+                reference_index = encode_references(model, references, on_progress)
+                try:
+                    save_reference_store(
+                        REFERENCE_STORE_PATH, reference_index.embeddings, list(reference_index.labels), expected
+                    )
+                except OSError as e:
+                    logger.warning(f"Impossible d'écrire le store de références : {e}")
+                return reference_index
+
+    embeddings, labels, _ = stored
+    reference_index = ReferenceIndex.from_normalized(
+        embeddings,
+        labels,
+        aggregation=REFERENCE_AGGREGATION,
+        top_m=REFERENCE_TOP_M,
+        backend=create_backend(),
+        candidates=INDEX_CANDIDATES,
+    )
+    logger.info(f"{len(reference_index)} embeddings de référence chargés depuis {REFERENCE_STORE_PATH}")
+    return reference_index
 
 
 def get_top_matches(query_emb, k=5):
     """
-    Cette fonction permet de trouver les k images de référence les plus similaires
+    Cette fonction permet de trouver les k classes de référence les plus similaires
     à l'image inconnue.
     """
-    scores = []
-    for cls, ref_emb in reference_embeddings:
-        sim = cosine_similarity([query_emb], [ref_emb])[0][0]
-        #  La similarité cosinus est une mesure de similarité entre deux vecteurs qui varie de -1 (complètement différent) à 1 (identique).
-        scores.append((cls, sim))
-    top = sorted(scores, key=lambda x: x[1], reverse=True)[:k]
-    return [{"class": c, "similarity": float(s)} for c, s in top]
+    #  La similarité cosinus est une mesure de similarité entre deux vecteurs qui varie de -1 (complètement différent) à 1 (identique).
+    return reference_index.search(query_emb, k)
+
+
+def get_top_matches_batch(query_embs, k=5):
+    """
+    Variante par lot de ``get_top_matches`` : une seule multiplication matricielle
+    pour toutes les requêtes.
+    """
+    return reference_index.search_batch(query_embs, k)
@@ -0,0 +1,386 @@
+"""
+Index inversé en mémoire des tags des verres, pour ``/search_tags``.
+
+Chaque verre occupe une position ; chaque tag (normalisé, voir
+``api_ia.app.tags``) est associé au bitset (entier Python) des positions des
+verres qui le portent, et chaque ensemble canonique de tags au bitset des
+verres qui ont exactement cet ensemble. Les recherches sont des opérations sur
+ces bitsets :
+
+- ``exact`` : une lecture dans la table des ensembles canoniques ;
+- ``superset`` (verres portant au moins tous les tags demandés) : ET des bitsets ;
+- ``subset`` (verres dont tous les tags font partie de la demande) : OU des
+  bitsets des sous-ensembles de la demande dans la table des ensembles
+  canoniques (ou, pour une longue demande, OU des bitsets demandés privé des
+  bitsets des autres tags).
+
+Pour les recherches partielles classées (``rank``), l'index tient aussi une
+matrice creuse verres × tags (``TagMatrix``, stockée par colonne : pour chaque
+tag, les positions des verres qui le portent). Seules les colonnes des tags
+demandés sont lues : le coût est proportionnel au nombre de verres portant ces
+tags, pas à la taille du catalogue.
+
+``TagIndexRefresher`` construit l'index au démarrage puis le tient à jour
+périodiquement : seules les lignes modifiées depuis la dernière version
+(colonne ``rowversion``) sont relues ; l'index est reconstruit entièrement si
+le nombre de verres en base ne correspond plus (suppressions). Les verres lus
+mais écartés de l'index (tags illisibles) sont
+comptés à chaque reconstruction pour ne pas fausser cette comparaison.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from itertools import combinations
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from api_ia.app.tags import canonical_tags, normalize_tag
+
+logger = logging.getLogger(__name__)
+
+MODES = ("exact", "superset", "subset")
+# Scores des recherches classées : indice de Jaccard, coefficient de recouvrement, somme des poids des tags communs
+RANK_METRICS = ("jaccard", "overlap", "weighted")
+
+# Au-delà de ce nombre de tags demandés, ``subset`` n'énumère plus les sous-ensembles de la demande
+SUBSET_ENUMERATION_MAX_TAGS = 8
+
+
+def bit_positions(bits: int) -> np.ndarray:
+    """Positions des bits à 1, par ordre croissant."""
+    if not bits:
+        return np.empty(0, dtype=np.int64)
+    raw = np.frombuffer(bits.to_bytes((bits.bit_length() + 7) // 8, "little"), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder="little"))
+
+
+class TagMatrix:
+    """
+    Matrice binaire creuse verres × tags au format CSC.
+
+    Args:
+        tag_sets (List[Optional[frozenset]]): Ensemble de tags de chaque position (None si libre).
+        ids (List): Identifiant du verre de chaque position (ignoré si libre).
+    """
+
+    def __init__(self, tag_sets: List[Optional[frozenset]], ids: List[Any]):
+        postings: Dict[str, List[int]] = {}
+        for position, tag_set in enumerate(tag_sets):
+            for tag in tag_set or ():
+                postings.setdefault(tag, []).append(position)
+        self.columns = {tag: column for column, tag in enumerate(postings)}
+        self.indptr = np.zeros(len(postings) + 1, dtype=np.int64)
+        np.cumsum([len(rows) for rows in postings.values()], out=self.indptr[1:])
+        self.indices = np.fromiter((p for rows in postings.values() for p in rows), dtype=np.int64, count=self.indptr[-1])
+        self.row_sizes = np.array([len(tag_set or ()) for tag_set in tag_sets], dtype=np.float64)
+        # Rang de chaque position par id croissant : départage des ex aequo sans comparer les ids eux-mêmes
+        self.id_rank = np.empty(len(tag_sets), dtype=np.int64)
+        self.id_rank[sorted(range(len(ids)), key=lambda p: (ids[p] is None, ids[p] if ids[p] is not None else 0))] = np.arange(
+            len(ids)
+        )
+
+    def scores(self, weights: Dict[str, float], metric: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score des verres portant au moins un des tags demandés.
+
+        Args:
+            weights (Dict[str, float]): Tags normalisés demandés et leur poids.
+            metric (str): ``jaccard``, ``overlap`` ou ``weighted``.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Positions des verres candidats et leurs scores.
+        """
+        columns = [self.columns[tag] for tag in weights if tag in self.columns]
+        if not columns:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        starts, ends = self.indptr[columns], self.indptr[np.add(columns, 1)]
+        rows = np.concatenate([self.indices[start:end] for start, end in zip(starts, ends)])
+        if metric == "weighted":
+            column_weights = [weights[tag] for tag in weights if tag in self.columns]
+            values = np.repeat(np.asarray(column_weights, dtype=np.float64), ends - starts)
+        else:
+            values = np.ones(len(rows))
+        positions, inverse = np.unique(rows, return_inverse=True)
+        shared = np.bincount(inverse, weights=values)
+        if metric == "jaccard":
+            return positions, shared / (self.row_sizes[positions] + len(weights) - shared)
+        if metric == "overlap":
+            return positions, shared / np.minimum(self.row_sizes[positions], len(weights))
+        return positions, shared
+
+
+class TagIndex:
+    """
+    Index tag → bitset des verres, et ensemble canonique de tags → bitset.
+
+    Les verres sont des dicts portant au moins ``id`` et ``tags`` (liste) ; ils
+    sont retournés tels quels par les recherches, triés par ``id``.
+
+    Args:
+        verres (Iterable[Dict]): Verres initiaux.
+        version (int, optional): Version (rowversion) la plus récente des verres chargés.
+    """
+
+    def __init__(self, verres: Iterable[Dict[str, Any]] = (), version: Optional[int] = None):
+        self.version = version
+        self._verres: List[Optional[Dict[str, Any]]] = []
+        self._tag_sets: List[Optional[frozenset]] = []
+        self._positions: Dict[Any, int] = {}
+        self._free: List[int] = []
+        self._bits: Dict[str, int] = {}
+        self._by_set: Dict[frozenset, int] = {}
+        self._matrix: Optional[TagMatrix] = None
+        self._lock = threading.RLock()
+        self.upsert(sorted(verres, key=lambda verre: verre["id"]))
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    @property
+    def n_tags(self) -> int:
+        """Nombre de tags distincts."""
+        return len(self._bits)
+
+    def upsert(self, verres: Iterable[Dict[str, Any]]):
+        """Ajoute ou remplace des verres ; un verre sans tags est retiré de l'index."""
+        with self._lock:
+            self._matrix = None
+            for verre in verres:
+                self._discard(verre["id"])
+                tag_set = frozenset(canonical_tags(verre.get("tags") or []))
+                if not tag_set:
+                    continue
+                position = self._free.pop() if self._free else len(self._verres)
+                if position == len(self._verres):
+                    self._verres.append(None)
+                    self._tag_sets.append(None)
+                self._verres[position] = verre
+                self._tag_sets[position] = tag_set
+                self._positions[verre["id"]] = position
+                bit = 1 << position
+                for tag in tag_set:
+                    self._bits[tag] = self._bits.get(tag, 0) | bit
+                self._by_set[tag_set] = self._by_set.get(tag_set, 0) | bit
+
+    def remove(self, ids: Iterable[Any]):
+        """Retire des verres de l'index."""
+        with self._lock:
+            self._matrix = None
+            for verre_id in ids:
+                self._discard(verre_id)
+
+    def tag_matrix(self) -> TagMatrix:
+        """Matrice verres × tags, reconstruite à la première utilisation après une modification."""
+        with self._lock:
+            if self._matrix is None:
+                ids = [verre["id"] if verre is not None else None for verre in self._verres]
+                self._matrix = TagMatrix(self._tag_sets, ids)
+            return self._matrix
+
+    def rank(
+        self,
+        tags: Union[Iterable[str], Dict[str, float]],
+        metric: str = "jaccard",
+        offset: int = 0,
+        limit: int = 20,
+    ) -> Tuple[int, List[Tuple[Dict[str, Any], float]]]:
+        """
+        Verres partageant au moins un tag avec la demande, classés par score décroissant.
+
+        Args:
+            tags (Iterable[str] | Dict[str, float]): Tags demandés, ou tags et poids
+                (par exemple les classes candidates de ``/match`` et leur similarité).
+            metric (str): ``jaccard`` (|A∩Q| / |A∪Q|), ``overlap`` (|A∩Q| / min(|A|, |Q|))
+                ou ``weighted`` (somme des poids des tags communs ; 1 par tag sans poids).
+            offset (int): Nombre de résultats à sauter (pagination).
+            limit (int): Nombre maximal de résultats retournés.
+
+        Returns:
+            Tuple[int, List[Tuple[Dict, float]]]: Nombre total de verres ayant un score non nul,
+            et la page demandée de couples (verre, score), ex aequo départagés par id croissant.
+        """
+        if metric not in RANK_METRICS:
+            raise ValueError(f"Score inconnu : {metric} (attendu : {', '.join(RANK_METRICS)})")
+        weights: Dict[str, float] = {}
+        items = tags.items() if isinstance(tags, dict) else ((tag, 1.0) for tag in tags)
+        for tag, weight in items:
+            tag = normalize_tag(tag)
+            weights[tag] = max(weights.get(tag, weight), weight)
+        if not weights:
+            return 0, []
+
+        with self._lock:
+            matrix = self.tag_matrix()
+            positions, scores = matrix.scores(weights, metric)
+            keep = scores > 0
+            positions, scores = positions[keep], scores[keep]
+            total = len(positions)
+            end = offset + limit
+            if end < total:
+                # Seuls les candidats au moins aussi bons que le end-ième sont triés (ex aequo compris)
+                threshold = np.partition(scores, total - end)[total - end]
+                keep = scores >= threshold
+                positions, scores = positions[keep], scores[keep]
+            order = np.lexsort((matrix.id_rank[positions], -scores))[offset:end]
+            page = [(self._verres[positions[i]], float(scores[i])) for i in order]
+        return total, page
+
+    def search(self, tags: Iterable[str], mode: str = "exact") -> List[Dict[str, Any]]:
+        """
+        Verres correspondant aux tags selon ``mode``.
+
+        Args:
+            tags (Iterable[str]): Tags recherchés.
+            mode (str): ``exact``, ``superset`` ou ``subset``.
+
+        Returns:
+            List[Dict]: Verres trouvés, triés par id.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Mode de recherche inconnu : {mode} (attendu : {', '.join(MODES)})")
+        query = frozenset(canonical_tags(tags))
+        if not query:
+            return []
+        search_bits = {"exact": self._exact_bits, "superset": self._superset_bits, "subset": self._subset_bits}[mode]
+        with self._lock:
+            verres = [self._verres[position] for position in bit_positions(search_bits(query))]
+        return sorted(verres, key=lambda verre: verre["id"])
+
+    def _exact_bits(self, query: frozenset) -> int:
+        """Verres dont l'ensemble de tags est exactement ``query``."""
+        return self._by_set.get(query, 0)
+
+    def _superset_bits(self, query: frozenset) -> int:
+        """Verres portant tous les tags de ``query``."""
+        bits = -1
+        for tag in query:
+            bits &= self._bits.get(tag, 0)
+        return bits
+
+    def _subset_bits(self, query: frozenset) -> int:
+        """Verres dont tous les tags sont dans ``query``."""
+        bits = 0
+        if len(query) <= SUBSET_ENUMERATION_MAX_TAGS:
+            # Quelques dizaines de lectures dans la table des ensembles canoniques
+            for size in range(1, len(query) + 1):
+                for tag_set in combinations(query, size):
+                    bits |= self._by_set.get(frozenset(tag_set), 0)
+            return bits
+        for tag in query:
+            bits |= self._bits.get(tag, 0)
+        for tag, tag_bits in self._bits.items():
+            if bits and tag not in query:
+                bits &= ~tag_bits
+        return bits
+
+    def _discard(self, verre_id: Any):
+        position = self._positions.pop(verre_id, None)
+        if position is None:
+            return
+        mask = ~(1 << position)
+        tag_set = self._tag_sets[position]
+        for tag in tag_set:
+            self._bits[tag] &= mask
+            if not self._bits[tag]:
+                del self._bits[tag]
+        self._by_set[tag_set] &= mask
+        if not self._by_set[tag_set]:
+            del self._by_set[tag_set]
+        self._verres[position] = None
+        self._tag_sets[position] = None
+        self._free.append(position)
+
+
+class TagIndexRefresher:
+    """
+    Construit puis rafraîchit périodiquement un ``TagIndex``.
+
+    Args:
+        load_all (Callable[[], Tuple[List[Dict], Optional[int]]]): Tous les verres tagués et leur version maximale.
+        load_changes (Callable[[int], Tuple[List[Dict], Optional[int]]]): Verres modifiés depuis une version
+            (y compris ceux dont les tags ont été vidés) et la nouvelle version maximale.
+        count (Callable[[], int]): Nombre de verres tagués en base.
+        interval (float): Délai entre deux rafraîchissements, en secondes.
+        clock (Callable[[], float]): Horloge monotone, en secondes.
+        on_refresh (Callable[[float, bool], None], optional): Appelé après chaque rafraîchissement
+            avec sa durée et ``True`` s'il s'agissait d'une reconstruction complète.
+    """
+
+    def __init__(
+        self,
+        load_all: Callable[[], Tuple[List[Dict[str, Any]], Optional[int]]],
+        load_changes: Callable[[int], Tuple[List[Dict[str, Any]], Optional[int]]],
+        count: Callable[[], int],
+        interval: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        on_refresh: Optional[Callable[[float, bool], None]] = None,
+    ):
+        self.load_all = load_all
+        self.load_changes = load_changes
+        self.count = count
+        self.interval = interval
+        self.clock = clock
+        self.on_refresh = on_refresh
+        self.index: Optional[TagIndex] = None
+        # Verres tagués en base mais absents de l'index, lors de la dernière reconstruction
+        self.rejected = 0
+        self.last_refresh: Optional[float] = None
+        self._refresh_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def age(self) -> float:
+        """Secondes écoulées depuis le dernier rafraîchissement réussi (0 si jamais)."""
+        return self.clock() - self.last_refresh if self.last_refresh is not None else 0.0
+
+    def refresh(self):
+        """Applique les modifications depuis la dernière version, ou reconstruit l'index (bloquant)."""
+        with self._refresh_lock:
+            start = self.clock()
+            index = self.index
+            full = index is None or index.version is None
+            if not full:
+                changes, version = self.load_changes(index.version)
+                index.upsert(changes)
+                index.version = version if version is not None else index.version
+                # Les suppressions n'apparaissent pas dans les modifications
+                full = self.count() != len(index) + self.rejected
+            if full:
+                verres, version = self.load_all()
+                index = TagIndex(verres, version)
+                self.rejected = len(verres) - len(index)
+                if self.rejected:
+                    logger.warning(f"{self.rejected} verre(s) tagué(s) ignoré(s) par l'index (tags illisibles)")
+            # Matrice des recherches classées préparée ici plutôt qu'à la première requête
+            index.tag_matrix()
+            self.index = index
+            self.last_refresh = self.clock()
+            if self.on_refresh:
+                self.on_refresh(self.last_refresh - start, full)
+
+    async def start(self):
+        """Construit l'index en tâche de fond puis le rafraîchit toutes les ``interval`` secondes."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Arrête le rafraîchissement périodique."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.refresh)
+            except Exception as e:
+                logger.error(f"Rafraîchissement de l'index des tags impossible : {e}")
+            await asyncio.sleep(self.interval)
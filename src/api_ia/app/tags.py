@@ -0,0 +1,44 @@
+"""
+Forme canonique des ensembles de tags des verres.
+
+Deux ensembles de tags sont égaux pour ``/search_tags`` s'ils contiennent les
+mêmes tags à la casse et aux espaces de bord près, quel que soit l'ordre.
+``tags_signature`` condense cette forme canonique en une empreinte de taille
+fixe, stockée dans la colonne indexée ``verres.tags_signature`` : la recherche
+d'un ensemble exact devient une seule requête sur index au lieu d'un parcours
+de la table.
+
+La colonne est maintenue par ``scripts/insert_tags.py`` ; toute autre écriture
+de ``verres.tags`` doit aussi mettre à jour ``tags_signature``.
+"""
+
+import hashlib
+import json
+from typing import Iterable, List
+
+# Longueur de l'empreinte (SHA-256 en hexadécimal) : colonne CHAR(64)
+SIGNATURE_LENGTH = 64
+
+
+def normalize_tag(tag: str) -> str:
+    """Tag sans espaces de bord, en minuscules."""
+    return tag.strip().lower()
+
+
+def canonical_tags(tags: Iterable[str]) -> List[str]:
+    """Tags normalisés, dédoublonnés et triés."""
+    return sorted({normalize_tag(tag) for tag in tags})
+
+
+def tags_signature(tags: Iterable[str]) -> str:
+    """
+    Empreinte de l'ensemble de tags, indépendante de l'ordre, de la casse et des doublons.
+
+    Args:
+        tags (Iterable[str]): Tags d'un verre ou d'une recherche.
+
+    Returns:
+        str: SHA-256 hexadécimal de la forme canonique.
+    """
+    canonical = json.dumps(canonical_tags(tags), ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
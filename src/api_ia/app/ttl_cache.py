@@ -0,0 +1,147 @@
+"""
+Cache mémoire à durée de vie limitée (TTL), borné en nombre d'entrées.
+
+Destiné aux lectures en base répétées à chaque requête (utilisateur courant,
+détails...) : une entrée est servie pendant ``ttl_seconds`` au plus, puis
+relue ; ``invalidate`` permet de forcer la relecture plus tôt (changement
+connu de la donnée). Au-delà de ``max_entries``, l'entrée la moins récemment
+utilisée est évincée.
+
+``get_or_load`` chronomètre le chargement lors d'un échec et en garde une
+moyenne glissante : chaque succès rapporte ainsi une estimation du temps de
+lecture évité.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional, Tuple
+
+# Poids de la dernière mesure dans la moyenne glissante des temps de chargement
+LOAD_TIME_SMOOTHING = 0.2
+
+
+class TTLCache:
+    """
+    Cache LRU dont les entrées expirent après ``ttl_seconds``.
+
+    Les valeurs ``None`` ne sont pas mises en cache (absence ou erreur de lecture :
+    la requête suivante relit la source).
+
+    Args:
+        max_entries (int): Nombre maximal d'entrées.
+        ttl_seconds (float): Durée de vie d'une entrée (0 = cache désactivé).
+        clock (Callable[[], float]): Horloge monotone, en secondes.
+        on_hit (Callable[[float], None], optional): Appelé à chaque succès avec le temps de chargement évité estimé.
+        on_miss (Callable[[float], None], optional): Appelé après chaque chargement avec sa durée.
+        on_evict (Callable[[], None], optional): Appelé à chaque éviction pour dépassement de taille.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        on_hit: Optional[Callable[[float], None]] = None,
+        on_miss: Optional[Callable[[float], None]] = None,
+        on_evict: Optional[Callable[[], None]] = None,
+    ):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.on_hit = on_hit
+        self.on_miss = on_miss
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.mean_load_seconds = 0.0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self) -> float:
+        """Part des lectures servies par le cache depuis le démarrage."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retourne la valeur si elle est présente et non expirée, None sinon."""
+        now = self.clock()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if now >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """Enregistre ``value`` pour ``ttl_seconds`` (ignoré si ``value`` est None ou le TTL nul)."""
+        if value is None or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                if self.on_evict:
+                    self.on_evict()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Optional[Any]]) -> Optional[Any]:
+        """
+        Retourne la valeur en cache ou l'obtient via ``loader()`` (puis la met en cache).
+
+        Le chargement se fait hors verrou : deux requêtes simultanées sur une même
+        clé absente peuvent toutes deux appeler ``loader``.
+        """
+        value = self._lookup(key)
+        if value is not None:
+            return value
+        start = self.clock()
+        value = loader()
+        self._loaded(key, value, self.clock() - start)
+        return value
+
+    async def get_or_load_async(self, key: Hashable, loader: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        """Comme ``get_or_load``, avec un chargement asynchrone (``await loader()``) ; un succès n'attend rien."""
+        value = self._lookup(key)
+        if value is not None:
+            return value
+        start = self.clock()
+        value = await loader()
+        self._loaded(key, value, self.clock() - start)
+        return value
+
+    def _lookup(self, key: Hashable) -> Optional[Any]:
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            if self.on_hit:
+                self.on_hit(self.mean_load_seconds)
+        return value
+
+    def _loaded(self, key: Hashable, value: Optional[Any], elapsed: float):
+        self.misses += 1
+        if self.misses == 1:
+            self.mean_load_seconds = elapsed
+        else:
+            self.mean_load_seconds += LOAD_TIME_SMOOTHING * (elapsed - self.mean_load_seconds)
+        if self.on_miss:
+            self.on_miss(elapsed)
+        self.put(key, value)
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Retire une entrée ; retourne True si elle était présente."""
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        """Vide le cache."""
+        with self._lock:
+            self._entries.clear()
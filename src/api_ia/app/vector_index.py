@@ -0,0 +1,220 @@
+"""
+Backends de recherche des plus proches voisins pour les embeddings de référence.
+
+Tous les backends partagent la même interface (``build`` puis ``search``) et
+travaillent sur des vecteurs normalisés L2 : le score retourné est la
+similarité cosinus (produit scalaire).
+
+- ``exact`` : recherche exhaustive NumPy (produit matriciel + ``argpartition``) ;
+- ``ivf`` : index à listes inversées en NumPy pur (k-means sphérique, seules
+  les ``n_probe`` listes les plus proches sont parcourues) ;
+- ``hnsw`` : graphe HNSW via la bibliothèque optionnelle ``hnswlib``.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Retourne les indices des k meilleurs scores, triés par score décroissant.
+
+    Utilise ``argpartition`` (O(N)) puis ne trie que les k candidats retenus.
+    Accepte un vecteur (N,) ou une matrice (B, N) traitée ligne par ligne.
+
+    Args:
+        scores (np.ndarray): Scores de forme (N,) ou (B, N).
+        k (int): Nombre d'indices à retourner.
+
+    Returns:
+        np.ndarray: Indices des k meilleurs scores, de forme (k,) ou (B, k).
+    """
+    n = scores.shape[-1]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        candidates = np.broadcast_to(np.arange(n), scores.shape).copy()
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=-1)
+
+
+class VectorIndex:
+    """
+    Interface commune des backends de recherche.
+
+    Attributes:
+        name (str): Nom du backend (valeur de ``INDEX_BACKEND``).
+        exhaustive (bool): True si le backend peut fournir tous les scores (recherche exacte).
+    """
+
+    name = "base"
+    exhaustive = False
+
+    def build(self, embeddings: np.ndarray) -> "VectorIndex":
+        """
+        Indexe une matrice (N, D) d'embeddings normalisés.
+
+        Returns:
+            VectorIndex: Le backend lui-même, pour chaîner les appels.
+        """
+        raise NotImplementedError
+
+    def search(self, queries: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Recherche les n plus proches voisins de chaque requête.
+
+        Args:
+            queries (np.ndarray): Requêtes normalisées (B, D).
+            n (int): Nombre de voisins par requête.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Scores (B, n) triés par ordre décroissant et
+            indices (B, n) des voisins. Les places non trouvées valent ``-inf`` / ``-1``.
+        """
+        raise NotImplementedError
+
+
+class ExactIndex(VectorIndex):
+    """Recherche exhaustive : un produit matriciel sur toute la base."""
+
+    name = "exact"
+    exhaustive = True
+
+    def build(self, embeddings: np.ndarray) -> "ExactIndex":
+        self.embeddings = embeddings
+        return self
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """Similarités (B, N) de chaque requête avec toute la base."""
+        return queries @ self.embeddings.T
+
+    def search(self, queries: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores = self.scores(queries)
+        ids = top_k_indices(scores, n)
+        return np.take_along_axis(scores, ids, axis=1), ids
+
+
+class IVFIndex(VectorIndex):
+    """
+    Index à listes inversées (IVF) en NumPy pur.
+
+    Les embeddings sont répartis en ``n_lists`` listes par k-means sphérique ;
+    une requête n'est comparée qu'aux vecteurs des ``n_probe`` listes dont le
+    centroïde est le plus proche.
+    """
+
+    name = "ivf"
+
+    def __init__(self, n_lists: int = 64, n_probe: int = 8, n_iter: int = 20, seed: int = 0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.seed = seed
+
+    def _kmeans(self, embeddings: np.ndarray, n_lists: int) -> np.ndarray:
+        """K-means sphérique (similarité cosinus) ; retourne les centroïdes normalisés."""
+        rng = np.random.default_rng(self.seed)
+        centroids = embeddings[rng.choice(len(embeddings), n_lists, replace=False)].copy()
+        for _ in range(self.n_iter):
+            assignment = np.argmax(embeddings @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, embeddings)
+            # Une liste vide garde son centroïde précédent
+            empty = ~np.any(sums, axis=1)
+            sums[empty] = centroids[empty]
+            centroids = sums / np.linalg.norm(sums, axis=1, keepdims=True)
+        return centroids.astype(np.float32)
+
+    def build(self, embeddings: np.ndarray) -> "IVFIndex":
+        self.embeddings = embeddings
+        n_lists = max(1, min(self.n_lists, len(embeddings)))
+        self.centroids = self._kmeans(np.asarray(embeddings, dtype=np.float32), n_lists)
+
+        # Listes inversées au format CSR : ids triés par liste + décalages
+        assignment = np.argmax(embeddings @ self.centroids.T, axis=1)
+        self.list_ids = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=n_lists)
+        self.list_offsets = np.concatenate(([0], np.cumsum(counts)))
+        # Copie contiguë des vecteurs dans l'ordre des listes : lecture séquentielle par liste
+        self.list_vectors = np.ascontiguousarray(embeddings[self.list_ids])
+        return self
+
+    def search(self, queries: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        n_probe = min(self.n_probe, len(self.centroids))
+        probes = top_k_indices(queries @ self.centroids.T, n_probe)
+
+        out_scores = np.full((len(queries), n), -np.inf, dtype=np.float32)
+        out_ids = np.full((len(queries), n), -1, dtype=np.int64)
+        for row, (query, lists) in enumerate(zip(queries, probes)):
+            positions = np.concatenate([np.arange(self.list_offsets[i], self.list_offsets[i + 1]) for i in lists])
+            scores = self.list_vectors[positions] @ query
+            best = top_k_indices(scores, n)
+            out_scores[row, : len(best)] = scores[best]
+            out_ids[row, : len(best)] = self.list_ids[positions[best]]
+        return out_scores, out_ids
+
+
+class HNSWIndex(VectorIndex):
+    """Graphe HNSW via ``hnswlib`` (dépendance optionnelle : ``pip install hnswlib``)."""
+
+    name = "hnsw"
+
+    def __init__(self, m: int = 16, ef_construction: int = 200, ef_search: int = 64, seed: int = 0):
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.seed = seed
+
+    def build(self, embeddings: np.ndarray) -> "HNSWIndex":
+        try:
+            import hnswlib
+        except ImportError as e:
+            raise ImportError("Le backend 'hnsw' nécessite la bibliothèque hnswlib (pip install hnswlib)") from e
+
+        self.size = len(embeddings)
+        self.graph = hnswlib.Index(space="ip", dim=embeddings.shape[1])
+        self.graph.init_index(
+            max_elements=max(1, self.size), ef_construction=self.ef_construction, M=self.m, random_seed=self.seed
+        )
+        if self.size:
+            self.graph.add_items(np.asarray(embeddings, dtype=np.float32), np.arange(self.size))
+        self.graph.set_ef(self.ef_search)
+        return self
+
+    def search(self, queries: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(n, self.size)
+        out_scores = np.full((len(queries), n), -np.inf, dtype=np.float32)
+        out_ids = np.full((len(queries), n), -1, dtype=np.int64)
+        if k:
+            self.graph.set_ef(max(self.ef_search, k))
+            ids, distances = self.graph.knn_query(np.asarray(queries, dtype=np.float32), k=k)
+            # hnswlib retourne la distance "ip" = 1 - produit scalaire
+            out_scores[:, :k] = 1.0 - distances
+            out_ids[:, :k] = ids
+        return out_scores, out_ids
+
+
+BACKENDS = {"exact": ExactIndex, "ivf": IVFIndex, "hnsw": HNSWIndex}
+
+
+def create_vector_index(backend: str = "exact", **params) -> VectorIndex:
+    """
+    Instancie un backend de recherche par son nom.
+
+    Args:
+        backend (str): ``exact``, ``ivf`` ou ``hnsw``.
+        **params: Paramètres propres au backend (ex. ``n_lists``, ``n_probe``, ``ef_search``).
+
+    Returns:
+        VectorIndex: Backend non encore construit.
+
+    Raises:
+        ValueError: Si le backend est inconnu.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend d'index inconnu : {backend} (attendu : {', '.join(BACKENDS)})")
+    return BACKENDS[backend](**params)
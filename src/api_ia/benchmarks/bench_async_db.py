@@ -0,0 +1,93 @@
+"""
+Test de charge : lecture en base bloquante dans un handler ``async`` contre ``await`` sur un pool de threads dédié.
+
+Chaque requête simulée est une coroutine qui lit un utilisateur (comme
+``get_current_user``) via le ``ConnectionPool``, soit directement — comme
+pyodbc appelé depuis un ``async def`` : la boucle d'événements est bloquée
+pendant l'aller-retour — soit via ``BoundedExecutor.run`` comme
+``api_ia.app.async_database``. Le débit est mesuré pour plusieurs nombres de
+requêtes simultanées (``--in-flight``) : en bloquant, il reste celui d'une seule
+requête ; avec le pool de threads, il croît jusqu'à ``--workers``.
+
+La base est la même que pour ``bench_db_pool`` (SQLite temporaire avec latence
+réseau simulée, ou ``--odbc``).
+
+Usage :
+    python -m api_ia.benchmarks.bench_async_db [--in-flight 1 4 16 32] [--requests 400] [--workers 16]
+    python -m api_ia.benchmarks.bench_async_db --odbc "DRIVER={ODBC Driver 18 for SQL Server};SERVER=localhost;..."
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from api_ia.app.db_pool import ConnectionPool
+from api_ia.app.executor import BoundedExecutor
+from api_ia.benchmarks.bench_db_pool import lookup, odbc_factory, sqlite_factory
+
+
+async def run_load(request, in_flight, n_requests):
+    """Latences (ms) de ``n_requests`` appels à ``await request(i)``, ``in_flight`` à la fois, et durée totale (s)."""
+    latencies = []
+    counter = iter(range(n_requests))
+
+    async def client():
+        for i in counter:
+            start = time.perf_counter()
+            await request(i)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(in_flight)))
+    return np.array(latencies), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--requests", type=int, default=400, help="Requêtes par mesure")
+    parser.add_argument("--workers", type=int, default=16, help="Threads du pool (= taille du pool de connexions)")
+    parser.add_argument("--query-latency-ms", type=float, default=5.0)
+    parser.add_argument("--odbc", help="Chaîne de connexion pyodbc (remplace la base SQLite)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.odbc:
+            connect = odbc_factory(args.odbc)
+            source = "ODBC"
+        else:
+            connect = sqlite_factory(os.path.join(tmp, "bench.db"), 0.0, args.query_latency_ms / 1000)
+            source = f"SQLite, requête {args.query_latency_ms:.0f} ms"
+
+        pool = ConnectionPool(connect, min_size=args.workers, max_size=args.workers, timeout=30)
+        pool.warm()
+        executor = BoundedExecutor(max_workers=args.workers, max_pending=max(args.in_flight), thread_name_prefix="db")
+
+        def read(i):
+            with pool.connection() as conn:
+                return lookup(conn, i)
+
+        async def blocking(i):
+            return read(i)
+
+        async def threaded(i):
+            return await executor.run(read, i)
+
+        print(f"{args.requests} requêtes ({source}), {args.workers} threads / connexions")
+        print(f"{'mode':>10} | {'en vol':>6} | {'p50 ms':>7} | {'p99 ms':>7} | {'req/s':>7}")
+        print("-" * 50)
+        for name, request in (("bloquant", blocking), ("await", threaded)):
+            for in_flight in args.in_flight:
+                latencies, elapsed = asyncio.run(run_load(request, in_flight, args.requests))
+                p50, p99 = np.percentile(latencies, [50, 99])
+                print(f"{name:>10} | {in_flight:>6} | {p50:>7.1f} | {p99:>7.1f} | {len(latencies) / elapsed:>7.0f}")
+        executor.shutdown()
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Test de charge : une connexion par requête (ancien ``get_db_connection``) contre ``ConnectionPool``.
+
+Chaque requête simulée est la lecture de ``get_user`` (``SELECT ... FROM users
+WHERE username = ?``), exécutée par ``--threads`` threads concurrents. Par
+défaut la base est un fichier SQLite temporaire ; l'ouverture d'une connexion
+y est quasi gratuite, aussi ``--connect-latency-ms`` ajoute le coût de la
+poignée de main TLS + authentification d'Azure SQL, et ``--query-latency-ms``
+l'aller-retour réseau de chaque requête. Avec ``--odbc`` (chaîne de connexion
+pyodbc, par exemple vers un conteneur MSSQL), les latences sont réelles et ces
+options ignorées ; la table ``users`` doit alors exister.
+
+Usage :
+    python -m api_ia.benchmarks.bench_db_pool [--threads 16] [--requests 50] [--pool-size 8]
+    python -m api_ia.benchmarks.bench_db_pool --odbc "DRIVER={ODBC Driver 18 for SQL Server};SERVER=localhost;..."
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from api_ia.app.db_pool import ConnectionPool
+
+QUERY = "SELECT id, username, email, hashed_password, is_active FROM users WHERE username = ?"
+N_USERS = 100
+
+
+class LatentConnection:
+    """Connexion SQLite dont chaque requête coûte en plus ``query_latency`` secondes (aller-retour réseau)."""
+
+    def __init__(self, conn, query_latency):
+        self._conn = conn
+        self._query_latency = query_latency
+
+    def cursor(self):
+        time.sleep(self._query_latency)
+        return self._conn.cursor()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+def sqlite_factory(path, connect_latency, query_latency):
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT UNIQUE, email TEXT, hashed_password TEXT, is_active INT)"
+        )
+        conn.executemany(
+            "INSERT INTO users VALUES (?, ?, ?, ?, 1)",
+            [(i, f"user{i}", f"user{i}@example.com", "x" * 60) for i in range(N_USERS)],
+        )
+
+    def connect():
+        time.sleep(connect_latency)
+        return LatentConnection(sqlite3.connect(path, check_same_thread=False), query_latency)
+
+    return connect
+
+
+def odbc_factory(conn_str):
+    import pyodbc
+
+    return lambda: pyodbc.connect(conn_str)
+
+
+def lookup(conn, i):
+    cursor = conn.cursor()
+    cursor.execute(QUERY, (f"user{i % N_USERS}",))
+    return cursor.fetchone()
+
+
+def run_load(request, threads, requests_per_thread):
+    """Latences (ms) de ``threads * requests_per_thread`` appels à ``request(i)`` et durée totale (s)."""
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(offset):
+        local = []
+        for i in range(requests_per_thread):
+            start = time.perf_counter()
+            request(offset + i)
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(t * requests_per_thread,)) for t in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return np.array(latencies), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=50, help="Requêtes par thread")
+    parser.add_argument("--pool-size", type=int, default=8, help="Taille maximale du pool")
+    parser.add_argument("--connect-latency-ms", type=float, default=40.0)
+    parser.add_argument("--query-latency-ms", type=float, default=2.0)
+    parser.add_argument("--odbc", help="Chaîne de connexion pyodbc (remplace la base SQLite)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.odbc:
+            connect = odbc_factory(args.odbc)
+            source = "ODBC"
+        else:
+            connect = sqlite_factory(
+                os.path.join(tmp, "bench.db"), args.connect_latency_ms / 1000, args.query_latency_ms / 1000
+            )
+            source = f"SQLite, connexion {args.connect_latency_ms:.0f} ms, requête {args.query_latency_ms:.0f} ms"
+
+        def per_request(i):
+            conn = connect()
+            try:
+                return lookup(conn, i)
+            finally:
+                conn.close()
+
+        pool = ConnectionPool(connect, min_size=args.pool_size, max_size=args.pool_size, timeout=30)
+        pool.warm()
+
+        def pooled(i):
+            with pool.connection() as conn:
+                return lookup(conn, i)
+
+        print(f"{args.threads} threads x {args.requests} requêtes ({source}), pool de {args.pool_size} connexions")
+        print(f"{'mode':>22} | {'p50 ms':>7} | {'p99 ms':>7} | {'req/s':>7}")
+        print("-" * 52)
+        for name, request in (("connexion par requête", per_request), ("ConnectionPool", pooled)):
+            latencies, elapsed = run_load(request, args.threads, args.requests)
+            p50, p99 = np.percentile(latencies, [50, 99])
+            print(f"{name:>22} | {p50:>7.1f} | {p99:>7.1f} | {len(latencies) / elapsed:>7.0f}")
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Micro-benchmark de la validation des images : libmagic contre lecture de l'en-tête.
+
+``libmagic`` reproduit l'ancien ``security.validate_image_file`` : un
+``magic.Magic(mime=True)`` créé à chaque appel, puis la vérification des
+signatures JPEG / PNG. ``en-tête`` est ``image_header.read_image_header`` suivi
+du contrôle des dimensions, comme aujourd'hui. Le corpus contient les cinq
+formats acceptés, générés à la taille ``--size`` ; la colonne « accepté » montre
+que l'ancien contrôle refusait GIF, BMP et WEBP malgré la liste MIME.
+
+Dernières lignes : bombe de décompression (PNG de ``--bomb-side`` pixels de
+côté, quelques dizaines de Ko), lecture de l'en-tête contre ``Image.open`` +
+``load`` de PIL. PIL ne lève ``DecompressionBombError`` qu'au-delà de deux fois
+``Image.MAX_IMAGE_PIXELS`` (~179 Mpx) : en dessous, l'image (81 Mpx par défaut)
+est décodée en entier.
+
+``python-magic`` et libmagic ne sont plus des dépendances de l'API : les
+installer pour ce benchmark.
+
+Usage :
+    python -m api_ia.benchmarks.bench_image_validation [--size 1024] [--repeats 2000]
+"""
+
+import argparse
+import io
+import time
+import zlib
+
+import numpy as np
+from PIL import Image
+
+from api_ia.app.image_header import ImageHeaderError, read_image_header
+
+MAX_SIDE, MAX_PIXELS = 12000, 50_000_000
+FORMATS = {"JPEG": {}, "PNG": {}, "GIF": {}, "BMP": {}, "WEBP": {"lossless": False}}
+
+
+def validate_libmagic(data):
+    """Ancien contrôle (sans la taille du fichier, identique pour les deux variantes)."""
+    import magic
+
+    mime_type = magic.Magic(mime=True).from_buffer(data)
+    if mime_type not in {"image/jpeg", "image/png", "image/gif", "image/bmp", "image/webp"}:
+        return False
+    return any(data.startswith(sig) for sig in (b"\xff\xd8\xff", b"\x89\x50\x4e\x47"))
+
+
+def validate_header(data):
+    try:
+        info = read_image_header(data)
+    except ImageHeaderError:
+        return False
+    return info.width <= MAX_SIDE and info.height <= MAX_SIDE and info.pixels <= MAX_PIXELS
+
+
+def reject_with_pil(data):
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+    except (Image.DecompressionBombError, OSError, ValueError):
+        return False
+    return True
+
+
+def encode(fmt, size, **params):
+    x, y = np.meshgrid(np.linspace(0, 255, size), np.linspace(0, 255, size * 3 // 4))
+    img = Image.fromarray(np.stack([x, y, (x + y) / 2], axis=-1).astype(np.uint8), "RGB")
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt, **params)
+    return buffer.getvalue()
+
+
+def png_bomb(side):
+    """PNG en niveaux de gris de ``side`` x ``side`` pixels nuls : quelques dizaines de Ko une fois compressé."""
+
+    def chunk(name, payload):
+        return len(payload).to_bytes(4, "big") + name + payload + zlib.crc32(name + payload).to_bytes(4, "big")
+
+    ihdr = side.to_bytes(4, "big") * 2 + bytes([8, 0, 0, 0, 0])
+    compressor = zlib.compressobj(9)
+    row = bytes(side + 1)  # octet de filtre + pixels
+    idat = b"".join(compressor.compress(row) for _ in range(side)) + compressor.flush()
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IDAT", idat) + chunk(b"IEND", b"")
+
+
+def measure(fn, data, repeats):
+    """Temps moyen par appel (µs) et résultat."""
+    result = fn(data)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(data)
+    return (time.perf_counter() - start) * 1e6 / repeats, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1024, help="Largeur des images générées")
+    parser.add_argument("--repeats", type=int, default=2000)
+    parser.add_argument("--bomb-side", type=int, default=9000)
+    args = parser.parse_args()
+
+    print(
+        f"{'format':>6} | {'Kio':>6} | {'libmagic µs':>11} | {'accepté':>7} | {'en-tête µs':>10} | {'accepté':>7} | {'gain':>6}"
+    )
+    print("-" * 72)
+    for fmt, params in FORMATS.items():
+        data = encode(fmt, args.size, **params)
+        magic_us, magic_ok = measure(validate_libmagic, data, args.repeats)
+        header_us, header_ok = measure(validate_header, data, args.repeats)
+        print(
+            f"{fmt:>6} | {len(data) / 1024:>6.0f} | {magic_us:>11.1f} | {str(magic_ok):>7} | "
+            f"{header_us:>10.2f} | {str(header_ok):>7} | {magic_us / header_us:>5.0f}x"
+        )
+
+    bomb = png_bomb(args.bomb_side)
+    pil_us, pil_ok = measure(reject_with_pil, bomb, 3)
+    header_us, header_ok = measure(validate_header, bomb, args.repeats)
+    print(f"\nBombe PNG {args.bomb_side}x{args.bomb_side} ({len(bomb) / 1024:.0f} Kio)")
+    print(f"  PIL open + load : {pil_us / 1000:>9.2f} ms (acceptée : {pil_ok})")
+    print(f"  en-tête         : {header_us / 1000:>9.4f} ms (acceptée : {header_ok})")
+
+
+if __name__ == "__main__":
+    main()
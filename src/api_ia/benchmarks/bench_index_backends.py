@@ -0,0 +1,118 @@
+"""
+Benchmark rappel@k / latence des backends de recherche approximative.
+
+Compare les backends ``ivf`` (NumPy pur) et ``hnsw`` (hnswlib, si installé) au
+backend ``exact`` : rappel@k sur les exemplaires voisins, accord de la classe
+top-1 après agrégation, latence par requête et temps de construction.
+
+Par défaut, la base est constituée des images de référence et les requêtes
+des images de ``data/split/test``, encodées avec le modèle. L'option
+``--synthetic N`` remplace ces données par N embeddings aléatoires en amas,
+pour mesurer le passage à l'échelle sans modèle.
+
+Usage :
+    python -m api_ia.benchmarks.bench_index_backends --test-dir data/split/test
+    python -m api_ia.benchmarks.bench_index_backends --synthetic 100000
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from api_ia.app.reference_index import ReferenceIndex, l2_normalize
+from api_ia.app.vector_index import ExactIndex, create_vector_index
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+DEFAULT_TEST_DIR = os.path.join(REPO_DIR, "data", "split", "test")
+
+
+def synthetic_data(size, n_queries, dim=256, n_classes=67, seed=0):
+    """Embeddings en amas (un amas par classe) et requêtes bruitées autour des amas."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_classes, dim)).astype(np.float32)
+    class_ids = rng.integers(0, n_classes, size)
+    embeddings = l2_normalize(centers[class_ids] + 0.6 * rng.standard_normal((size, dim), dtype=np.float32))
+    query_ids = rng.integers(0, n_classes, n_queries)
+    queries = l2_normalize(centers[query_ids] + 0.6 * rng.standard_normal((n_queries, dim), dtype=np.float32))
+    return embeddings, [f"classe_{c}" for c in class_ids], queries
+
+
+def model_data(test_dir, batch_size):
+    """Embeddings des images de référence (base) et de ``test_dir`` (requêtes)."""
+    from api_ia.app.model_loader import load_model
+    from api_ia.app.similarity_search import list_reference_images, encode_references
+    from api_ia.benchmarks.bench_reference_aggregation import embed_paths
+
+    model = load_model()
+    index = encode_references(model, list_reference_images())
+    queries, _ = embed_paths(model, list_reference_images(test_dir), batch_size)
+    return np.asarray(index.embeddings), list(index.labels), l2_normalize(queries)
+
+
+def measure(backend, embeddings, labels, queries, k, exact_ids, exact_top1):
+    """Construit le backend puis mesure rappel@k, accord top-1 et latence."""
+    start = time.perf_counter()
+    backend.build(embeddings)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for query in queries:
+        backend.search(query[None, :], k)
+    latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    _, ids = backend.search(queries, k)
+    recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(ids, exact_ids)])
+
+    index = ReferenceIndex.from_normalized(embeddings, labels, backend=backend)
+    top1 = [matches[0]["class"] if matches else None for matches in index.search_batch(queries, 1)]
+    agreement = np.mean([a == b for a, b in zip(top1, exact_top1)])
+    return build_s, latency_ms, recall, agreement
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--test-dir", default=DEFAULT_TEST_DIR)
+    parser.add_argument("--synthetic", type=int, default=0, help="Taille d'une base synthétique (0 = modèle + images)")
+    parser.add_argument("--queries", type=int, default=500, help="Nombre de requêtes synthétiques")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        embeddings, labels, queries = synthetic_data(args.synthetic, args.queries)
+    else:
+        embeddings, labels, queries = model_data(args.test_dir, args.batch_size)
+
+    # Regroupe la base par classe, comme le fait ReferenceIndex
+    order = np.argsort(np.asarray(labels, dtype=object), kind="stable")
+    embeddings, labels = np.ascontiguousarray(embeddings[order]), [labels[i] for i in order]
+
+    exact = ExactIndex().build(embeddings)
+    _, exact_ids = exact.search(queries, args.k)
+    exact_top1 = [m[0]["class"] for m in ReferenceIndex.from_normalized(embeddings, labels).search_batch(queries, 1)]
+
+    configs = [("exact", {})]
+    n_lists = max(1, int(np.sqrt(len(embeddings))))
+    configs += [("ivf", {"n_lists": n_lists, "n_probe": p}) for p in (1, 2, 4, 8, 16) if p <= n_lists]
+    try:
+        import hnswlib  # noqa: F401
+
+        configs += [("hnsw", {"ef_search": ef}) for ef in (16, 32, 64, 128)]
+    except ImportError:
+        print("hnswlib non installé : backend hnsw ignoré")
+
+    print(f"{len(embeddings)} références, {len(queries)} requêtes, k={args.k}")
+    print(f"{'backend':>28} | {'build (s)':>9} | {'ms/requête':>10} | {f'rappel@{args.k}':>9} | {'top-1 =':>7}")
+    print("-" * 78)
+    for name, params in configs:
+        build_s, latency_ms, recall, agreement = measure(
+            create_vector_index(name, **params), embeddings, labels, queries, args.k, exact_ids, exact_top1
+        )
+        label = name + "".join(f" {k}={v}" for k, v in params.items())
+        print(f"{label:>28} | {build_s:>9.2f} | {latency_ms:>10.3f} | {recall:>9.3f} | {agreement:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
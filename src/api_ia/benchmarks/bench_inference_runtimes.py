@@ -0,0 +1,88 @@
+"""
+Benchmark latence / débit des moteurs d'inférence : eager, fused, TorchScript, ONNX Runtime.
+
+Le modèle eager est exporté dans un dossier temporaire puis chaque moteur est
+mesuré sur des lots aléatoires : latence médiane par lot et par image, débit en
+images/s et écart maximal des embeddings par rapport au mode eager. ``fused``
+est le modèle eager avec ``grayscale_conv`` et les BatchNorm repliés.
+
+Usage :
+    python -m api_ia.benchmarks.bench_inference_runtimes [--batch-sizes 1 8 32] [--random-weights]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import torch
+
+from api_ia.app.inference_runtime import OnnxRuntimeModel, TorchScriptModel, export_onnx, export_torchscript
+from api_ia.app.model_fusion import FusedEmbeddingModel
+
+
+def load_eager(random_weights):
+    """Modèle eager avec les poids de production, ou aléatoires (mesure de vitesse seule)."""
+    if random_weights:
+        from models.efficientnet_triplet import EfficientNetEmbedding
+
+        return EfficientNetEmbedding(embedding_dim=256, pretrained=False).eval()
+    from api_ia.app.model_loader import load_eager_model
+
+    return load_eager_model().cpu()
+
+
+def time_batches(model, batch, repeats, warmup=2):
+    """Latences (secondes) de ``repeats`` passes forward sur ``batch``."""
+    timings = []
+    with torch.no_grad():
+        for i in range(warmup + repeats):
+            start = time.perf_counter()
+            model.forward_one(batch)
+            if i >= warmup:
+                timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--image-size", type=int, default=224)
+    parser.add_argument("--threads", type=int, default=0, help="Threads torch / ONNX Runtime (0 = défaut)")
+    parser.add_argument("--random-weights", action="store_true", help="Ne charge pas les poids de production")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    eager = load_eager(args.random_weights)
+    tmp_dir = tempfile.mkdtemp(prefix="runtimes_")
+    runtimes = {"eager": eager, "fused": FusedEmbeddingModel(eager, args.image_size)}
+    runtimes["torchscript"] = TorchScriptModel(export_torchscript(eager, os.path.join(tmp_dir, "model.pt"), args.image_size))
+    try:
+        runtimes["onnx"] = OnnxRuntimeModel(
+            export_onnx(eager, os.path.join(tmp_dir, "model.onnx"), args.image_size), intra_op_threads=args.threads
+        )
+    except ImportError:
+        print("onnx / onnxruntime non installés : moteur onnx ignoré")
+
+    print(f"torch {torch.__version__}, {torch.get_num_threads()} threads, images {args.image_size}x{args.image_size}")
+    print(f"{'moteur':>12} | {'batch':>5} | {'ms/lot':>8} | {'ms/image':>8} | {'images/s':>9} | {'écart max':>9}")
+    print("-" * 67)
+    for batch_size in args.batch_sizes:
+        batch = torch.randn(batch_size, 1, args.image_size, args.image_size)
+        with torch.no_grad():
+            expected = eager.forward_one(batch)
+        for name, model in runtimes.items():
+            latency = statistics.median(time_batches(model, batch, args.repeats))
+            with torch.no_grad():
+                max_diff = (model.forward_one(batch) - expected).abs().max().item()
+            print(
+                f"{name:>12} | {batch_size:>5} | {latency * 1000:>8.1f} | {latency * 1000 / batch_size:>8.2f} | "
+                f"{batch_size / latency:>9.1f} | {max_diff:>9.1e}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Micro-benchmark du prétraitement : PIL + ``torchvision.transforms`` contre ``ImagePreprocessor``.
+
+Pour chaque image du corpus (``data/images`` par défaut), mesure le temps de
+décodage + redimensionnement + normalisation jusqu'au lot de tenseurs, à partir
+des octets du fichier comme le fait l'API. L'option ``--jpeg-size`` réencode
+d'abord chaque image en JPEG couleur de ce côté (photo de téléphone), cas où le
+décodage JPEG réduit (mode draft) fait l'essentiel du gain.
+
+Usage :
+    python -m api_ia.benchmarks.bench_preprocessing [--images-dir data/images] [--jpeg-size 3024] [--limit 200]
+"""
+
+import argparse
+import io
+import os
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+from torchvision import transforms
+
+from api_ia.app.preprocessing import ImagePreprocessor
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+DEFAULT_IMAGES_DIR = os.path.join(REPO_DIR, "data", "images")
+MEAN, STD = [0.5], [0.5]
+
+
+def load_corpus(images_dir, limit, jpeg_size):
+    """Octets des images du corpus, éventuellement réencodées en grand JPEG couleur."""
+    names = sorted(f for f in os.listdir(images_dir) if f.lower().endswith((".png", ".jpg", ".jpeg")))[: limit or None]
+    corpus = []
+    for name in names:
+        with open(os.path.join(images_dir, name), "rb") as f:
+            data = f.read()
+        if jpeg_size:
+            img = Image.open(io.BytesIO(data)).convert("RGB")
+            img = img.resize((jpeg_size, jpeg_size * img.height // img.width), Image.BILINEAR)
+            buffer = io.BytesIO()
+            img.save(buffer, format="JPEG", quality=90)
+            data = buffer.getvalue()
+        corpus.append(data)
+    return corpus
+
+
+def legacy_batch(transform, corpus):
+    """Chemin historique : décodage PIL complet, conversion L, Compose torchvision, torch.cat."""
+    return torch.cat([transform(Image.open(io.BytesIO(data)).convert("L")).unsqueeze(0) for data in corpus])
+
+
+def fast_batch(preprocessor, corpus):
+    return preprocessor.to_batch([preprocessor.decode(data) for data in corpus])
+
+
+def measure(fn, corpus, batch_size, repeats):
+    """Meilleur temps (ms/image) sur ``repeats`` passes du corpus, par lots de ``batch_size``."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for i in range(0, len(corpus), batch_size):
+            fn(corpus[i : i + batch_size])
+        best = min(best, (time.perf_counter() - start) * 1000 / len(corpus))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images-dir", default=DEFAULT_IMAGES_DIR)
+    parser.add_argument("--image-size", type=int, default=224)
+    parser.add_argument("--jpeg-size", type=int, default=0, help="Réencode en JPEG de ce côté (0 = fichiers tels quels)")
+    parser.add_argument("--limit", type=int, default=0, help="Nombre maximal d'images (0 = toutes)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.images_dir, args.limit, args.jpeg_size)
+    size = (args.image_size, args.image_size)
+    transform = transforms.Compose([transforms.Resize(size), transforms.ToTensor(), transforms.Normalize(MEAN, STD)])
+    # Un préprocesseur par variante : ses tampons sont réutilisés d'un lot à l'autre, comme dans l'API
+    fast = ImagePreprocessor(args.image_size, MEAN, STD)
+    no_draft = ImagePreprocessor(args.image_size, MEAN, STD, jpeg_draft=False)
+    variants = {
+        "PIL + torchvision": lambda chunk: legacy_batch(transform, chunk),
+        "ImagePreprocessor": lambda chunk: fast_batch(fast, chunk),
+        "  sans mode draft": lambda chunk: fast_batch(no_draft, chunk),
+    }
+
+    sample = corpus[: args.batch_size]
+    reference = legacy_batch(transform, sample).numpy()
+    source = f"JPEG {args.jpeg_size}px" if args.jpeg_size else "fichiers d'origine"
+    print(f"{len(corpus)} images ({source}), {sum(map(len, corpus)) / len(corpus) / 1024:.0f} Kio en moyenne")
+    print(f"{'prétraitement':>20} | {'ms/image':>8} | {'gain':>5} | {'écart max':>9}")
+    print("-" * 52)
+    baseline = None
+    for name, fn in variants.items():
+        ms = measure(fn, corpus, args.batch_size, args.repeats)
+        baseline = baseline or ms
+        max_diff = float(np.abs(fn(sample).numpy() - reference).max())
+        print(f"{name:>20} | {ms:>8.2f} | {baseline / ms:>4.1f}x | {max_diff:>9.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Évaluation de l'index multi-exemplaires.
+
+Compare, sur un jeu de test étiqueté (``data/split/test`` par défaut), l'index
+historique à un seul exemplaire par classe (``{cls}/{cls}.png``) et l'index
+multi-exemplaires pour chaque agrégation (max, moyenne des m meilleurs,
+centroïde) : accuracy top-1 / top-5 et latence de recherche par requête.
+
+Usage :
+    python -m api_ia.benchmarks.bench_reference_aggregation --test-dir data/split/test
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from api_ia.app.config import REFERENCE_DIR
+from api_ia.app.model_loader import PREPROCESSOR, embed_images, load_model
+from api_ia.app.reference_index import AGGREGATIONS, ReferenceIndex
+from api_ia.app.similarity_search import list_reference_images
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+DEFAULT_TEST_DIR = os.path.join(REPO_DIR, "data", "split", "test")
+
+
+def embed_paths(model, items, batch_size):
+    """Encode une liste de couples (classe, chemin) par lots."""
+    embeddings = []
+    for start in range(0, len(items), batch_size):
+        embeddings.append(embed_images(model, [PREPROCESSOR.open(path) for _, path in items[start : start + batch_size]]))
+    return np.concatenate(embeddings), [cls for cls, _ in items]
+
+
+def evaluate(index, test_embeddings, test_labels, aggregation, ks=(1, 5)):
+    """Retourne l'accuracy top-k et la latence moyenne par requête (ms)."""
+    start = time.perf_counter()
+    results = index.search_batch(test_embeddings, max(ks), aggregation=aggregation)
+    latency_ms = (time.perf_counter() - start) * 1000 / len(test_labels)
+
+    accuracy = {}
+    for k in ks:
+        hits = sum(label in [m["class"] for m in matches[:k]] for label, matches in zip(test_labels, results))
+        accuracy[k] = hits / len(test_labels)
+    return accuracy, latency_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reference-dir", default=REFERENCE_DIR)
+    parser.add_argument("--test-dir", default=DEFAULT_TEST_DIR)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    model = load_model()
+    test_items = list_reference_images(args.test_dir)
+    test_embeddings, test_labels = embed_paths(model, test_items, args.batch_size)
+
+    all_refs = list_reference_images(args.reference_dir)
+    ref_embeddings, ref_labels = embed_paths(model, all_refs, args.batch_size)
+    official = [i for i, (cls, path) in enumerate(all_refs) if os.path.basename(path) == f"{cls}.png"]
+
+    print(f"{len(test_labels)} images de test, {len(ref_labels)} références ({len(official)} officielles)")
+    print(f"{'index':>24} | {'top-1':>6} | {'top-5':>6} | {'ms/requête':>10}")
+    print("-" * 56)
+
+    single = ReferenceIndex(ref_embeddings[official], [ref_labels[i] for i in official])
+    accuracy, latency = evaluate(single, test_embeddings, test_labels, "max")
+    print(f"{'1 exemplaire / classe':>24} | {accuracy[1]:>6.3f} | {accuracy[5]:>6.3f} | {latency:>10.3f}")
+
+    multi = ReferenceIndex(ref_embeddings, ref_labels)
+    for aggregation in AGGREGATIONS:
+        accuracy, latency = evaluate(multi, test_embeddings, test_labels, aggregation)
+        print(f"{aggregation:>24} | {accuracy[1]:>6.3f} | {accuracy[5]:>6.3f} | {latency:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark de la recherche top-k par similarité.
+
+Compare l'ancienne implémentation (boucle Python + ``cosine_similarity`` de
+sklearn par référence, puis tri complet) à la recherche matricielle de
+``ReferenceIndex`` (produit matrice-vecteur + ``argpartition``).
+
+Usage :
+    python -m api_ia.benchmarks.bench_similarity_search --sizes 1000 10000 100000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from api_ia.app.reference_index import ReferenceIndex
+
+
+def legacy_get_top_matches(query_emb, reference_embeddings, k=5):
+    """Reproduction de l'ancienne boucle de ``similarity_search.get_top_matches``."""
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    scores = []
+    for cls, ref_emb in reference_embeddings:
+        sim = cosine_similarity([query_emb], [ref_emb])[0][0]
+        scores.append((cls, sim))
+    top = sorted(scores, key=lambda x: x[1], reverse=True)[:k]
+    return [{"class": c, "similarity": float(s)} for c, s in top]
+
+
+def time_per_query(fn, queries):
+    """Retourne le temps moyen (en ms) d'un appel de ``fn`` sur chaque requête."""
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def run(sizes, dim, k, queries, legacy_queries, seed):
+    rng = np.random.default_rng(seed)
+    print(f"{'références':>12} | {'ancien (ms)':>12} | {'matriciel (ms)':>14} | {'gain':>8}")
+    print("-" * 56)
+
+    for size in sizes:
+        embeddings = rng.standard_normal((size, dim), dtype=np.float32)
+        labels = [f"classe_{i}" for i in range(size)]  # un exemplaire par classe, comme l'ancien chemin
+        query_set = rng.standard_normal((queries, dim), dtype=np.float32)
+
+        index = ReferenceIndex(embeddings, labels)
+        legacy_refs = list(zip(labels, embeddings))
+
+        # Vérifie que les deux chemins donnent les mêmes classes (sert aussi d'échauffement)
+        expected = [m["class"] for m in legacy_get_top_matches(query_set[0], legacy_refs, k)]
+        assert [m["class"] for m in index.search(query_set[0], k)] == expected
+
+        new_ms = time_per_query(lambda q: index.search(q, k), query_set)
+        legacy_ms = time_per_query(lambda q: legacy_get_top_matches(q, legacy_refs, k), query_set[:legacy_queries])
+
+        print(f"{size:>12} | {legacy_ms:>12.2f} | {new_ms:>14.3f} | {legacy_ms / new_ms:>7.0f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=256, help="Dimension des embeddings")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=50, help="Requêtes mesurées pour le chemin matriciel")
+    parser.add_argument("--legacy-queries", type=int, default=3, help="Requêtes mesurées pour l'ancien chemin (lent)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.sizes, args.dim, args.k, args.queries, args.legacy_queries, args.seed)
+
+
+if __name__ == "__main__":
+    main()
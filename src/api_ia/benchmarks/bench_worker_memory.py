@@ -0,0 +1,112 @@
+"""
+Mémoire par worker et temps de démarrage : workers indépendants contre préchargement + fork.
+
+``independants`` reproduit ``uvicorn --workers N`` : chaque processus (spawn)
+importe torch, charge les poids et les embeddings de référence. ``prechargement``
+reproduit ``gunicorn --preload`` (``api_ia/gunicorn.conf.py``) : le parent
+charge une fois, fige ses objets (``gc.freeze``) puis forke les workers.
+
+Chaque worker fait une passe forward et une recherche dans les références
+(pages du modèle et de la matrice effectivement lues) avant de se déclarer
+prêt. On mesure le temps jusqu'à ce que tous les workers soient prêts, puis la
+RSS et la PSS (``/proc/<pid>/smaps_rollup`` : pages partagées réparties entre
+les processus qui les partagent) de chaque worker. La PSS totale inclut le
+parent.
+
+Les variables d'environnement sont celles de l'API (``MODEL_WEIGHTS_PATH``,
+``REFERENCE_STORE_PATH``...). Linux uniquement.
+
+Usage :
+    python -m api_ia.benchmarks.bench_worker_memory [--workers 4]
+"""
+
+import argparse
+import gc
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+
+def memory_mb(pid):
+    """RSS et PSS (Mo) d'un processus."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in ("Rss", "Pss"):
+                values[name] = int(rest.split()[0]) / 1024
+    return values["Rss"], values["Pss"]
+
+
+def load():
+    """Modèle et références, comme à l'import de ``api_ia.app.main``."""
+    from api_ia.app.model_loader import load_model
+    from api_ia.app.similarity_search import load_references
+
+    model = load_model()
+    load_references(model)
+    return model
+
+
+def serve(model, ready, stop):
+    """Passe forward + recherche, signale la disponibilité puis attend la fin de la mesure."""
+    import torch
+
+    from api_ia.app.config import IMAGE_SIZE
+    from api_ia.app.similarity_search import get_top_matches
+
+    if model is None:
+        model = load()
+    with torch.no_grad():
+        embedding = model.forward_one(torch.zeros(1, 1, IMAGE_SIZE, IMAGE_SIZE)).cpu().numpy()[0]
+    get_top_matches(embedding)
+    ready.put((os.getpid(), time.perf_counter()))
+    stop.wait()
+
+
+def run(mode, n_workers):
+    """Temps jusqu'à disponibilité (s), mémoire des workers [(rss, pss)] et PSS du parent (Mo)."""
+    if mode == "prechargement":
+        context = multiprocessing.get_context("fork")
+        start = time.perf_counter()
+        model = load()
+        gc.freeze()
+    else:
+        context = multiprocessing.get_context("spawn")
+        start = time.perf_counter()
+        model = None
+    ready, stop = context.Queue(), context.Event()
+    workers = [context.Process(target=serve, args=(model, ready, stop)) for _ in range(n_workers)]
+    for worker in workers:
+        worker.start()
+    ready_at = [ready.get() for _ in workers]
+    elapsed = max(t for _, t in ready_at) - start
+    memory = [memory_mb(pid) for pid, _ in ready_at]
+    parent_pss = memory_mb(os.getpid())[1]
+    stop.set()
+    for worker in workers:
+        worker.join()
+    gc.unfreeze()
+    return elapsed, memory, parent_pss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers")
+    print(f"{'mode':>14} | {'prêt s':>7} | {'RSS/worker Mo':>13} | {'PSS/worker Mo':>13} | {'PSS totale Mo':>13}")
+    print("-" * 74)
+    # Les workers indépendants d'abord : le parent n'a encore rien chargé
+    for mode in ("independants", "prechargement"):
+        elapsed, memory, parent_pss = run(mode, args.workers)
+        rss, pss = np.mean(memory, axis=0)
+        total = sum(p for _, p in memory) + parent_pss
+        print(f"{mode:>14} | {elapsed:>7.2f} | {rss:>13.0f} | {pss:>13.0f} | {total:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Évaluation des modèles INT8 par rapport au modèle float32.
+
+Les références (``data/split/train``) et les requêtes (``data/split/test``) sont
+encodées par chaque variante ; l'accuracy top-1 / top-5 est calculée avec
+``compute_topk_accuracy`` de ``models/evaluate_model.py`` (plus proche référence),
+comme pour l'évaluation du modèle. Le backbone statique est calibré sur
+``data/split/val``.
+
+Usage :
+    python -m api_ia.benchmarks.eval_quantization [--max-per-class 10] [--calibration-images 512]
+"""
+
+import argparse
+import io
+import os
+import time
+
+import numpy as np
+import torch
+
+from api_ia.app.model_loader import PREPROCESSOR, load_eager_model
+from api_ia.app.quantization import quantize_head_dynamic, quantize_static
+from api_ia.app.similarity_search import list_reference_images
+from api_ia.scripts.quantize_model import DEFAULT_CALIBRATION_DIR, calibration_batches
+from models.evaluate_model import compute_topk_accuracy
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+DEFAULT_REFERENCE_DIR = os.path.join(REPO_DIR, "data", "split", "train")
+DEFAULT_TEST_DIR = os.path.join(REPO_DIR, "data", "split", "test")
+
+
+def embed_items(model, items, batch_size):
+    """Encode des couples (classe, chemin) sur CPU ; retourne embeddings, étiquettes et secondes/image."""
+    embeddings, elapsed = [], 0.0
+    for start in range(0, len(items), batch_size):
+        batch = PREPROCESSOR.to_batch([PREPROCESSOR.open(path) for _, path in items[start : start + batch_size]])
+        begin = time.perf_counter()
+        with torch.no_grad():
+            embeddings.append(model.forward_one(batch).numpy())
+        elapsed += time.perf_counter() - begin
+    return np.concatenate(embeddings), [cls for cls, _ in items], elapsed / len(items)
+
+
+def model_size_mb(model):
+    """Taille du ``state_dict`` sérialisé (Mo)."""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reference-dir", default=DEFAULT_REFERENCE_DIR)
+    parser.add_argument("--test-dir", default=DEFAULT_TEST_DIR)
+    parser.add_argument("--calibration-dir", default=DEFAULT_CALIBRATION_DIR)
+    parser.add_argument("--calibration-images", type=int, default=512)
+    parser.add_argument("--max-per-class", type=int, default=0, help="Références par classe (0 = toutes)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    float_model = load_eager_model().cpu()
+    models = {
+        "float32": float_model,
+        "int8 dynamique (tête)": quantize_head_dynamic(float_model),
+        "int8 statique + dynamique": quantize_static(
+            float_model, calibration_batches(args.calibration_dir, args.calibration_images, args.batch_size)
+        ),
+    }
+    references = list_reference_images(args.reference_dir, max_per_class=args.max_per_class)
+    tests = list_reference_images(args.test_dir)
+    print(f"{len(references)} références, {len(tests)} images de test")
+    print(f"{'modèle':>26} | {'top-1':>6} | {'Δ top-1':>7} | {'top-5':>6} | {'Δ top-5':>7} | {'ms/image':>8} | {'Mo':>5}")
+    print("-" * 84)
+
+    baseline = None
+    for name, model in models.items():
+        ref_embeddings, ref_labels, _ = embed_items(model, references, args.batch_size)
+        test_embeddings, test_labels, seconds = embed_items(model, tests, args.batch_size)
+        accuracy, _, _ = compute_topk_accuracy(test_embeddings, test_labels, ref_embeddings, ref_labels, [1, 5])
+        baseline = baseline or accuracy
+        delta1 = accuracy["Top-1"] - baseline["Top-1"]
+        delta5 = accuracy["Top-5"] - baseline["Top-5"]
+        print(
+            f"{name:>26} | {accuracy['Top-1']:>6.3f} | {delta1:>+7.3f} | {accuracy['Top-5']:>6.3f} | {delta5:>+7.3f} | "
+            f"{seconds * 1000:>8.2f} | {model_size_mb(model):>5.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
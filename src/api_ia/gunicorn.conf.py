@@ -0,0 +1,40 @@
+"""
+Configuration gunicorn : plusieurs workers uvicorn qui partagent le modèle.
+
+Avec ``preload_app`` (par défaut), le processus maître importe
+``api_ia.app.main`` et charge une seule fois le modèle (``when_ready``) : poids
+du modèle et matrice des embeddings de référence, tous deux en memory-map
+(``MODEL_WEIGHTS_MMAP``, ``REFERENCE_STORE_MMAP``), puis forke les workers. Ceux-ci héritent de ces
+pages en copy-on-write au lieu de recharger le modèle et les références
+chacun de leur côté ; le démarrage d'un worker se réduit au fork et aux
+événements ``startup`` (micro-batcher, pool de connexions, index des tags).
+
+Les métriques Prometheus restent propres à chaque worker.
+
+Usage (depuis le dossier parent de ``api_ia``) :
+    gunicorn -c api_ia/gunicorn.conf.py api_ia.app.main:app
+"""
+
+import gc
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("PRELOAD_APP", "true").lower() == "true"
+# Délai au-delà duquel un worker qui ne répond plus est redémarré
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+
+def when_ready(server):
+    # Appelé dans le maître avant le lancement des workers : ceux-ci trouvent le modèle prêt.
+    # En cas d'échec, chaque worker retente le chargement en tâche de fond.
+    if preload_app:
+        from api_ia.app.main import model_holder
+
+        model_holder.load()
+
+
+def pre_fork(server, worker):
+    # Objets du maître sortis du ramasse-miettes : ses passes dans les workers ne réécrivent pas leurs pages partagées
+    gc.freeze()
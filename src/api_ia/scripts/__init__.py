@@ -0,0 +1,3 @@
+"""
+Commandes hors ligne de l'API IA
+"""
@@ -0,0 +1,39 @@
+"""
+Précalcule les embeddings de référence et écrit le store versionné.
+
+Le store (``.json`` désignant une matrice ``.npy``) est ensuite chargé en memory-map au démarrage
+de chaque worker, sans repasser les images dans le modèle.
+
+Usage :
+    python -m api_ia.scripts.build_reference_store [--output PATH]
+"""
+
+import argparse
+import logging
+import time
+
+from api_ia.app.config import REFERENCE_STORE_PATH
+from api_ia.app.model_loader import load_model
+from api_ia.app.similarity_search import build_reference_store
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=REFERENCE_STORE_PATH, help="Chemin du fichier .npy à écrire")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    logger.info("Chargement du modèle...")
+    model = load_model()
+    index = build_reference_store(model, store_path=args.output)
+    logger.info(
+        f"{len(index)} embeddings ({len(index.classes)} classes) écrits dans {args.output} "
+        f"en {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
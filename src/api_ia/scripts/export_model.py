@@ -0,0 +1,66 @@
+"""
+Exporte ``EfficientNetEmbedding.forward_one`` en TorchScript et/ou ONNX.
+
+Chaque export est rechargé et comparé au modèle eager sur un lot aléatoire
+(écart maximal des embeddings). Avec ``--fused``, le modèle exporté est la
+variante repliée (``grayscale_conv`` et BatchNorm, voir ``model_fusion``). Les
+fichiers sont ensuite servis avec ``INFERENCE_RUNTIME=torchscript`` ou
+``INFERENCE_RUNTIME=onnx``.
+
+Usage :
+    python -m api_ia.scripts.export_model [--format torchscript onnx] [--fused] [--torchscript PATH] [--onnx PATH]
+"""
+
+import argparse
+import logging
+import time
+
+import torch
+
+from api_ia.app.config import IMAGE_SIZE, ONNX_MODEL_PATH, TORCHSCRIPT_MODEL_PATH
+from api_ia.app.inference_runtime import (
+    ONNX_OPSET,
+    OnnxRuntimeModel,
+    TorchScriptModel,
+    example_input,
+    export_onnx,
+    export_torchscript,
+)
+from api_ia.app.model_fusion import FusedEmbeddingModel
+from api_ia.app.model_loader import export_metadata, load_eager_model
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", nargs="+", choices=["torchscript", "onnx"], default=["torchscript", "onnx"])
+    parser.add_argument("--torchscript", default=TORCHSCRIPT_MODEL_PATH, help="Fichier TorchScript à écrire")
+    parser.add_argument("--onnx", default=ONNX_MODEL_PATH, help="Fichier ONNX à écrire")
+    parser.add_argument("--opset", type=int, default=ONNX_OPSET)
+    parser.add_argument("--fused", action="store_true", help="Exporte la variante repliée (grayscale_conv, BatchNorm)")
+    args = parser.parse_args()
+
+    eager = load_eager_model().cpu()
+    metadata = {**export_metadata(), "fused": args.fused}
+    check = example_input(IMAGE_SIZE, batch_size=4)
+    with torch.no_grad():
+        expected = eager.forward_one(check)
+    model = FusedEmbeddingModel(eager, IMAGE_SIZE) if args.fused else eager
+
+    for fmt in args.format:
+        start = time.perf_counter()
+        if fmt == "torchscript":
+            path = export_torchscript(model, args.torchscript, IMAGE_SIZE, metadata)
+            exported = TorchScriptModel(path)
+        else:
+            path = export_onnx(model, args.onnx, IMAGE_SIZE, metadata, opset=args.opset)
+            exported = OnnxRuntimeModel(path)
+        with torch.no_grad():
+            max_diff = (exported.forward_one(check) - expected).abs().max().item()
+        logger.info(f"{fmt} écrit dans {path} en {time.perf_counter() - start:.1f}s (écart max vs eager : {max_diff:.2e})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Quantifie le modèle en INT8 (backbone statique calibré, tête dynamique) et l'enregistre en TorchScript.
+
+La calibration utilise un échantillon d'images de ``data/split/val``, prétraitées
+exactement comme en production. Le fichier produit est servi avec
+``INFERENCE_RUNTIME=int8_static``.
+
+Usage :
+    python -m api_ia.scripts.quantize_model [--calibration-dir data/split/val] [--max-images 512] [--output PATH]
+"""
+
+import argparse
+import logging
+import os
+import random
+import time
+
+from api_ia.app.config import IMAGE_SIZE, QUANTIZED_MODEL_PATH
+from api_ia.app.inference_runtime import export_torchscript
+from api_ia.app.model_loader import PREPROCESSOR, export_metadata, load_eager_model
+from api_ia.app.quantization import QUANTIZATION_BACKEND, quantize_static
+from api_ia.app.similarity_search import list_reference_images
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+DEFAULT_CALIBRATION_DIR = os.path.join(REPO_DIR, "data", "split", "val")
+
+
+def calibration_batches(data_dir, max_images=512, batch_size=32, seed=0):
+    """
+    Lots prétraités (CPU) tirés aléatoirement parmi les images de ``data_dir`` (un dossier par classe).
+
+    Args:
+        data_dir (str): Dossier d'images étiquetées.
+        max_images (int): Nombre maximal d'images (0 = toutes).
+        batch_size (int): Images par lot.
+        seed (int): Graine du tirage.
+
+    Yields:
+        torch.Tensor: Lots de forme (B, 1, IMAGE_SIZE, IMAGE_SIZE).
+    """
+    paths = [path for _, path in list_reference_images(data_dir)]
+    if max_images and len(paths) > max_images:
+        paths = random.Random(seed).sample(paths, max_images)
+    for start in range(0, len(paths), batch_size):
+        yield PREPROCESSOR.to_batch([PREPROCESSOR.open(path) for path in paths[start : start + batch_size]], reuse=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calibration-dir", default=DEFAULT_CALIBRATION_DIR)
+    parser.add_argument("--max-images", type=int, default=512, help="Images de calibration (0 = toutes)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--output", default=QUANTIZED_MODEL_PATH, help="Fichier TorchScript à écrire")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    model = load_eager_model().cpu()
+    quantized = quantize_static(model, calibration_batches(args.calibration_dir, args.max_images, args.batch_size))
+    metadata = {**export_metadata(), "quantization": f"int8 static backbone + dynamic head ({QUANTIZATION_BACKEND})"}
+    export_torchscript(quantized, args.output, IMAGE_SIZE, metadata)
+    logger.info(f"Modèle INT8 écrit dans {args.output} en {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
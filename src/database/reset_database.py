@@ -106,6 +106,8 @@ def reset_database():
                     protection BIT DEFAULT 0,
                     photochromic BIT DEFAULT 0,
                     tags NVARCHAR(MAX),
+                    tags_signature CHAR(64),
+                    row_version ROWVERSION,
                     image_gravure NVARCHAR(MAX)
                 )
             """
@@ -134,6 +136,13 @@ def reset_database():
             """
                 )
             )
+            conn.execute(
+                text(
+                    """
+                CREATE INDEX idx_verres_tags_signature ON verres (tags_signature)
+            """
+                )
+            )
             logger.info("✅ Table verres créée avec ses index")
 
             conn.commit()
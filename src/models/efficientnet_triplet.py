@@ -1,7 +1,6 @@
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-import torchvision.models as models
 
 
 class EfficientNetEmbedding(nn.Module):
@@ -12,6 +11,8 @@ class EfficientNetEmbedding(nn.Module):
 
     def __init__(self, embedding_dim: int = 256, pretrained: bool = True):
         super().__init__()
+        # Import différé : torchvision (et torch._dynamo qu'il entraîne) pèse ~1,5 s, payé seulement si le modèle est construit
+        import torchvision.models as models
 
         # charge EfficientNet-B0 avec les poids appropriés
         if pretrained:
@@ -5,6 +5,9 @@ from dotenv import load_dotenv
 from typing import List, Dict
 import logging
 
+# api_ia doit être importable : lancer depuis src/ (python -m scripts.insert_tags)
+from api_ia.app.tags import SIGNATURE_LENGTH, tags_signature
+
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -40,6 +43,54 @@ def load_tags_from_json():
         raise
 
 
+def ensure_tag_columns(conn):
+    """
+    Crée si besoin les colonnes utilisées par les recherches par tags de l'API IA.
+
+    - tags_signature (indexée) : empreinte de l'ensemble de tags ;
+    - row_version : version de ligne, pour le rafraîchissement incrémental de l'index en mémoire.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        IF COL_LENGTH('verres', 'row_version') IS NULL
+            ALTER TABLE verres ADD row_version ROWVERSION
+        """
+    )
+    cursor.execute(
+        f"""
+        IF COL_LENGTH('verres', 'tags_signature') IS NULL
+            ALTER TABLE verres ADD tags_signature CHAR({SIGNATURE_LENGTH}) NULL
+        """
+    )
+    cursor.execute(
+        """
+        IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'idx_verres_tags_signature')
+            CREATE INDEX idx_verres_tags_signature ON verres (tags_signature)
+        """
+    )
+    conn.commit()
+
+
+def backfill_tags_signatures(conn):
+    """Recalcule tags_signature pour les verres dont la signature manque ou ne correspond plus à leurs tags."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, tags, tags_signature FROM verres WHERE tags IS NOT NULL")
+    updates = []
+    for verre_id, tags_json, signature in cursor.fetchall():
+        try:
+            expected = tags_signature(json.loads(tags_json))
+        except (ValueError, TypeError) as error:
+            logger.warning(f"⚠️ Tags illisibles pour le verre {verre_id}: {error}")
+            continue
+        if signature != expected:
+            updates.append((expected, verre_id))
+    if updates:
+        cursor.executemany("UPDATE verres SET tags_signature = ? WHERE id = ?", updates)
+    conn.commit()
+    logger.info(f"✅ {len(updates)} signatures de tags recalculées.")
+
+
 def update_tags_in_database(conn, tags_data: List[Dict]):
     """Met à jour les tags dans la base de données."""
     cursor = conn.cursor()
@@ -51,14 +102,14 @@ def update_tags_in_database(conn, tags_data: List[Dict]):
             # Convertir la liste de tags en chaîne JSON
             tags_json = json.dumps(item["tags"], ensure_ascii=False)
 
-            # Mettre à jour la base de données
+            # Mettre à jour la base de données (la signature indexée suit les tags)
             query = """
             UPDATE verres
-            SET tags = ?
+            SET tags = ?, tags_signature = ?
             WHERE gravure LIKE ?
             """
             # Utiliser LIKE pour faire correspondre l'URL
-            cursor.execute(query, (tags_json, f"%{item['gravure']}%"))
+            cursor.execute(query, (tags_json, tags_signature(item["tags"]), f"%{item['gravure']}%"))
 
             if cursor.rowcount > 0:
                 updated_count += 1
@@ -83,11 +134,16 @@ def main():
         # Établir la connexion à la base de données
         logger.info("🔌 Connexion à la base de données Azure...")
         conn = get_connection()
+        ensure_tag_columns(conn)
 
         # Mettre à jour les tags dans la base de données
         logger.info("🔄 Mise à jour des tags dans la base de données...")
         update_tags_in_database(conn, tags_data)
 
+        # Signatures des verres dont les tags ont été écrits par un autre chemin
+        logger.info("🔑 Vérification des signatures de tags...")
+        backfill_tags_signatures(conn)
+
         # Fermer la connexion
         conn.close()
         logger.info("✅ Opération terminée avec succès!")
@@ -0,0 +1,37 @@
+"""Fixtures partagées des tests de ``api_ia``."""
+
+import importlib
+import sys
+import types
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="session")
+def main():
+    """
+    ``api_ia.app.main`` importé sans pilote ODBC (pyodbc remplacé), limites de débit désactivées.
+
+    Importé une seule fois : les métriques Prometheus sont enregistrées à l'import.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        for name in ("AZURE_SERVER", "AZURE_DATABASE", "AZURE_USERNAME", "AZURE_PASSWORD", "SECRET_KEY", "ADMIN_PASSWORD"):
+            mp.setenv(name, "test")
+        mp.setenv("ADMIN_EMAIL", "admin@example.com")
+        pyodbc = types.ModuleType("pyodbc")
+        pyodbc.Error, pyodbc.Connection = Exception, object
+        # Le temps de l'import seulement : importorskip("pyodbc") doit toujours voir le vrai pilote
+        with pytest.MonkeyPatch.context() as driver:
+            driver.setitem(sys.modules, "pyodbc", pyodbc)
+            module = importlib.import_module("api_ia.app.main")
+        mp.setattr(module.limiter, "enabled", False)
+        yield module
+
+
+@pytest.fixture
+def client(main, monkeypatch):
+    """Client authentifié, sans événements de démarrage (modèle, pool de connexions, index des tags)."""
+    monkeypatch.setitem(main.app.dependency_overrides, main.get_current_user, lambda: "tester@example.com")
+    main.verre_cache.clear()
+    return TestClient(main.app)
@@ -0,0 +1,51 @@
+"""Tests de la lecture des lots de /match_batch."""
+
+import io
+import zipfile
+
+import pytest
+
+from api_ia.app.batch_upload import BatchInputError, expand_batch
+
+JPEG = b"\xff\xd8\xff\xe0fake"
+
+
+def make_zip(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in entries.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def test_archives_are_expanded_in_order():
+    """Les entrées d'une archive prennent sa place, dans l'ordre, préfixées par son nom."""
+    archive = make_zip({"b.jpg": JPEG, "dossier/a.jpg": JPEG, "__MACOSX/._a.jpg": b"x", ".DS_Store": b"x"})
+    items = expand_batch([("1.jpg", JPEG), ("lot.zip", archive), ("2.jpg", JPEG)], max_items=10, max_total_bytes=1 << 20)
+    assert [name for name, _ in items] == ["1.jpg", "lot.zip/b.jpg", "lot.zip/dossier/a.jpg", "2.jpg"]
+    assert all(content == JPEG for _, content in items)
+
+
+def test_invalid_files_are_kept_for_per_item_errors():
+    """Un fichier non image n'est pas filtré ici : il sera rejeté individuellement."""
+    items = expand_batch([("notes.txt", b"hello")], max_items=10, max_total_bytes=1 << 20)
+    assert items == [("notes.txt", b"hello")]
+
+
+def test_too_many_items_is_rejected():
+    archive = make_zip({f"{i}.jpg": JPEG for i in range(5)})
+    with pytest.raises(BatchInputError):
+        expand_batch([("lot.zip", archive)], max_items=4, max_total_bytes=1 << 20)
+
+
+def test_decompressed_size_is_bounded():
+    """Une archive très compressible est refusée avant d'être décompressée en entier."""
+    archive = make_zip({"bombe.jpg": b"\0" * (1 << 20)})
+    assert len(archive) < 10_000
+    with pytest.raises(BatchInputError):
+        expand_batch([("lot.zip", archive)], max_items=10, max_total_bytes=1 << 16)
+
+
+def test_corrupt_archive_is_rejected():
+    with pytest.raises(BatchInputError):
+        expand_batch([("lot.zip", b"PK\x03\x04tronque")], max_items=10, max_total_bytes=1 << 20)
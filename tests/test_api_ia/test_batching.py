@@ -0,0 +1,72 @@
+"""Tests du micro-batching des inférences."""
+
+import asyncio
+
+from api_ia.app.batching import MicroBatcher
+
+
+class RecordingBatch:
+    """Traitement de lot factice qui enregistre la taille de chaque lot."""
+
+    def __init__(self, fail=False):
+        self.sizes = []
+        self.fail = fail
+
+    def __call__(self, items):
+        self.sizes.append(len(items))
+        if self.fail:
+            raise ValueError("lot invalide")
+        return [item * 10 for item in items]
+
+
+async def test_concurrent_calls_share_one_batch():
+    """Des appels concurrents sont regroupés et chacun reçoit son propre résultat."""
+    process = RecordingBatch()
+    batcher = MicroBatcher(process, max_batch_size=16, max_wait_ms=50)
+    await batcher.start()
+    try:
+        results = await asyncio.gather(*[batcher.submit(i) for i in range(6)])
+    finally:
+        await batcher.stop()
+
+    assert results == [0, 10, 20, 30, 40, 50]
+    assert process.sizes == [6]
+
+
+async def test_batches_are_capped_at_max_size():
+    """Un lot ne dépasse jamais la taille maximale."""
+    process = RecordingBatch()
+    sizes = []
+    batcher = MicroBatcher(process, max_batch_size=4, max_wait_ms=50, on_batch=sizes.append)
+    await batcher.start()
+    try:
+        results = await asyncio.gather(*[batcher.submit(i) for i in range(10)])
+    finally:
+        await batcher.stop()
+
+    assert results == [i * 10 for i in range(10)]
+    assert process.sizes == [4, 4, 2]
+    assert sizes == process.sizes
+
+
+async def test_batch_error_is_raised_to_every_caller():
+    """Une erreur de traitement est propagée à tous les appelants du lot."""
+    batcher = MicroBatcher(RecordingBatch(fail=True), max_wait_ms=20)
+    await batcher.start()
+    try:
+        results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+    finally:
+        await batcher.stop()
+
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+async def test_single_call_is_not_delayed_beyond_max_wait():
+    """Un appel isolé est traité dès l'expiration du délai d'attente."""
+    batcher = MicroBatcher(RecordingBatch(), max_batch_size=8, max_wait_ms=10)
+    await batcher.start()
+    try:
+        assert await asyncio.wait_for(batcher.submit(3), timeout=1) == 30
+        assert batcher.queue_depth == 0
+    finally:
+        await batcher.stop()
@@ -0,0 +1,155 @@
+"""Tests du pool de connexions (SQLite en guise de base)."""
+
+import sqlite3
+import threading
+
+import pytest
+
+from api_ia.app.db_pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Fabrique de connexions SQLite sur une base contenant une table ``verres``, et la liste des connexions ouvertes."""
+    path = str(tmp_path / "verres.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE verres (id INTEGER PRIMARY KEY, nom TEXT)")
+        conn.executemany("INSERT INTO verres VALUES (?, ?)", [(i, f"verre {i}") for i in range(10)])
+    opened = []
+
+    def connect():
+        conn = sqlite3.connect(path, check_same_thread=False)
+        opened.append(conn)
+        return conn
+
+    return connect, opened
+
+
+def test_connections_are_reused(database):
+    connect, opened = database
+    pool = ConnectionPool(connect, max_size=2)
+    for i in range(5):
+        with pool.connection() as conn:
+            assert conn.execute("SELECT nom FROM verres WHERE id = ?", (i,)).fetchone() == (f"verre {i}",)
+    assert len(opened) == 1
+    assert (pool.size, pool.idle, pool.in_use) == (1, 1, 0)
+
+
+def test_warm_opens_min_size(database):
+    connect, opened = database
+    pool = ConnectionPool(connect, min_size=3, max_size=5)
+    pool.warm()
+    assert len(opened) == 3
+    assert pool.idle == 3
+
+
+def test_acquire_times_out_when_exhausted(database):
+    connect, _ = database
+    timeouts = []
+    pool = ConnectionPool(connect, max_size=1, timeout=0.05, on_timeout=lambda: timeouts.append(1))
+    held = pool.acquire()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    assert timeouts == [1]
+
+    # Une connexion rendue réveille l'appelant en attente
+    waiter = threading.Thread(target=lambda: pool.release(pool.acquire()))
+    pool.timeout = 5
+    waiter.start()
+    pool.release(held)
+    waiter.join(timeout=5)
+    assert not waiter.is_alive()
+    assert pool.size == 1
+
+
+def test_failed_block_discards_connection(database):
+    connect, opened = database
+    pool = ConnectionPool(connect)
+    with pytest.raises(sqlite3.OperationalError):
+        with pool.connection() as conn:
+            conn.execute("SELECT * FROM inexistante")
+    assert pool.size == 0
+    with pool.connection():
+        pass
+    assert len(opened) == 2
+
+
+def test_uncommitted_changes_are_rolled_back(database):
+    connect, _ = database
+    pool = ConnectionPool(connect)
+    with pool.connection() as conn:
+        conn.execute("DELETE FROM verres")
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM verres").fetchone() == (10,)
+
+
+def test_idle_connections_are_recycled(database):
+    connect, opened = database
+    clock = FakeClock()
+    pool = ConnectionPool(connect, min_size=1, max_idle_seconds=60, clock=clock)
+    with pool.connection() as first:
+        pass
+    clock.advance(61)
+    with pool.connection() as second:
+        assert second is not first
+    assert len(opened) == 2
+    assert pool.size == 1
+
+
+def test_idle_connections_above_min_size_are_closed(database):
+    connect, _ = database
+    clock = FakeClock()
+    pool = ConnectionPool(connect, min_size=1, max_size=3, max_idle_seconds=60, clock=clock)
+    connections = [pool.acquire() for _ in range(3)]
+    for conn in connections[:2]:
+        pool.release(conn)
+    clock.advance(61)
+    pool.release(connections[2])
+    assert (pool.size, pool.idle) == (1, 1)
+
+
+def test_broken_connection_fails_health_check(database):
+    connect, opened = database
+    clock = FakeClock()
+    pool = ConnectionPool(connect, health_check_interval=10, clock=clock)
+    with pool.connection() as conn:
+        pass
+    conn.close()  # coupée côté serveur
+    clock.advance(11)
+    with pool.connection() as fresh:
+        assert fresh.execute("SELECT 1").fetchone() == (1,)
+    assert len(opened) == 2
+    assert pool.size == 1
+
+
+def test_concurrent_use_never_exceeds_max_size(database):
+    connect, opened = database
+    pool = ConnectionPool(connect, max_size=3)
+    peak, lock = [0], threading.Lock()
+
+    def worker():
+        for _ in range(20):
+            with pool.connection() as conn:
+                with lock:
+                    peak[0] = max(peak[0], pool.in_use)
+                conn.execute("SELECT COUNT(*) FROM verres").fetchone()
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] <= 3
+    assert len(opened) <= 3
+    assert pool.in_use == 0
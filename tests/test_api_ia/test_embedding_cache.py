@@ -0,0 +1,78 @@
+"""Tests du cache d'embeddings adressé par contenu."""
+
+import os
+from collections import Counter
+
+import numpy as np
+
+from api_ia.app.embedding_cache import EmbeddingCache, cache_key
+
+
+def recording_cache(**kwargs):
+    """Cache dont les succès, échecs et évictions sont comptés par niveau."""
+    events = Counter()
+    cache = EmbeddingCache(
+        on_hit=lambda tier: events.update([f"hit_{tier}"]),
+        on_miss=lambda: events.update(["miss"]),
+        on_evict=lambda tier: events.update([f"evict_{tier}"]),
+        **kwargs,
+    )
+    return cache, events
+
+
+def embedding(seed):
+    return np.random.default_rng(seed).standard_normal(8).astype(np.float32)
+
+
+def test_key_depends_on_content_and_model_version():
+    assert cache_key(b"image", "v1") == cache_key(b"image", "v1")
+    assert cache_key(b"image", "v1") != cache_key(b"image", "v2")
+    assert cache_key(b"image", "v1") != cache_key(b"autre", "v1")
+
+
+def test_lru_eviction_and_counters():
+    cache, events = recording_cache(max_entries=2)
+    cache.put("a", embedding(0))
+    cache.put("b", embedding(1))
+    assert cache.get("a") is not None  # "a" devient le plus récent
+    cache.put("c", embedding(2))  # évince "b"
+
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    assert events == Counter(hit_memory=2, miss=1, evict_memory=1)
+    assert len(cache) == 2
+
+
+def test_matches_are_added_to_an_existing_entry():
+    cache, _ = recording_cache()
+    cache.put("a", embedding(0))
+    cache.put("a", embedding(0), k=5, matches=[{"class": "x", "similarity": 0.9}])
+    entry = cache.get("a")
+    np.testing.assert_array_equal(entry["embedding"], embedding(0))
+    assert entry["matches"] == {5: [{"class": "x", "similarity": 0.9}]}
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    cache, _ = recording_cache(max_entries=1, disk_dir=str(tmp_path))
+    cache.put("a", embedding(0), k=5, matches=[{"class": "é", "similarity": 0.5}])
+    cache.put("b", embedding(1))  # "a" n'est plus qu'en disque
+
+    restarted, events = recording_cache(max_entries=4, disk_dir=str(tmp_path))
+    entry = restarted.get("a")
+    np.testing.assert_array_equal(entry["embedding"], embedding(0))
+    assert entry["matches"] == {5: [{"class": "é", "similarity": 0.5}]}
+    assert restarted.get("a") is not None
+    assert events == Counter(hit_disk=1, hit_memory=1)
+
+
+def test_disk_tier_is_size_bounded(tmp_path):
+    probe = EmbeddingCache(disk_dir=str(tmp_path / "probe"))
+    probe.put("a", embedding(0))
+    entry_size = probe.disk_bytes
+
+    bounded, events = recording_cache(disk_dir=str(tmp_path / "cache"), max_disk_bytes=int(entry_size * 2.5))
+    for i, key in enumerate("cdef"):
+        bounded.put(key, embedding(i))
+    assert bounded.disk_bytes <= entry_size * 2.5
+    assert sorted(os.listdir(tmp_path / "cache")) == ["e.json", "f.json"]
+    assert events["evict_disk"] == 2
@@ -0,0 +1,48 @@
+"""Tests du pool de threads borné."""
+
+import threading
+
+import pytest
+
+from api_ia.app.executor import BoundedExecutor, ExecutorSaturatedError
+
+
+async def test_run_returns_result_and_records_queue_time():
+    """``run`` retourne le résultat de la fonction et mesure le temps passé en file."""
+    queue_times = []
+    executor = BoundedExecutor(max_workers=2, max_pending=4, on_queue_time=queue_times.append)
+    try:
+        assert await executor.run(sum, [1, 2, 3]) == 6
+    finally:
+        executor.shutdown()
+
+    assert len(queue_times) == 1 and queue_times[0] >= 0
+    assert executor.pending == 0
+
+
+async def test_submission_beyond_max_pending_is_rejected():
+    """Au-delà de ``max_pending`` tâches, la soumission échoue immédiatement."""
+    release = threading.Event()
+    executor = BoundedExecutor(max_workers=1, max_pending=2)
+    try:
+        futures = [executor.submit(release.wait) for _ in range(2)]
+        assert executor.pending == 2
+        with pytest.raises(ExecutorSaturatedError):
+            await executor.run(release.wait)
+    finally:
+        release.set()
+        executor.shutdown()
+
+    assert all(f.result() for f in futures)
+    assert executor.pending == 0
+
+
+async def test_errors_are_propagated_and_release_the_slot():
+    """Une exception de la tâche est propagée à l'appelant et libère sa place."""
+    executor = BoundedExecutor(max_workers=1, max_pending=1)
+    try:
+        with pytest.raises(ZeroDivisionError):
+            await executor.run(lambda: 1 / 0)
+        assert await executor.run(lambda: "ok") == "ok"
+    finally:
+        executor.shutdown()
@@ -0,0 +1,122 @@
+"""Tests de /identify et de la lecture des verres par ensembles de tags."""
+
+import json
+import re
+import types
+from contextlib import contextmanager
+
+import pytest
+
+from api_ia.app.model_state import ModelBundle
+from api_ia.app.tag_index import TagIndex
+from api_ia.app.tags import tags_signature
+
+# (id, tags enregistrés, tags ayant servi à calculer tags_signature)
+CATALOGUE = (
+    (1, ["E_CourbeBasse"], ["e_courbebasse"]),
+    (2, ["varilux"], ["varilux"]),
+    (3, ["varilux", "extra"], ["varilux", "extra"]),
+    # Tags modifiés sans mise à jour de la signature : écarté par la revérification
+    (4, ["autre"], ["varilux"]),
+)
+ROWS = {
+    verre_id: {"id": verre_id, "nom": f"verre {verre_id}", "tags": json.dumps(tags), "tags_signature": tags_signature(signed)}
+    for verre_id, tags, signed in CATALOGUE
+}
+
+# Classes candidates renvoyées par /match
+MATCHES = [
+    {"class": "Varilux", "similarity": 0.9},
+    {"class": "e_courbebasse", "similarity": 0.7},
+    {"class": "inconnu", "similarity": 0.2},
+]
+
+
+class FakeCursor:
+    """Curseur de la table verres : ``WHERE id IN (...)`` ou ``WHERE tags_signature IN (...)``."""
+
+    def __init__(self, queries):
+        self.queries = queries
+        self.rows = []
+
+    def execute(self, query, params=()):
+        self.queries.append((query, list(params)))
+        columns = [c.strip() for c in re.search(r"SELECT\s+(.*?)\s+FROM", query, re.S).group(1).split(",")]
+        key = re.search(r"WHERE\s+(\w+)\s+IN", query).group(1)
+        self.rows = [tuple(row.get(c) for c in columns) for row in ROWS.values() if row[key] in params]
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+
+@pytest.fixture
+def queries(main, monkeypatch):
+    """Requêtes SQL exécutées sur la table verres factice."""
+    executed = []
+
+    @contextmanager
+    def get_db_connection():
+        yield types.SimpleNamespace(cursor=lambda: FakeCursor(executed))
+
+    monkeypatch.setattr(main.database, "get_db_connection", get_db_connection)
+    return executed
+
+
+@pytest.fixture
+def identify(client, main, monkeypatch):
+    """Appelle /identify avec un modèle factice dont les classes candidates sont ``MATCHES``."""
+
+    async def match_image(bundle, image_bytes):
+        return MATCHES
+
+    monkeypatch.setattr(main, "current_bundle", lambda: ModelBundle("model", "references", "v-test"))
+    monkeypatch.setattr(main, "match_image", match_image)
+    return lambda: client.post("/identify", files={"file": ("verre.jpg", b"image", "image/jpeg")})
+
+
+def test_tag_sets_are_read_in_one_query_and_reverified(main, queries):
+    verres = main.database.find_verres_details_by_tags([["Varilux"], ["e_courbebasse", "E_COURBEBASSE"], []])
+
+    assert sorted(verre["id"] for verre in verres) == [1, 2]
+    assert len(queries) == 1
+    assert queries[0][1] == sorted({tags_signature(["varilux"]), tags_signature(["e_courbebasse"])})
+
+
+def test_no_tag_set_runs_no_query(main, queries):
+    assert main.database.find_verres_details_by_tags([[]]) == []
+    assert queries == []
+
+
+def test_identify_ranks_verres_with_the_tag_index(identify, main, queries, monkeypatch):
+    verres = [{"id": verre_id, "tags": tags} for verre_id, tags, _ in CATALOGUE]
+    monkeypatch.setattr(main.tag_index_refresher, "index", TagIndex(verres))
+
+    response = identify()
+
+    body = response.json()
+    assert response.status_code == 200
+    # Somme des similarités des classes portées, ex aequo départagés par id
+    assert [(v["verre"]["id"], v["score"]) for v in body["verres"]] == [(2, 0.9), (3, 0.9), (1, 0.7)]
+    assert body["verres"][0]["verre"]["nom"] == "verre 2"
+    assert [m["class_"] for m in body["matches"]] == ["Varilux", "e_courbebasse", "inconnu"]
+    assert set(body["timings_ms"]) == {"match", "tags", "details"}
+    assert re.fullmatch(r"match;dur=[\d.]+, tags;dur=[\d.]+, details;dur=[\d.]+", response.headers["server-timing"])
+    assert response.headers["x-model-version"] == "v-test"
+    # Détails lus par id, en une requête
+    assert [re.search(r"WHERE\s+(\w+)", query).group(1) for query, _ in queries] == ["id"]
+
+
+def test_identify_falls_back_to_the_database_without_tag_index(identify, main, queries, monkeypatch):
+    monkeypatch.setattr(main.tag_index_refresher, "index", None)
+
+    response = identify()
+
+    body = response.json()
+    assert response.status_code == 200
+    # Verres d'une seule classe, notés par la similarité de leur tag (casse normalisée)
+    assert [(v["verre"]["id"], v["score"]) for v in body["verres"]] == [(2, 0.9), (1, 0.7)]
+    assert body["verres"][1]["verre"]["tags"] == ["E_CourbeBasse"]
+    assert set(body["timings_ms"]) == {"match", "details"}
+    assert re.fullmatch(r"match;dur=[\d.]+, details;dur=[\d.]+", response.headers["server-timing"])
+    assert [re.search(r"WHERE\s+(\w+)", query).group(1) for query, _ in queries] == ["tags_signature"]
@@ -0,0 +1,96 @@
+"""Tests de l'identification des images par leur en-tête."""
+
+import io
+import struct
+import zlib
+
+import pytest
+from PIL import Image
+
+from api_ia.app.image_header import ImageHeaderError, read_image_header, sniff_mime_type
+
+WIDTH, HEIGHT = 37, 21
+
+
+def encode(fmt, size=(WIDTH, HEIGHT), mode="RGB", **params):
+    buffer = io.BytesIO()
+    Image.new(mode, size, (120, 40, 200)).save(buffer, format=fmt, **params)
+    return buffer.getvalue()
+
+
+def png_header(width, height):
+    """Signature et IHDR d'un PNG, sans données d'image."""
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + ihdr + struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+
+
+@pytest.mark.parametrize(
+    "fmt, params, mime_type",
+    [
+        ("JPEG", {}, "image/jpeg"),
+        ("JPEG", {"progressive": True}, "image/jpeg"),
+        ("PNG", {}, "image/png"),
+        ("GIF", {}, "image/gif"),
+        ("BMP", {}, "image/bmp"),
+        ("WEBP", {"lossless": False}, "image/webp"),
+        ("WEBP", {"lossless": True}, "image/webp"),
+    ],
+)
+def test_reads_format_and_dimensions(fmt, params, mime_type):
+    data = encode(fmt, **params)
+    info = read_image_header(data)
+
+    assert (info.format, info.mime_type, info.width, info.height) == (fmt, mime_type, WIDTH, HEIGHT)
+    assert sniff_mime_type(data) == mime_type
+    with Image.open(io.BytesIO(data)) as img:
+        assert img.size == (info.width, info.height)
+
+
+def test_webp_extended_header():
+    """VP8X : WEBP avec canal alpha ou métadonnées."""
+    data = encode("WEBP", mode="RGBA", exif=Image.Exif().tobytes())
+    assert data[12:16] == b"VP8X"
+    info = read_image_header(data)
+    assert (info.format, info.width, info.height) == ("WEBP", WIDTH, HEIGHT)
+
+
+def test_jpeg_frame_after_exif_segment():
+    """Le segment SOF d'une photo suit un long segment APP1 (EXIF, miniature)."""
+    exif = Image.Exif()
+    exif[0x010E] = "x" * 30000  # ImageDescription
+    data = encode("JPEG", exif=exif.tobytes())
+    assert data.index(b"\xff\xc0") > 30000
+
+    info = read_image_header(data)
+    assert (info.width, info.height) == (WIDTH, HEIGHT)
+
+
+def test_decompression_bomb_dimensions_read_without_decoding():
+    """Seul l'en-tête est lu : les dimensions d'une bombe sont connues sans données d'image."""
+    info = read_image_header(png_header(100_000, 100_000))
+    assert info.pixels == 10**10
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"hello world",
+        b"%PDF-1.7\n",
+        b"<svg xmlns='http://www.w3.org/2000/svg'/>",
+        b"\xff\xd8\xff\xe0\x00\x10JFIF",  # JPEG tronqué avant la trame
+        b"\xff\xd8\xff\xda\x00\x08",  # SOS sans SOF
+        b"\x89PNG\r\n\x1a\n\x00\x00",  # PNG tronqué
+        png_header(0, 10),
+        b"RIFF\x00\x00\x00\x00WEBPVP8 ",  # WEBP tronqué
+        b"RIFF\x00\x00\x00\x00WAVEfmt ",  # RIFF d'un autre format
+    ],
+)
+def test_rejects_unsupported_or_truncated_headers(data):
+    with pytest.raises(ImageHeaderError):
+        read_image_header(data)
+
+
+def test_sniff_mime_type_unknown():
+    assert sniff_mime_type(b"GIF88a") is None
+    assert sniff_mime_type(b"\x00\x00\x01\x00") is None  # ICO
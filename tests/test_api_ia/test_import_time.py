@@ -0,0 +1,91 @@
+"""Budget de temps d'import de l'API (``python -X importtime``)."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Modules chargés par un worker avant de pouvoir servir /match
+INFERENCE_MODULES = (
+    "api_ia.app.model_loader",
+    "api_ia.app.similarity_search",
+    "api_ia.app.model_state",
+    "api_ia.app.batching",
+    "api_ia.app.executor",
+    "api_ia.app.embedding_cache",
+)
+
+# Dépendances lourdes qui ne doivent être importées qu'à la demande
+LAZY_MODULES = (
+    "torchvision",
+    "torch._dynamo",
+    "torch.ao.quantization.quantize_fx",
+    "sklearn",
+    "passlib",
+    "magic",
+    "onnxruntime",
+)
+
+# Budgets en ms (torch compris) ; ajustables pour une machine de CI lente
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "4000"))
+# Import complet de l'application, tel qu'à chaque démarrage de worker (FastAPI, slowapi, prometheus, pyodbc...)
+MAIN_IMPORT_TIME_BUDGET_MS = float(os.getenv("MAIN_IMPORT_TIME_BUDGET_MS", "6000"))
+
+REQUIRED_ENV = {
+    "AZURE_SERVER": "test",
+    "AZURE_DATABASE": "test",
+    "AZURE_USERNAME": "test",
+    "AZURE_PASSWORD": "test",
+    "SECRET_KEY": "test",
+    "ADMIN_EMAIL": "admin@example.com",
+    "ADMIN_PASSWORD": "test",
+}
+
+
+def import_report(modules, lazy_modules):
+    """Importe ``modules`` dans un interpréteur neuf ; (temps cumulés par module en µs, modules lazy chargés)."""
+    code = (
+        "import json, sys\n"
+        + "".join(f"import {module}\n" for module in modules)
+        + f"print(json.dumps([m for m in {tuple(lazy_modules)!r} if m in sys.modules]))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env={**os.environ, **REQUIRED_ENV},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line[len("import time:") :].split("|")
+        # L'indentation du nom (après l'espace séparateur) donne la profondeur de l'import
+        if total.strip().isdigit():
+            cumulative[name[1:].rstrip()] = int(total)
+    return cumulative, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def assert_within_budget(modules, lazy_modules, budget_ms):
+    cumulative, loaded_lazy = import_report(modules, lazy_modules)
+
+    assert loaded_lazy == [], f"Modules lourds importés : {loaded_lazy}"
+    # Les lignes sans indentation sont les imports de premier niveau : leur somme est le temps total
+    total_ms = sum(us for name, us in cumulative.items() if name == name.lstrip()) / 1000
+    slowest = sorted(((us, name.strip()) for name, us in cumulative.items()), reverse=True)[:10]
+    report = "\n".join(f"{us / 1000:>8.1f} ms  {name}" for us, name in slowest)
+    assert total_ms < budget_ms, f"Import en {total_ms:.0f} ms (budget {budget_ms:.0f} ms) :\n{report}"
+
+
+def test_inference_path_imports_within_budget():
+    # slowapi n'est utile qu'aux routes : le chemin d'inférence seul ne doit pas l'importer
+    assert_within_budget(INFERENCE_MODULES, LAZY_MODULES + ("slowapi",), IMPORT_TIME_BUDGET_MS)
+
+
+def test_main_imports_within_budget():
+    """``api_ia.app.main`` est ce qu'importe chaque worker : routes, métriques et accès base compris."""
+    pytest.importorskip("pyodbc", reason="pilote ODBC (libodbc) requis pour importer api_ia.app.main")
+    assert_within_budget(("api_ia.app.main",), LAZY_MODULES, MAIN_IMPORT_TIME_BUDGET_MS)
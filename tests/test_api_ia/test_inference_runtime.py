@@ -0,0 +1,49 @@
+"""Tests de parité des moteurs d'inférence exportés (TorchScript, ONNX Runtime)."""
+
+import numpy as np
+import pytest
+import torch
+
+from api_ia.app.inference_runtime import OnnxRuntimeModel, TorchScriptModel, export_onnx, export_torchscript
+from models.efficientnet_triplet import EfficientNetEmbedding
+
+IMAGE_SIZE = 64
+ATOL = 1e-4
+
+
+@pytest.fixture(scope="module")
+def eager_model():
+    torch.manual_seed(0)
+    return EfficientNetEmbedding(embedding_dim=256, pretrained=False).eval()
+
+
+@pytest.fixture(scope="module")
+def images():
+    return torch.randn(5, 1, IMAGE_SIZE, IMAGE_SIZE, generator=torch.Generator().manual_seed(1))
+
+
+def assert_same_embeddings(exported, eager_model, images):
+    with torch.no_grad():
+        expected = eager_model.forward_one(images).numpy()
+        found = exported.forward_one(images).numpy()
+    assert found.shape == expected.shape
+    np.testing.assert_allclose(found, expected, atol=ATOL)
+    # Batch dynamique : une image seule donne le même embedding que dans le lot
+    with torch.no_grad():
+        np.testing.assert_allclose(exported.forward_one(images[:1]).numpy(), expected[:1], atol=ATOL)
+
+
+def test_torchscript_matches_eager(eager_model, images, tmp_path):
+    path = export_torchscript(eager_model, str(tmp_path / "model.pt"), IMAGE_SIZE, {"weights_sha256": "abc"})
+    exported = TorchScriptModel(path)
+    assert exported.metadata == {"weights_sha256": "abc"}
+    assert_same_embeddings(exported, eager_model, images)
+
+
+def test_onnx_runtime_matches_eager(eager_model, images, tmp_path):
+    pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    path = export_onnx(eager_model, str(tmp_path / "model.onnx"), IMAGE_SIZE, {"weights_sha256": "abc"})
+    exported = OnnxRuntimeModel(path)
+    assert exported.metadata["weights_sha256"] == "abc"
+    assert_same_embeddings(exported, eager_model, images)
@@ -0,0 +1,42 @@
+"""Tests du modèle replié (grayscale_conv dans le stem, BatchNorm dans les convolutions)."""
+
+import pytest
+import torch
+import torch.nn as nn
+
+from api_ia.app.model_fusion import FusedEmbeddingModel
+from models.efficientnet_triplet import EfficientNetEmbedding
+
+IMAGE_SIZE = 64
+
+
+@pytest.fixture(scope="module")
+def model():
+    """Modèle aléatoire avec des statistiques de BatchNorm et un biais de conversion non triviaux."""
+    torch.manual_seed(0)
+    model = EfficientNetEmbedding(embedding_dim=256, pretrained=False).eval()
+    for module in model.modules():
+        if isinstance(module, (nn.BatchNorm1d, nn.BatchNorm2d)):
+            module.running_mean.uniform_(-0.5, 0.5)
+            module.running_var.uniform_(0.5, 2.0)
+            module.weight.data.uniform_(0.5, 1.5)
+            module.bias.data.uniform_(-0.2, 0.2)
+    nn.init.uniform_(model.grayscale_conv.bias, -1.0, 1.0)
+    return model
+
+
+@pytest.mark.parametrize("size", [IMAGE_SIZE, 48])
+def test_fused_model_matches_eager(model, size):
+    """Embeddings identiques à la tolérance près, y compris hors de la taille précalculée."""
+    fused = FusedEmbeddingModel(model, IMAGE_SIZE)
+    images = torch.randn(3, 1, size, size, generator=torch.Generator().manual_seed(1))
+    with torch.no_grad():
+        torch.testing.assert_close(fused.forward_one(images), model.forward_one(images), atol=1e-5, rtol=1e-4)
+
+
+def test_stem_consumes_grayscale_input_and_batchnorms_are_folded(model):
+    fused = FusedEmbeddingModel(model, IMAGE_SIZE)
+    assert fused.backbone.features[0].conv.in_channels == 1
+    assert not any(isinstance(m, (nn.BatchNorm1d, nn.BatchNorm2d)) for m in fused.modules())
+    # Le modèle d'origine n'est pas modifié
+    assert isinstance(model.backbone.features[0][1], nn.BatchNorm2d)
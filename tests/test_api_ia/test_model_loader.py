@@ -0,0 +1,58 @@
+"""Tests de la lecture des poids en memory-map."""
+
+import glob
+import importlib
+import os
+
+import pytest
+import torch
+
+
+@pytest.fixture
+def model_loader(monkeypatch):
+    """``api_ia.app.model_loader`` importé avec la configuration minimale."""
+    for name in ("AZURE_SERVER", "AZURE_DATABASE", "AZURE_USERNAME", "AZURE_PASSWORD", "SECRET_KEY", "ADMIN_PASSWORD"):
+        monkeypatch.setenv(name, "test")
+    monkeypatch.setenv("ADMIN_EMAIL", "admin@example.com")
+    module = importlib.import_module("api_ia.app.model_loader")
+    monkeypatch.setattr(module, "DEVICE", "cpu")
+    return module
+
+
+def test_mapped_weights_survive_in_place_rewrite(model_loader, tmp_path):
+    path = str(tmp_path / "weights.pth")
+    torch.save({"w": torch.ones(1024)}, path)
+    state_dict, mmapped = model_loader.load_state_dict_file(path, mmap=True)
+    assert mmapped
+
+    # Recopie en place puis troncature : le modèle actif ne lit que sa copie immuable
+    torch.save({"w": torch.zeros(1024)}, path)
+    assert torch.equal(state_dict["w"], torch.ones(1024))
+    open(path, "wb").close()
+    assert float(state_dict["w"].sum()) == 1024
+
+
+def test_snapshot_is_named_by_content_and_old_ones_are_removed(model_loader, tmp_path):
+    path = str(tmp_path / "weights.pth")
+    snapshots = []
+    for value in range(3):
+        torch.save({"w": torch.full((4,), float(value))}, path)
+        snapshots.append(model_loader.weights_snapshot(path))
+        os.utime(snapshots[-1], ns=(value * 10**9, value * 10**9))
+
+    assert model_loader.weights_snapshot(path) == snapshots[-1]
+    assert os.path.basename(snapshots[-1]) == f"weights.{model_loader.file_sha256(path)[:16]}.pth"
+    # La copie précédente reste disponible pour les workers qui la chargent encore
+    assert sorted(glob.glob(str(tmp_path / "weights.*.pth"))) == sorted(snapshots[1:])
+
+
+def test_plain_load_when_snapshot_cannot_be_written(model_loader, tmp_path, monkeypatch):
+    path = str(tmp_path / "weights.pth")
+    torch.save({"w": torch.ones(4)}, path)
+
+    def read_only(path):
+        raise PermissionError(f"{path} en lecture seule")
+
+    monkeypatch.setattr(model_loader, "weights_snapshot", read_only)
+    state_dict, mmapped = model_loader.load_state_dict_file(path, mmap=True)
+    assert not mmapped and torch.equal(state_dict["w"], torch.ones(4))
@@ -0,0 +1,190 @@
+"""Tests du chargement du modèle en tâche de fond."""
+
+import asyncio
+import os
+import threading
+
+import pytest
+
+from api_ia.app.model_state import ModelBundle, ModelHolder, ModelNotReadyError
+
+
+class VersionedLoader:
+    """Chargement factice : une nouvelle version à chaque appel, ou une erreur si ``fail``."""
+
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self, report):
+        if self.fail:
+            raise ValueError("poids corrompus")
+        self.calls += 1
+        return ModelBundle(f"model v{self.calls}", f"references v{self.calls}", f"v{self.calls}")
+
+
+def test_not_ready_until_loaded():
+    holder = ModelHolder(lambda report: ModelBundle("model", "references", "v1"))
+    assert holder.status()["state"] == "pending"
+    with pytest.raises(ModelNotReadyError):
+        holder.require()
+
+    bundle = holder.load()
+    assert holder.ready
+    assert holder.require() is bundle
+    assert bundle.version == "v1"
+
+
+def test_progress_is_reported_while_loading():
+    seen = []
+    release = threading.Event()
+
+    def load(report):
+        report("references", 0.5)
+        seen.append(holder.status())
+        release.wait(5)
+        return ModelBundle("model", "references", "v1")
+
+    holder = ModelHolder(load)
+    worker = threading.Thread(target=holder.load)
+    worker.start()
+    release.set()
+    worker.join()
+    assert seen[0]["state"] == "loading"
+    assert (seen[0]["stage"], seen[0]["progress"]) == ("references", 0.5)
+    assert seen[0]["ready"] is False
+
+
+def test_failure_is_kept_instead_of_raised():
+    def load(report):
+        raise FileNotFoundError("efficientnet_triplet.pth introuvable")
+
+    holder = ModelHolder(load)
+    assert holder.load() is None
+    status = holder.status()
+    assert (status["state"], status["error"]) == ("failed", "efficientnet_triplet.pth introuvable")
+    with pytest.raises(ModelNotReadyError):
+        holder.require()
+
+
+async def test_start_loads_in_background_once():
+    calls = []
+    durations = []
+
+    def load(report):
+        calls.append(1)
+        return ModelBundle("model", "references", "v1")
+
+    holder = ModelHolder(load, on_loaded=lambda bundle, seconds: durations.append(seconds))
+    await holder.start()
+    await holder.start()
+    assert (await holder.wait()).model == "model"
+    assert holder.ready
+    assert len(calls) == 1
+    assert len(durations) == 1
+
+
+async def test_start_skips_preloaded_model():
+    """Modèle déjà chargé par le maître gunicorn avant le fork : pas de second chargement."""
+    calls = []
+    holder = ModelHolder(lambda report: calls.append(1) or ModelBundle("model", "references", "v1"))
+    holder.load()
+    await holder.start()
+    await holder.wait()
+    assert len(calls) == 1
+
+
+def test_reload_swaps_model_and_references_together():
+    loader = VersionedLoader()
+    holder = ModelHolder(loader)
+    old = holder.load()
+    in_flight = holder.require()
+
+    new = holder.load(reload=True)
+    assert (new.model, new.references, holder.version) == ("model v2", "references v2", "v2")
+    assert holder.require() is new
+    # Une requête commencée avant le remplacement garde l'ancien couple
+    assert in_flight is old and in_flight.references == "references v1"
+
+
+def test_failed_reload_keeps_serving_the_current_model():
+    loader = VersionedLoader()
+    loaded = []
+    failures = []
+    holder = ModelHolder(loader, on_loaded=lambda bundle, seconds: loaded.append(bundle.version), on_failed=failures.append)
+    holder.load()
+
+    loader.fail = True
+    assert holder.load(reload=True).version == "v1"
+    status = holder.status()
+    assert (status["ready"], status["version"], status["error"]) == (True, "v1", "poids corrompus")
+    assert (loaded, failures) == (["v1"], ["poids corrompus"])
+
+
+async def test_reload_runs_in_background_once_at_a_time():
+    release = threading.Event()
+    loader = VersionedLoader()
+
+    def slow_load(report):
+        release.wait(5)
+        return loader(report)
+
+    holder = ModelHolder(slow_load)
+    release.set()
+    holder.load()
+    release.clear()
+
+    assert await holder.reload()
+    assert not await holder.reload()
+    assert holder.version == "v1"
+    release.set()
+    await holder.wait()
+    assert holder.version == "v2"
+
+
+async def test_weights_file_change_triggers_reload(tmp_path):
+    weights = tmp_path / "weights.pth"
+    weights.write_bytes(b"v1")
+    holder = ModelHolder(VersionedLoader())
+    holder.load()
+
+    await holder.watch([str(weights)], interval=0.01)
+    try:
+        await asyncio.sleep(0.05)
+        assert holder.version == "v1"
+        # Nouveaux poids déposés par renommage
+        staged = tmp_path / "weights.pth.new"
+        staged.write_bytes(b"v2")
+        os.replace(staged, weights)
+        for _ in range(100):
+            if holder.version == "v2":
+                break
+            await asyncio.sleep(0.01)
+        await holder.wait()
+        assert holder.version == "v2"
+    finally:
+        await holder.stop()
+
+
+async def test_file_being_written_is_not_reloaded_until_stable(tmp_path):
+    weights = tmp_path / "weights.pth"
+    weights.write_bytes(b"v1")
+    holder = ModelHolder(VersionedLoader())
+    holder.load()
+
+    await holder.watch([str(weights)], interval=0.02)
+    try:
+        # cp / torch.save en cours : le fichier grossit à chaque vérification
+        for _ in range(10):
+            with open(weights, "ab") as f:
+                f.write(b"x")
+            await asyncio.sleep(0.015)
+            assert holder.version == "v1" and not holder.busy
+        for _ in range(100):
+            if holder.version == "v2":
+                break
+            await asyncio.sleep(0.01)
+        await holder.wait()
+        assert holder.version == "v2"
+    finally:
+        await holder.stop()
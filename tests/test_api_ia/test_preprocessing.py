@@ -0,0 +1,77 @@
+"""Tests du prétraitement rapide des images."""
+
+import io
+import threading
+
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+from torchvision import transforms
+
+from api_ia.app.preprocessing import ImagePreprocessor
+
+SIZE = 32
+MEAN, STD = [0.5], [0.5]
+
+
+def encode(img, fmt):
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def photo():
+    """Image couleur 4x plus grande que la cible, avec un dégradé (pas d'aplats)."""
+    x, y = np.meshgrid(np.linspace(0, 255, 8 * SIZE), np.linspace(0, 255, 4 * SIZE))
+    return Image.fromarray(np.stack([x, y, (x + y) / 2], axis=-1).astype(np.uint8), "RGB")
+
+
+def torchvision_batch(img):
+    transform = transforms.Compose([transforms.Resize((SIZE, SIZE)), transforms.ToTensor(), transforms.Normalize(MEAN, STD)])
+    return transform(img.convert("L")).unsqueeze(0)
+
+
+def test_png_matches_torchvision_transform(photo):
+    """Sans JPEG, le résultat est celui de Resize + ToTensor + Normalize."""
+    preprocessor = ImagePreprocessor(SIZE, MEAN, STD)
+    batch = preprocessor.to_batch([preprocessor.decode(encode(photo, "PNG"))])
+    torch.testing.assert_close(batch, torchvision_batch(photo), atol=1e-6, rtol=0)
+
+
+def test_jpeg_draft_decode_is_close_to_full_decode(photo):
+    """Le décodage JPEG réduit reste proche du décodage complet."""
+    data = encode(photo, "JPEG")
+    full = ImagePreprocessor(SIZE, MEAN, STD, jpeg_draft=False)
+    draft = ImagePreprocessor(SIZE, MEAN, STD)
+    expected = full.to_batch([full.decode(data)], reuse=False)
+    found = draft.to_batch([draft.decode(data)], reuse=False)
+    assert found.shape == (1, 1, SIZE, SIZE)
+    torch.testing.assert_close(expected, torchvision_batch(Image.open(io.BytesIO(data))), atol=1e-6, rtol=0)
+    assert (found - expected).abs().mean() < 0.02
+
+
+def test_batch_buffer_is_reused_within_a_thread(photo):
+    preprocessor = ImagePreprocessor(SIZE, MEAN, STD)
+    image = preprocessor.load(photo)
+    first = preprocessor.to_batch([image] * 3)
+    second = preprocessor.to_batch([image] * 2)
+    assert first.data_ptr() == second.data_ptr()
+    assert preprocessor.to_batch([image], reuse=False).data_ptr() != first.data_ptr()
+
+    # Chaque thread a son propre tampon
+    pointers = []
+    thread = threading.Thread(target=lambda: pointers.append(preprocessor.to_batch([image]).data_ptr()))
+    thread.start()
+    thread.join()
+    assert pointers[0] != first.data_ptr()
+
+
+def test_buffer_grows_for_larger_batches(photo):
+    preprocessor = ImagePreprocessor(SIZE, MEAN, STD)
+    image = preprocessor.load(photo)
+    assert preprocessor.to_batch([image]).shape[0] == 1
+    batch = preprocessor.to_batch([image] * 5)
+    assert batch.shape == (5, 1, SIZE, SIZE)
+    assert torch.equal(batch[0], batch[4])
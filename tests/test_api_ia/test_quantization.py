@@ -0,0 +1,52 @@
+"""Tests de la quantification INT8 de EfficientNetEmbedding."""
+
+import pytest
+import torch
+
+from api_ia.app.quantization import quantize_head_dynamic, quantize_static
+from models.efficientnet_triplet import EfficientNetEmbedding
+
+IMAGE_SIZE = 64
+
+
+@pytest.fixture(scope="module")
+def float_model():
+    torch.manual_seed(0)
+    return EfficientNetEmbedding(embedding_dim=256, pretrained=False).eval()
+
+
+@pytest.fixture(scope="module")
+def images():
+    return torch.randn(6, 1, IMAGE_SIZE, IMAGE_SIZE, generator=torch.Generator().manual_seed(1))
+
+
+def cosine(a, b):
+    return (a * b).sum(dim=1)
+
+
+def test_dynamic_head_quantization(float_model, images):
+    """Les Linear de la tête deviennent INT8 dynamiques ; le modèle float n'est pas modifié."""
+    quantized = quantize_head_dynamic(float_model)
+    assert isinstance(quantized.embedding_head[0], torch.ao.nn.quantized.dynamic.Linear)
+    assert isinstance(float_model.embedding_head[0], torch.nn.Linear)
+
+    with torch.no_grad():
+        expected, found = float_model.forward_one(images), quantized.forward_one(images)
+    assert found.shape == expected.shape
+    assert torch.all(cosine(found, expected) > 0.99)
+
+
+def test_static_quantization_is_calibrated_and_close(float_model, images):
+    """Le backbone calibré produit des embeddings normalisés proches du modèle float."""
+    calibration = [torch.randn(4, 1, IMAGE_SIZE, IMAGE_SIZE) for _ in range(3)]
+    quantized = quantize_static(float_model, calibration)
+
+    with torch.no_grad():
+        expected, found = float_model.forward_one(images), quantized.forward_one(images)
+    torch.testing.assert_close(found.norm(dim=1), torch.ones(len(images)), atol=1e-4, rtol=0)
+    assert torch.all(cosine(found, expected) > 0.95)
+
+
+def test_static_quantization_requires_calibration_data(float_model):
+    with pytest.raises(ValueError):
+        quantize_static(float_model, [])
@@ -0,0 +1,117 @@
+"""Tests de l'index matriciel des embeddings de référence."""
+
+import numpy as np
+import pytest
+
+from api_ia.app.reference_index import ReferenceIndex, top_k_indices
+
+
+@pytest.fixture
+def random_references():
+    """200 références aléatoires réparties sur 10 classes de tailles inégales."""
+    rng = np.random.default_rng(42)
+    embeddings = rng.standard_normal((200, 32)).astype(np.float32)
+    labels = [f"classe_{i % 10}" if i < 150 else "classe_0" for i in range(200)]
+    return embeddings, labels
+
+
+@pytest.fixture
+def query():
+    return np.random.default_rng(0).standard_normal(32).astype(np.float32)
+
+
+def cosine(a, b):
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def brute_force_class_scores(query, embeddings, labels, aggregation, top_m=3):
+    """Référence naïve : similarités calculées une par une puis agrégées par classe."""
+    per_class = {}
+    for label, emb in zip(labels, embeddings):
+        per_class.setdefault(label, []).append(emb)
+
+    scores = {}
+    for label, embs in per_class.items():
+        sims = sorted((cosine(query, e) for e in embs), reverse=True)
+        if aggregation == "max":
+            scores[label] = sims[0]
+        elif aggregation == "mean_topm":
+            scores[label] = float(np.mean(sims[:top_m]))
+        else:
+            scores[label] = cosine(query, np.mean([e / np.linalg.norm(e) for e in embs], axis=0))
+    return sorted(scores.items(), key=lambda x: x[1], reverse=True)
+
+
+def test_embeddings_are_contiguous_and_grouped_by_class(random_references):
+    """La matrice est contiguë, normalisée L2 et regroupée par blocs de classe."""
+    index = ReferenceIndex(*random_references)
+    assert index.embeddings.dtype == np.float32
+    assert index.embeddings.flags["C_CONTIGUOUS"]
+    np.testing.assert_allclose(np.linalg.norm(index.embeddings, axis=1), 1.0, rtol=1e-5)
+
+    assert len(index.classes) == 10
+    assert index.counts[list(index.classes).index("classe_0")] == 65
+    for cls, offset, count in zip(index.classes, index.offsets, index.counts):
+        assert set(index.labels[offset : offset + count]) == {cls}
+
+
+@pytest.mark.parametrize("aggregation", ["max", "mean_topm", "centroid"])
+def test_search_matches_brute_force(random_references, query, aggregation):
+    """Chaque agrégation vectorisée retourne le même classement que la boucle naïve."""
+    embeddings, labels = random_references
+    index = ReferenceIndex(embeddings, labels, aggregation=aggregation, top_m=3)
+
+    matches = index.search(query, k=5)
+    expected = brute_force_class_scores(query, embeddings, labels, aggregation)[:5]
+
+    assert [m["class"] for m in matches] == [label for label, _ in expected]
+    np.testing.assert_allclose([m["similarity"] for m in matches], [s for _, s in expected], rtol=1e-5)
+
+
+def test_mean_topm_with_small_classes():
+    """Une classe plus petite que m est moyennée sur ses seuls exemplaires."""
+    embeddings = np.array([[1, 0], [0.6, 0.8], [0, 1]], dtype=np.float32)
+    index = ReferenceIndex(embeddings, ["a", "a", "b"], aggregation="mean_topm", top_m=5)
+    scores = dict((m["class"], m["similarity"]) for m in index.search(np.array([1, 0], dtype=np.float32)))
+    assert scores["a"] == pytest.approx(0.8)
+    assert scores["b"] == pytest.approx(0.0)
+
+
+def test_search_batch_matches_single_search(random_references):
+    """La recherche par lot équivaut à des recherches individuelles."""
+    index = ReferenceIndex(*random_references)
+    queries = np.random.default_rng(1).standard_normal((4, 32)).astype(np.float32)
+    for batch_matches, q in zip(index.search_batch(queries, k=3), queries):
+        single_matches = index.search(q, k=3)
+        assert [m["class"] for m in batch_matches] == [m["class"] for m in single_matches]
+        np.testing.assert_allclose(
+            [m["similarity"] for m in batch_matches], [m["similarity"] for m in single_matches], rtol=1e-5
+        )
+
+
+def test_search_with_k_larger_than_index():
+    """Un k supérieur au nombre de classes retourne toutes les classes triées."""
+    index = ReferenceIndex(np.eye(3, dtype=np.float32), ["a", "b", "c"])
+    matches = index.search(np.array([0.1, 0.9, 0.3], dtype=np.float32), k=10)
+    assert [m["class"] for m in matches] == ["b", "c", "a"]
+
+
+def test_search_on_empty_index():
+    """Un index vide ne retourne aucune correspondance."""
+    index = ReferenceIndex(np.empty((0, 0), dtype=np.float32), [])
+    assert index.search(np.ones(8, dtype=np.float32)) == []
+
+
+def test_invalid_arguments_raise():
+    """Labels incohérents ou agrégation inconnue sont refusés."""
+    with pytest.raises(ValueError):
+        ReferenceIndex(np.ones((3, 4), dtype=np.float32), ["a", "b"])
+    with pytest.raises(ValueError):
+        ReferenceIndex(np.ones((2, 4), dtype=np.float32), ["a", "b"], aggregation="median")
+
+
+def test_top_k_indices_sorted():
+    """Les indices retournés sont triés par score décroissant, ligne par ligne."""
+    scores = np.array([0.1, 0.9, 0.5, 0.7, 0.3])
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 2]
+    assert top_k_indices(np.stack([scores, -scores]), 2).tolist() == [[1, 3], [0, 4]]
@@ -0,0 +1,125 @@
+"""Tests du store persistant des embeddings de référence."""
+
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from api_ia.app.reference_index import ReferenceIndex
+from api_ia.app.reference_store import file_sha256, load_reference_store, metadata_path, save_reference_store, store_lock
+
+
+@pytest.fixture
+def index():
+    """Index de référence de 3 classes avec plusieurs exemplaires."""
+    rng = np.random.default_rng(7)
+    return ReferenceIndex(rng.standard_normal((12, 16)).astype(np.float32), ["b", "a", "c"] * 4)
+
+
+@pytest.fixture
+def store_path(tmp_path, index):
+    """Store écrit sur disque avec des métadonnées de test."""
+    path = str(tmp_path / "refs.npy")
+    metadata = {"weights_sha256": "abc", "preprocessing": {"image_size": 224, "mean": [0.5]}}
+    save_reference_store(path, index.embeddings, list(index.labels), metadata)
+    return path
+
+
+def test_roundtrip_is_memory_mapped(store_path, index):
+    """Le store rechargé est un memory-map identique à la matrice d'origine."""
+    stored = load_reference_store(store_path, {"weights_sha256": "abc"})
+    assert stored is not None
+    embeddings, labels, meta = stored
+
+    assert isinstance(embeddings, np.memmap)
+    np.testing.assert_array_equal(embeddings, index.embeddings)
+    assert labels == list(index.labels)
+    assert meta["shape"] == [12, 16]
+
+
+def test_index_from_store_matches_original(store_path, index):
+    """Un index reconstruit depuis le store donne les mêmes résultats, sans copie."""
+    embeddings, labels, _ = load_reference_store(store_path, {})
+    restored = ReferenceIndex.from_normalized(embeddings, labels)
+
+    assert restored.embeddings is embeddings
+    query = np.random.default_rng(0).standard_normal(16).astype(np.float32)
+    assert restored.search(query, k=3) == index.search(query, k=3)
+
+
+@pytest.mark.parametrize(
+    "expected",
+    [{"weights_sha256": "autre"}, {"preprocessing": {"image_size": 256, "mean": [0.5]}}],
+)
+def test_mismatched_metadata_invalidates_store(store_path, expected):
+    """Des poids ou un prétraitement différents rendent le store obsolète."""
+    assert load_reference_store(store_path, expected) is None
+
+
+def test_missing_or_outdated_store(tmp_path, store_path):
+    """Un store absent ou d'un autre format n'est pas chargé."""
+    assert load_reference_store(str(tmp_path / "absent.npy"), {}) is None
+
+    with open(metadata_path(store_path), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    meta["format_version"] = 0
+    with open(metadata_path(store_path), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    assert load_reference_store(store_path, {}) is None
+
+
+def test_publication_keeps_matrix_and_labels_paired(tmp_path, store_path, index):
+    """Une nouvelle version est publiée par le seul remplacement du .json ; la matrice précédente reste lisible."""
+    with open(metadata_path(store_path), "r", encoding="utf-8") as f:
+        first = json.load(f)
+
+    smaller = ReferenceIndex(index.embeddings[:6], list(index.labels)[:6])
+    save_reference_store(store_path, smaller.embeddings, list(smaller.labels), {"weights_sha256": "abc"})
+    embeddings, labels, meta = load_reference_store(store_path, {})
+    assert embeddings.shape[0] == len(labels) == 6
+    assert meta["data_file"] != first["data_file"]
+    # Un lecteur qui a lu les anciennes métadonnées trouve toujours la matrice correspondante
+    previous = np.load(tmp_path / first["data_file"])
+    assert previous.shape == tuple(first["shape"]) and previous.shape[0] == len(first["labels"])
+
+    # Seules la matrice publiée et la précédente sont conservées
+    save_reference_store(store_path, index.embeddings[:3], list(index.labels)[:3], {"weights_sha256": "abc"})
+    latest = load_reference_store(store_path, {})[2]["data_file"]
+    assert sorted(p.name for p in tmp_path.glob("refs.*.npy")) == sorted([meta["data_file"], latest])
+
+
+def test_from_normalized_requires_grouped_labels():
+    """Les labels doivent être regroupés par classe."""
+    with pytest.raises(ValueError):
+        ReferenceIndex.from_normalized(np.eye(3, dtype=np.float32), ["a", "b", "a"])
+
+
+def test_file_sha256(tmp_path):
+    """L'empreinte change avec le contenu du fichier."""
+    path = tmp_path / "weights.pth"
+    path.write_bytes(b"poids v1")
+    first = file_sha256(str(path))
+    path.write_bytes(b"poids v2")
+    assert file_sha256(str(path)) != first
+
+
+def test_store_rebuild_is_exclusive(store_path):
+    order = []
+    started = threading.Event()
+
+    def rebuild():
+        started.set()
+        with store_lock(store_path):
+            order.append("second")
+
+    with store_lock(store_path):
+        worker = threading.Thread(target=rebuild)
+        worker.start()
+        started.wait(5)
+        worker.join(0.1)
+        # Le second processus (ici un thread, verrou pris sur son propre descripteur) attend la fin du premier
+        assert worker.is_alive()
+        order.append("first")
+    worker.join(5)
+    assert order == ["first", "second"]
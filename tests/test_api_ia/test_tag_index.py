@@ -0,0 +1,203 @@
+"""Tests de l'index des tags en mémoire."""
+
+import pytest
+
+from api_ia.app import tag_index
+from api_ia.app.tag_index import TagIndex, TagIndexRefresher
+
+
+def verre(verre_id, *tags):
+    return {"id": verre_id, "nom": f"verre {verre_id}", "tags": list(tags)}
+
+
+CATALOGUE = [
+    verre(1, "Varilux", "Physio"),
+    verre(2, "varilux"),
+    verre(3, "varilux", "physio", "XR"),
+    verre(4, "eyezen"),
+    verre(5),
+]
+
+
+def ids(verres):
+    return [v["id"] for v in verres]
+
+
+@pytest.fixture
+def index():
+    return TagIndex(CATALOGUE)
+
+
+def test_exact_match_ignores_order_and_case(index):
+    assert ids(index.search([" physio", "VARILUX"])) == [1]
+    assert ids(index.search(["varilux"])) == [2]
+    assert index.search(["inconnu"]) == []
+
+
+def test_superset_and_subset(index):
+    assert ids(index.search(["varilux"], "superset")) == [1, 2, 3]
+    assert ids(index.search(["varilux", "physio"], "superset")) == [1, 3]
+    assert ids(index.search(["varilux", "physio"], "subset")) == [1, 2]
+    assert ids(index.search(["varilux", "physio", "xr", "eyezen"], "subset")) == [1, 2, 3, 4]
+
+
+def test_subset_without_enumeration(index, monkeypatch):
+    """Les demandes longues passent par le complément des bitsets, avec le même résultat."""
+    monkeypatch.setattr(tag_index, "SUBSET_ENUMERATION_MAX_TAGS", 0)
+    assert ids(index.search(["varilux", "physio"], "subset")) == [1, 2]
+    assert ids(index.search(["varilux", "physio", "xr", "eyezen"], "subset")) == [1, 2, 3, 4]
+
+
+def test_results_are_the_stored_verres(index):
+    assert index.search(["varilux", "physio"]) == [CATALOGUE[0]]
+
+
+def test_verres_without_tags_are_not_indexed(index):
+    assert len(index) == 4
+    assert index.n_tags == 4
+
+
+def test_upsert_and_remove(index):
+    index.upsert([verre(2, "eyezen"), verre(6, "varilux")])
+    assert ids(index.search(["eyezen"])) == [2, 4]
+    assert ids(index.search(["varilux"])) == [6]
+
+    index.remove([4, 6])
+    index.upsert([verre(3)])  # tags vidés
+    assert ids(index.search(["eyezen"])) == [2]
+    assert index.search(["varilux"]) == []
+    assert ids(index.search(["varilux"], "superset")) == [1]
+    assert len(index) == 2
+    # Les positions libérées sont réutilisées
+    index.upsert([verre(7, "xr")])
+    assert ids(index.search(["xr"])) == [7]
+
+
+def test_unknown_mode_is_rejected(index):
+    with pytest.raises(ValueError):
+        index.search(["varilux"], "fuzzy")
+
+
+def ranked(index, tags, metric="jaccard", offset=0, limit=20):
+    total, page = index.rank(tags, metric, offset, limit)
+    return total, [(v["id"], round(score, 3)) for v, score in page]
+
+
+def test_rank_by_jaccard_and_overlap(index):
+    # varilux+physio : 1 = {varilux, physio}, 2 = {varilux}, 3 = {varilux, physio, xr}
+    assert ranked(index, ["varilux", "physio"]) == (3, [(1, 1.0), (3, 0.667), (2, 0.5)])
+    assert ranked(index, ["varilux", "physio"], "overlap") == (3, [(1, 1.0), (2, 1.0), (3, 1.0)])
+    assert ranked(index, ["inconnu"]) == (0, [])
+
+
+def test_rank_by_weights(index):
+    """Poids par tag, par exemple les classes candidates de /match et leur similarité."""
+    weights = {"Physio": 0.9, "xr": 0.5, "eyezen": 0.2}
+    assert ranked(index, weights, "weighted") == (3, [(3, 1.4), (1, 0.9), (4, 0.2)])
+
+
+def test_rank_pagination_is_stable(index):
+    index.upsert([verre(10 + i, "varilux", f"autre{i}") for i in range(10)])
+    total, full = ranked(index, ["varilux"], limit=100)
+    assert total == 13
+    pages = [ranked(index, ["varilux"], offset=offset, limit=4)[1] for offset in range(0, 16, 4)]
+    assert [item for page in pages for item in page] == full
+    # Ex aequo départagés par id croissant
+    assert [verre_id for verre_id, _ in full[:4]] == [2, 1, 10, 11]
+
+
+def test_rank_matrix_follows_updates(index):
+    assert ranked(index, ["eyezen"])[0] == 1
+    index.upsert([verre(1, "eyezen")])
+    assert ranked(index, ["eyezen"]) == (2, [(1, 1.0), (4, 1.0)])
+
+
+def test_unknown_metric_is_rejected(index):
+    with pytest.raises(ValueError):
+        index.rank(["varilux"], "cosine")
+
+
+class FakeDatabase:
+    """Table ``verres`` avec une version de ligne incrémentée à chaque écriture."""
+
+    def __init__(self, verres, unparseable=()):
+        self.rows = {}
+        self.version = 0
+        self.calls = []
+        # Verres dont la colonne tags est renseignée mais illisible (lus avec des tags vides)
+        self.unparseable = set(unparseable)
+        for v in verres:
+            self.write(v)
+
+    def write(self, v):
+        self.version += 1
+        self.rows[v["id"]] = (v, self.version)
+
+    def load_all(self):
+        self.calls.append("all")
+        rows = [(v, version) for v, version in self.rows.values() if self.tagged(v)]
+        return [v for v, _ in rows], max((version for _, version in rows), default=None)
+
+    def load_changes(self, since):
+        self.calls.append("changes")
+        rows = [(v, version) for v, version in self.rows.values() if version > since]
+        return [v for v, _ in rows], max((version for _, version in rows), default=since)
+
+    def count(self):
+        return sum(1 for v, _ in self.rows.values() if self.tagged(v))
+
+    def tagged(self, v):
+        return bool(v["tags"]) or v["id"] in self.unparseable
+
+
+def refresher_for(db):
+    refreshes = []
+    refresher = TagIndexRefresher(
+        db.load_all, db.load_changes, db.count, on_refresh=lambda seconds, full: refreshes.append(full)
+    )
+    return refresher, refreshes
+
+
+def test_refresh_is_incremental():
+    db = FakeDatabase(CATALOGUE)
+    refresher, refreshes = refresher_for(db)
+    refresher.refresh()
+    index = refresher.index
+    assert len(index) == 4
+
+    db.write(verre(4, "varilux"))
+    db.write(verre(8, "xr"))
+    refresher.refresh()
+    assert refresher.index is index
+    assert ids(index.search(["varilux"])) == [2, 4]
+    assert ids(index.search(["xr"])) == [8]
+    assert refreshes == [True, False]
+    assert db.calls == ["all", "changes"]
+
+
+def test_deletions_trigger_a_full_rebuild():
+    db = FakeDatabase(CATALOGUE)
+    refresher, refreshes = refresher_for(db)
+    refresher.refresh()
+    del db.rows[1]
+    refresher.refresh()
+    assert refreshes == [True, True]
+    assert refresher.index.search(["varilux", "physio"]) == []
+
+
+def test_unusable_tags_do_not_force_rebuilds():
+    """Un verre tagué en base mais écarté de l'index (tags illisibles) n'entraîne pas de reconstruction à chaque passe."""
+    db = FakeDatabase(CATALOGUE + [verre(9)], unparseable={9, 10})
+    refresher, refreshes = refresher_for(db)
+    refresher.refresh()
+    assert refresher.rejected == 1
+    refresher.refresh()
+    refresher.refresh()
+    assert refreshes == [True, False, False]
+
+    # Un nouveau verre écarté entraîne une seule reconstruction
+    db.write(verre(10))
+    refresher.refresh()
+    refresher.refresh()
+    assert refreshes == [True, False, False, True, False]
+    assert refresher.rejected == 2
@@ -0,0 +1,21 @@
+"""Tests de la forme canonique des ensembles de tags."""
+
+from api_ia.app.tags import SIGNATURE_LENGTH, canonical_tags, tags_signature
+
+
+def test_canonical_form_ignores_order_case_spaces_and_duplicates():
+    assert canonical_tags([" Varilux", "physio", "VARILUX "]) == ["physio", "varilux"]
+
+
+def test_signature_identifies_the_tag_set():
+    signature = tags_signature(["Varilux", "Physio"])
+    assert len(signature) == SIGNATURE_LENGTH
+    assert tags_signature([" physio ", "varilux", "VARILUX"]) == signature
+    assert tags_signature(["varilux"]) != signature
+    assert tags_signature(["varilux", "physio", "xr"]) != signature
+
+
+def test_signature_does_not_depend_on_separators():
+    """Des tags contenant le séparateur de la forme canonique restent distincts."""
+    assert tags_signature(["a,b"]) != tags_signature(["a", "b"])
+    assert tags_signature(["é"]) == tags_signature(["É"])
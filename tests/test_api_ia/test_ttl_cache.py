@@ -0,0 +1,114 @@
+"""Tests du cache TTL borné."""
+
+from api_ia.app.ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def counting_loader(clock, value, seconds=0.0):
+    """Chargeur qui compte ses appels et « dure » ``seconds`` sur l'horloge factice."""
+    calls = []
+
+    def load():
+        calls.append(1)
+        clock.advance(seconds)
+        return value
+
+    return load, calls
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(ttl_seconds=10, clock=clock)
+    load, calls = counting_loader(clock, {"username": "alice"})
+
+    assert cache.get_or_load("alice", load) == {"username": "alice"}
+    clock.advance(9.9)
+    assert cache.get_or_load("alice", load) == {"username": "alice"}
+    assert len(calls) == 1
+    clock.advance(0.2)
+    cache.get_or_load("alice", load)
+    assert len(calls) == 2
+
+
+def test_invalidate_forces_reload():
+    clock = FakeClock()
+    cache = TTLCache(ttl_seconds=10, clock=clock)
+    load, calls = counting_loader(clock, "alice")
+    cache.get_or_load("alice", load)
+
+    assert cache.invalidate("alice")
+    assert not cache.invalidate("alice")
+    cache.get_or_load("alice", load)
+    assert len(calls) == 2
+
+
+def test_missing_values_are_not_cached():
+    cache = TTLCache(clock=FakeClock())
+    load, calls = counting_loader(cache.clock, None)
+    assert cache.get_or_load("ghost", load) is None
+    assert cache.get_or_load("ghost", load) is None
+    assert len(calls) == 2
+    assert len(cache) == 0
+
+
+def test_size_bound_evicts_least_recently_used():
+    evictions = []
+    cache = TTLCache(max_entries=2, clock=FakeClock(), on_evict=lambda: evictions.append(1))
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "a" devient le plus récent
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert len(evictions) == 1
+
+
+def test_hits_report_avoided_load_time():
+    clock = FakeClock()
+    avoided, loads = [], []
+    cache = TTLCache(clock=clock, on_hit=avoided.append, on_miss=loads.append)
+    load, _ = counting_loader(clock, "alice", seconds=0.05)
+
+    cache.get_or_load("alice", load)
+    cache.get_or_load("alice", load)
+    cache.get_or_load("alice", load)
+
+    assert loads == [0.05]
+    assert avoided == [0.05, 0.05]
+    assert cache.hit_ratio == 2 / 3
+
+
+def test_zero_ttl_disables_cache():
+    cache = TTLCache(ttl_seconds=0, clock=FakeClock())
+    load, calls = counting_loader(cache.clock, "alice")
+    cache.get_or_load("alice", load)
+    cache.get_or_load("alice", load)
+    assert len(calls) == 2
+
+
+async def test_async_loader_shares_the_cache():
+    clock = FakeClock()
+    loads = []
+    cache = TTLCache(clock=clock, on_miss=loads.append)
+    load, calls = counting_loader(clock, "alice", seconds=0.02)
+
+    async def async_load():
+        return load()
+
+    assert await cache.get_or_load_async("alice", async_load) == "alice"
+    assert await cache.get_or_load_async("alice", async_load) == "alice"
+    assert cache.get_or_load("alice", load) == "alice"
+    assert len(calls) == 1
+    assert loads == [0.02]
+    assert cache.hit_ratio == 2 / 3
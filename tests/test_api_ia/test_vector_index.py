@@ -0,0 +1,86 @@
+"""Tests des backends de recherche des plus proches voisins."""
+
+import numpy as np
+import pytest
+
+from api_ia.app.reference_index import ReferenceIndex, l2_normalize
+from api_ia.app.vector_index import ExactIndex, IVFIndex, create_vector_index
+
+
+@pytest.fixture
+def clustered():
+    """1 000 embeddings normalisés répartis en 20 amas, et 10 requêtes proches des amas."""
+    rng = np.random.default_rng(3)
+    centers = rng.standard_normal((20, 32))
+    embeddings = l2_normalize(centers[rng.integers(0, 20, 1000)] + 0.3 * rng.standard_normal((1000, 32)))
+    queries = l2_normalize(centers[:10] + 0.3 * rng.standard_normal((10, 32)))
+    return embeddings, queries
+
+
+def recall_at_k(ids, exact_ids):
+    return np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(ids, exact_ids)])
+
+
+def test_exact_index_matches_brute_force(clustered):
+    """Le backend exact retourne les voisins triés par similarité décroissante."""
+    embeddings, queries = clustered
+    scores, ids = ExactIndex().build(embeddings).search(queries, 5)
+
+    expected = np.argsort(-(queries @ embeddings.T), axis=1)[:, :5]
+    np.testing.assert_array_equal(ids, expected)
+    assert np.all(np.diff(scores, axis=1) <= 0)
+
+
+def test_ivf_probing_every_list_is_exact(clustered):
+    """Un IVF qui parcourt toutes ses listes est équivalent à la recherche exacte."""
+    embeddings, queries = clustered
+    _, exact_ids = ExactIndex().build(embeddings).search(queries, 10)
+    _, ivf_ids = IVFIndex(n_lists=16, n_probe=16).build(embeddings).search(queries, 10)
+    np.testing.assert_array_equal(ivf_ids, exact_ids)
+
+
+def test_ivf_recall_on_clustered_data(clustered):
+    """Avec peu de listes sondées, le rappel reste élevé sur des données en amas."""
+    embeddings, queries = clustered
+    _, exact_ids = ExactIndex().build(embeddings).search(queries, 10)
+    _, ivf_ids = IVFIndex(n_lists=32, n_probe=4).build(embeddings).search(queries, 10)
+    assert recall_at_k(ivf_ids, exact_ids) >= 0.9
+
+
+def test_hnsw_recall(clustered):
+    """Le backend HNSW (hnswlib optionnel) retrouve les voisins exacts."""
+    pytest.importorskip("hnswlib")
+    embeddings, queries = clustered
+    _, exact_ids = ExactIndex().build(embeddings).search(queries, 10)
+    scores, hnsw_ids = create_vector_index("hnsw", ef_search=200).build(embeddings).search(queries, 10)
+    assert recall_at_k(hnsw_ids, exact_ids) >= 0.95
+    np.testing.assert_allclose(scores[:, 0], np.max(queries @ embeddings.T, axis=1), rtol=1e-4)
+
+
+@pytest.mark.parametrize("aggregation", ["max", "mean_topm"])
+def test_reference_index_with_approximate_backend(clustered, aggregation):
+    """Un backend approximatif sans perte donne le même classement de classes que l'exact."""
+    embeddings, queries = clustered
+    labels = [f"classe_{i % 25}" for i in range(len(embeddings))]
+
+    exact = ReferenceIndex(embeddings, labels, aggregation=aggregation)
+    ivf = ReferenceIndex(
+        embeddings, labels, aggregation=aggregation, backend=IVFIndex(n_lists=8, n_probe=8), candidates=len(embeddings)
+    )
+    for expected, found in zip(exact.search_batch(queries, k=5), ivf.search_batch(queries, k=5)):
+        assert [m["class"] for m in found] == [m["class"] for m in expected]
+        np.testing.assert_allclose([m["similarity"] for m in found], [m["similarity"] for m in expected], rtol=1e-5)
+
+
+def test_classes_without_candidates_are_not_returned():
+    """Seules les classes parmi les candidats récupérés sont retournées."""
+    embeddings = np.eye(4, dtype=np.float32)
+    index = ReferenceIndex(embeddings, ["a", "b", "c", "d"], backend=IVFIndex(n_lists=4, n_probe=4), candidates=2)
+    matches = index.search(np.array([1.0, 0.5, 0.0, 0.0], dtype=np.float32), k=4)
+    assert [m["class"] for m in matches] == ["a", "b"]
+
+
+def test_unknown_backend_raises():
+    """Un nom de backend inconnu est refusé."""
+    with pytest.raises(ValueError):
+        create_vector_index("annoy")
@@ -0,0 +1,77 @@
+"""Tests des colonnes renvoyées pour le détail d'un verre."""
+
+import importlib
+import re
+import sys
+import types
+from contextlib import contextmanager
+
+import pytest
+
+# Colonnes de la table verres (reset_database.py / insert_tags.py)
+TABLE_COLUMNS = (
+    "id",
+    "nom",
+    "materiaux",
+    "indice",
+    "fournisseur",
+    "gravure",
+    "url_source",
+    "variante",
+    "hauteur_min",
+    "hauteur_max",
+    "protection",
+    "photochromic",
+    "tags",
+    "image_gravure",
+    "tags_signature",
+    "row_version",
+)
+ROW = {name: f"{name}-value" for name in TABLE_COLUMNS}
+ROW.update(id=7, tags='["varilux"]', row_version=b"\x00\x00\x00\x00\x07\xd1\xff\xfe")
+
+
+class FakeCursor:
+    """Curseur d'une table verres à une ligne : renvoie les colonnes demandées par le SELECT."""
+
+    def __init__(self):
+        self.columns = ()
+        self.description = None
+
+    def execute(self, query, params=()):
+        selected = re.search(r"SELECT\s+(.*?)\s+FROM", query, re.S).group(1).strip()
+        self.columns = TABLE_COLUMNS if selected == "*" else tuple(c.strip() for c in selected.split(","))
+        self.description = [(name,) for name in self.columns]
+
+    def fetchall(self):
+        return [tuple(ROW[name] for name in self.columns)]
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """``api_ia.app.database`` importé sans pilote ODBC (pyodbc remplacé le temps du test)."""
+    for name in ("AZURE_SERVER", "AZURE_DATABASE", "AZURE_USERNAME", "AZURE_PASSWORD", "SECRET_KEY", "ADMIN_PASSWORD"):
+        monkeypatch.setenv(name, "test")
+    monkeypatch.setenv("ADMIN_EMAIL", "admin@example.com")
+    pyodbc = types.ModuleType("pyodbc")
+    pyodbc.Error, pyodbc.Connection = Exception, object
+    monkeypatch.setitem(sys.modules, "pyodbc", pyodbc)
+    monkeypatch.delitem(sys.modules, "api_ia.app.database", raising=False)
+    module = importlib.import_module("api_ia.app.database")
+
+    @contextmanager
+    def get_db_connection():
+        yield types.SimpleNamespace(cursor=FakeCursor)
+
+    monkeypatch.setattr(module, "get_db_connection", get_db_connection)
+    yield module
+    sys.modules.pop("api_ia.app.database", None)
+
+
+def test_verre_details_exclude_internal_columns(database):
+    verre = database.get_verre_details(7)
+
+    assert verre["id"] == 7 and verre["tags"] == ["varilux"]
+    assert "row_version" not in verre
+    assert "tags_signature" not in verre
+    assert set(verre) == set(database.VERRE_DETAIL_COLUMNS)
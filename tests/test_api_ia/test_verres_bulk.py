@@ -0,0 +1,81 @@
+"""Tests de /verres/bulk : cache, doublons, ids absents et erreurs de lecture."""
+
+import threading
+
+import pytest
+
+VERRES = {verre_id: {"id": verre_id, "nom": f"verre {verre_id}", "tags": ["varilux"]} for verre_id in (1, 2, 3)}
+
+
+class FakeVerres:
+    """``database.get_verres_details`` sur une table de trois verres ; ``fail`` simule une base injoignable."""
+
+    def __init__(self):
+        self.requested = []
+        self.threads = []
+        self.fail = False
+
+    def __call__(self, verre_ids):
+        self.requested.append(list(verre_ids))
+        self.threads.append(threading.current_thread().name)
+        if self.fail:
+            raise ConnectionError("connexion perdue")
+        return {verre_id: dict(VERRES[verre_id]) for verre_id in dict.fromkeys(verre_ids) if verre_id in VERRES}
+
+
+@pytest.fixture
+def verres(main, monkeypatch):
+    fake = FakeVerres()
+    monkeypatch.setattr(main.database, "get_verres_details", fake)
+    return fake
+
+
+def test_cached_verres_are_not_read_again(client, verres):
+    first = client.post("/verres/bulk", json=[1, 2])
+    second = client.post("/verres/bulk", json=[2, 3])
+
+    assert first.status_code == second.status_code == 200
+    assert sorted(v["id"] for v in second.json()["verres"]) == [2, 3]
+    assert verres.requested == [[1, 2], [3]]
+
+
+def test_duplicate_ids_are_read_and_returned_once(client, verres):
+    body = client.post("/verres/bulk", json=[3, 1, 3, 1]).json()
+
+    assert [v["id"] for v in body["verres"]] == [3, 1]
+    assert verres.requested == [[3, 1]]
+
+
+def test_unknown_ids_are_listed_as_missing(client, verres):
+    body = client.post("/verres/bulk", json=[1, 999]).json()
+
+    assert [v["id"] for v in body["verres"]] == [1]
+    assert body["missing"] == [999]
+
+
+def test_rows_are_read_in_the_database_pool(client, verres):
+    client.post("/verres/bulk", json=[1, 2])
+
+    # Pool borné de async_database, pas le pool de threads de Starlette
+    assert verres.threads and all(name.startswith("db") for name in verres.threads)
+
+
+def test_database_down_returns_503_before_streaming(client, verres):
+    client.post("/verres/bulk", json=[3])
+    verres.fail = True
+    response = client.post("/verres/bulk", json=[3, 1])
+
+    # Même avec des verres en cache : pas de 200 partiel
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+def test_saturated_database_pool_returns_503(client, verres, main, monkeypatch):
+    def saturated(fn, *args):
+        raise main.ExecutorSaturatedError("pool saturé")
+
+    monkeypatch.setattr(main.async_database.db_executor, "run", saturated)
+    response = client.post("/verres/bulk", json=[1])
+
+    assert response.status_code == 503
+    assert verres.requested == []